@@ -5,7 +5,7 @@ from api.schemas.chat_schemas import (
     ChatOutputSchema,
     ChatMessagesListOutputSchema,
 )
-from helpers.sql_storage import SqlStorage
+from helpers.async_sql_storage import AsyncSqlStorage
 from context import AppContext
 
 router = APIRouter()
@@ -17,15 +17,15 @@ router = APIRouter()
     response_model=CreateChatOutputSchema,
     tags=["Chat"]
 )
-def create_new_chat(request: Request, data: CreateChatInputSchema):
+async def create_new_chat(request: Request, data: CreateChatInputSchema):
     """
     Create a new chat with a new, auto-generated ID (UUID).
     If 'title' is provided in body, store it in the DB.
     """
     app_context: AppContext = request.state.app_context
-    sql_storage = SqlStorage(app_context)
+    sql_storage = AsyncSqlStorage(app_context)
 
-    chat_id = sql_storage.create_chat(data.title)
+    chat_id = await sql_storage.create_chat(data.title)
 
     app_context.logger.info(f"Created new chat with id {chat_id}, title={data.title}")
     return {"chat_id": chat_id}
@@ -34,14 +34,14 @@ def create_new_chat(request: Request, data: CreateChatInputSchema):
 @router.get("/chat",
             response_model=list[ChatOutputSchema],
             tags=["Chat"])
-def get_all_chats(request: Request):
+async def get_all_chats(request: Request):
     """
     List all chats.
     """
     app_context: AppContext = request.state.app_context
-    sql_storage = SqlStorage(app_context)
+    sql_storage = AsyncSqlStorage(app_context)
 
-    rows = sql_storage.list_chats()
+    rows = await sql_storage.list_chats()
     # rows -> list of tuples (id, title, created_at)
     return [
         {
@@ -56,14 +56,14 @@ def get_all_chats(request: Request):
 @router.get("/chat/{chat_id}",
             response_model=ChatOutputSchema,
             tags=["Chat"])
-def get_chat(request: Request, chat_id: str):
+async def get_chat(request: Request, chat_id: str):
     """
     Read a single chat by ID (UUID).
     """
     app_context: AppContext = request.state.app_context
-    sql_storage = SqlStorage(app_context)
+    sql_storage = AsyncSqlStorage(app_context)
 
-    row = sql_storage.read_chat(chat_id)
+    row = await sql_storage.read_chat(chat_id)
     if not row:
         raise HTTPException(status_code=404, detail="Chat not found.")
     # row -> (id, title, created_at)
@@ -76,18 +76,18 @@ def get_chat(request: Request, chat_id: str):
 
 @router.delete("/chat/{chat_id}",
                tags=["Chat"])
-def remove_chat(request: Request, chat_id: str):
+async def remove_chat(request: Request, chat_id: str):
     """
     Delete a single chat by ID (messages will be removed as well due to ON DELETE CASCADE).
     """
     app_context: AppContext = request.state.app_context
-    sql_storage = SqlStorage(app_context)
+    sql_storage = AsyncSqlStorage(app_context)
 
     # Ensure chat actually exists, or raise 404
-    row = sql_storage.read_chat(chat_id)
+    row = await sql_storage.read_chat(chat_id)
     if not row:
         raise HTTPException(status_code=404, detail="Chat not found.")
-    sql_storage.delete_chat(chat_id)
+    await sql_storage.delete_chat(chat_id)
     return {"status": "ok"}
 
 
@@ -99,7 +99,7 @@ def remove_chat(request: Request, chat_id: str):
 @router.get("/chat/{chat_id}/messages",
             response_model=ChatMessagesListOutputSchema,
             tags=["Chat"])
-def list_chat_messages(
+async def list_chat_messages(
         request: Request,
         chat_id: str,
         limit: int = Query(default=None, description="Limit the number of most recent messages.")
@@ -108,13 +108,13 @@ def list_chat_messages(
     List messages for a given chat, optionally limited to the N most recent messages.
     """
     app_context: AppContext = request.state.app_context
-    sql_storage = SqlStorage(app_context)
+    sql_storage = AsyncSqlStorage(app_context)
 
-    row = sql_storage.read_chat(chat_id)
+    row = await sql_storage.read_chat(chat_id)
     if not row:
         raise HTTPException(status_code=404, detail="Chat not found.")
 
-    msgs = sql_storage.get_messages(chat_id, limit=limit)
+    msgs = await sql_storage.get_messages(chat_id, limit=limit)
     # msgs -> list of tuples (sender, content) in chronological order
     return {
         "messages": [
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Request, Response, status
 
-from api.schemas.status_ok_schema import StatusOkResponseSchema
+from api.schemas.checkup_schema import CheckUpResponseSchema
 
 
 router = APIRouter()
@@ -8,18 +8,36 @@ router = APIRouter()
 
 @router.get(
     "/-/check-up",
-    response_model=StatusOkResponseSchema,
+    response_model=CheckUpResponseSchema,
     status_code=status.HTTP_200_OK,
     tags=["Healthcheck"]
 )
-async def readiness():
+async def readiness(request: Request, response: Response):
     """
     This route can be used as check-up route, to verify if all the
-    functionalities of the service are available or not. The purpose of this
-    route should be to check the availability of all the dependencies of the
-    service and reply with a check-up of the service. By default, the route will
-    always response with an OK status and the 200 HTTP code as soon as the
-    service is up.
+    functionalities of the service are available or not. It replies with the
+    result of the last health check of each dependency (Qdrant and Postgres),
+    checked in background and cached, whether the warmup is completed, and
+    the state of the circuit breaker of each dependency.
+    If a dependency is unhealthy, it responds with the 503 HTTP code.
     """
 
-    return {"statusOk": True}
+    app_context = request.app.state.app_context
+    dependencies = {
+        name: {
+            "healthy": health.healthy,
+            "latencyMs": health.latency_ms,
+            "checkedAt": health.checked_at,
+            "error": health.error,
+        }
+        for name, health in app_context.health_manager.get_health().items()
+    }
+    status_ok = all(dependency["healthy"] for dependency in dependencies.values())
+    if not status_ok:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "statusOk": status_ok,
+        "ready": app_context.resources_manager.is_ready,
+        "dependencies": dependencies,
+        "circuitBreakers": app_context.circuit_breaker_manager.get_states(),
+    }
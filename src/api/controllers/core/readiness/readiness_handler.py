@@ -1,4 +1,4 @@
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Request, Response, status
 
 from api.schemas.status_ok_schema import StatusOkResponseSchema
 
@@ -12,11 +12,15 @@ router = APIRouter()
     status_code=status.HTTP_200_OK,
     tags=["Healthcheck"]
 )
-async def readiness():
+async def readiness(request: Request, response: Response):
     """
-    This route can be used as a readinessProbe for Kubernetes. By default, the
-    route will always response with an OK status and the 200 HTTP code as soon
-    as the service is up.
+    This route can be used as a readinessProbe for Kubernetes. The route responds
+    with an OK status and the 200 HTTP code once the warmup of the shared resources
+    (models, clients and vector store) is completed, and with the 503 HTTP code
+    until then, so that no traffic is sent to an instance with cold caches.
     """
 
-    return {"statusOk": True}
+    ready = request.app.state.app_context.resources_manager.is_ready
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"statusOk": ready}
@@ -1,56 +1,81 @@
+import os
+import shutil
+import uuid
 from gzip import BadGzipFile
 from tarfile import TarError
+from tempfile import NamedTemporaryFile
 from typing import Generator
 from zipfile import BadZipFile
-from fastapi import APIRouter, BackgroundTasks, File, HTTPException, Request, UploadFile, status
+from fastapi import APIRouter, BackgroundTasks, File, HTTPException, Query, Request, UploadFile, status
 
-from application.embeddings.file_parser.errors import InvalidFileError
+from application.embeddings.file_parser.errors import FileTooLargeError, InvalidFileError
+from application.embeddings.errors import TooManyIngestionJobsError
 from api.schemas.status_ok_schema import StatusOkResponseSchema
-from application.embeddings.embedding_generator import EmbeddingGenerator
-from application.embeddings.file_parser.file_parser import FileParser
-from api.schemas.embeddings_schemas import GenerateEmbeddingsInputSchema, GenerateStatusOutputSchema
+from application.embeddings.file_parser.parsed_document import ParsedDocument
+from application.embeddings.ingestion_jobs import (
+    FILE_JOB_TYPE,
+    FINAL_STATUSES,
+    REBUILD_JOB_TYPE,
+    URL_JOB_TYPE,
+    IngestionJob,
+)
+from api.schemas.embeddings_schemas import (
+    DeleteSourceOutputSchema,
+    GenerateEmbeddingsInputSchema,
+    GenerateEmbeddingsJobOutputSchema,
+    GenerateStatusOutputSchema,
+    IngestionJobOutputSchema,
+    IngestionJobsListOutputSchema,
+    RebuildCollectionInputSchema,
+)
 from context import AppContext
 
 router = APIRouter()
 
-# This is a simplified mechanism to prevent multiple requests from generating embeddings at the same time.
-# For this specific router, we designed it to only allow one request to generate embeddings at a time, therefore
-# we use a lock to prevent multiple requests from starting the process at the same time.
-#
-# In case of need of multiple methods that requires locking or very long tasks,
-# you might want to use a more sophisticated mechanism to handle this.
-router.lock = False
+# The modules of the ingestion pipeline (the file parser, the chunkers, the crawler, ...) are imported by the handlers
+# using them, so that their dependencies are not loaded at startup, before the service is able to serve a request.
 
-def generate_embeddings_from_url_background_task(app_context: AppContext, url: str, filter_path: str | None):
+# Each embeddings generation process runs as a job of the ingestion job manager, which limits the number of jobs
+# running at the same time and tracks their progress: further requests are rejected with 409 until a job finishes.
+# When the worker processes are enabled, jobs are instead queued in the database and run by the workers.
+
+def generate_embeddings_from_url_background_task(
+    app_context: AppContext,
+    job: IngestionJob,
+    url: str,
+    filter_path: str | None,
+    replace: bool = False
+):
     """
     Generate embeddings for a given URL. 
     
-    This method is intended to be called as a background task. Includes management of the lock mechanism
-    of this router, which is locked when the embedding generation process is running, and unlocked when it finishes.
+    This method is intended to be called as a background task. The status and the progress of the process
+    are tracked by the given job.
 
     Args:
         app_context (AppContext): The application context.
+        job (IngestionJob): The job of the embedding generation process.
         url (str): The URL to generate embeddings from.
         filter_path (str | None): The full domain to compare the hyperlinks against.
+        replace (bool): Whether to remove the pages of previous crawls in the same scope not found by this one.
     """
-    logger = app_context.logger
+    from application.embeddings.embedding_generator import EmbeddingGenerator
+
+    def ingest(job: IngestionJob):
+        with EmbeddingGenerator(app_context=app_context, job=job) as embedding_generator:
+            embedding_generator.generate_from_url(url, filter_path, replace=replace)
 
+    app_context.ingestion_job_manager.run_job(job, ingest)
+
+def _create_job(app_context: AppContext, job_type: str, source: str) -> IngestionJob:
     try:
-        logger.debug("Locking router for embedding generation.")
-        router.lock = True
-        embedding_generator = EmbeddingGenerator(app_context=app_context)
-        logger.info("Starting embedding generation process.")
-        embedding_generator.generate_from_url(url, filter_path)
-        logger.info("Embedding generation process finished.")
-    except Exception as e:
-        logger.error(f"Error in background task: {str(e)}")
-    finally:
-        router.lock = False
-        logger.debug("Router unlocked after embedding generation.")
+        return app_context.ingestion_job_manager.create_job(job_type, source)
+    except TooManyIngestionJobsError as ex:
+        raise HTTPException(status_code=409, detail="A process to generate embeddings is already in progress.") from ex
 
 @router.post(
     "/embeddings/generate",
-    response_model=StatusOkResponseSchema,
+    response_model=GenerateEmbeddingsJobOutputSchema,
     status_code=status.HTTP_200_OK,
     tags=["Embeddings"]
 )
@@ -59,8 +84,9 @@ def generate_embeddings_from_url(request: Request, data: GenerateEmbeddingsInput
     Generate embeddings for a given URL. It starts from a single web page and generates embeddings for the text data of that page and
     for every page connected via hyperlinks (anchor tags).
 
-    This method can be run only one at a time, as it uses a lock to prevent multiple requests from starting the process at the same time.
-    If a process is already in progress, it will return a 409 status code (Conflict).
+    The process runs as a job, whose ID is returned: its status and progress can be read from `/embeddings/jobs/{jobId}`.
+    If the maximum number of jobs is already running, it will return a 409 status code (Conflict). When the worker
+    processes are enabled, the job is queued and run by a worker instead.
 
     The embeddings are generated only from the text of each web page: images, rss and any other webpage with a ContextType different from text/html
     are not included.
@@ -69,6 +95,9 @@ def generate_embeddings_from_url(request: Request, data: GenerateEmbeddingsInput
 
     - url: The URL to generate embeddings from.
     - filterPath: The full domain to compare the hyperlinks against.
+    - replace: Whether to remove, once the crawl is completed, the pages stored by previous crawls of the same scope
+      (the domain, restricted to `filterPath` if set) that have not been found, e.g. because they were removed
+      from the website. Defaults to false.
 
     Args:
         request (Request): The request object.
@@ -81,49 +110,89 @@ def generate_embeddings_from_url(request: Request, data: GenerateEmbeddingsInput
     filter_path = data.filterPath
     request_context.logger.info(f"Generate embeddings request received for url: {url}")
 
-    if not router.lock:
-        background_tasks.add_task(generate_embeddings_from_url_background_task, request_context, url, filter_path)
-        request_context.logger.info("Generation embeddings process started.")
-        return {"statusOk": True}
-    
-    raise HTTPException(status_code=409, detail="A process to generate embeddings is already in progress.")
+    if request_context.configurations.ingestion.worker.enabled:
+        job_id = request_context.ingestion_job_manager.enqueue_job(
+            URL_JOB_TYPE, url, {"url": url, "filterPath": filter_path, "replace": data.replace}
+        )
+        request_context.logger.info(f"Generation embeddings process queued (job {job_id}).")
+        return {"statusOk": True, "jobId": job_id}
+
+    job = _create_job(request_context, URL_JOB_TYPE, url)
+    background_tasks.add_task(
+        generate_embeddings_from_url_background_task, request_context, job, url, filter_path, data.replace
+    )
+    request_context.logger.info(f"Generation embeddings process started (job {job.id}).")
+    return {"statusOk": True, "jobId": job.id}
 
-def generate_embeddings_from_file_background_task(app_context: AppContext, document_generator: Generator[str, None, None]):
+def generate_embeddings_from_file_background_task(
+    app_context: AppContext,
+    job: IngestionJob,
+    document_generator: Generator[ParsedDocument, None, None],
+    upload: UploadFile,
+    replace: bool = False
+):
     """
     Generate embeddings for an uploaded file. 
     
-    This method is intended to be called as a background task. Includes managmement of the lock mechanism
-    of this router, which is locked when the embedding generation process is running, and unlocked when it finishes.
+    This method is intended to be called as a background task. The status and the progress of the process
+    are tracked by the given job.
+
+    The documents are extracted lazily while the embeddings are generated; the copy of the upload is removed
+    once the process finishes.
 
     Args:
         app_context (AppContext): The application context.
-        document_generator (Generator[str, None, None]): The generator, as iterable, of the texts to be evaluated
+        job (IngestionJob): The job of the embedding generation process.
+        document_generator (Generator[ParsedDocument, None, None]): The generator, as iterable, of the documents to be evaluated
+        upload (UploadFile): The copy of the uploaded file the documents are extracted from. Its name is used as source of the generated chunks
+        replace (bool): Whether to remove the chunks of the previous version of the file once the new ones are stored.
     """
-    logger = app_context.logger
+    from application.embeddings.embedding_generator import EmbeddingGenerator
 
-    try:
-        logger.debug("Locking router for embedding generation.")
-        router.lock = True
-        embedding_generator = EmbeddingGenerator(app_context=app_context)
-        logger.info("Starting embedding generation process.")
-        for doc in document_generator:
-            embedding_generator.generate_from_text(doc)
-        logger.info("Embedding generation process finished.")
+    def ingest(job: IngestionJob):
+        with EmbeddingGenerator(app_context=app_context, job=job) as embedding_generator:
+            embedding_generator.generate_from_documents(document_generator, source=upload.filename, replace=replace)
 
-    except Exception as ex:
-        logger.error(ex)
-        logger.error(f"Error in background task: {str(ex)}")
+    try:
+        app_context.ingestion_job_manager.run_job(job, ingest)
     finally:
-        router.lock = False
-        logger.debug("Router unlocked after embedding generation.")
+        document_generator.close()
+        _remove_upload_copy(upload)
+
+def _copy_upload(file: UploadFile, directory: str | None = None) -> UploadFile:
+    """
+    Copy an uploaded file to a temporary file owned by the background task or the worker, as the upload is closed
+    once the response is sent. The content is copied in chunks, without loading it in memory.
+    """
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_file = NamedTemporaryFile(prefix="upload-", dir=directory, delete=False)
+    try:
+        shutil.copyfileobj(file.file, temp_file)
+        temp_file.seek(0)
+    except Exception:
+        temp_file.close()
+        os.remove(temp_file.name)
+        raise
+    return UploadFile(file=temp_file, filename=file.filename, size=file.size, headers=file.headers)
+
+def _remove_upload_copy(upload: UploadFile):
+    upload.file.close()
+    if os.path.exists(upload.file.name):
+        os.remove(upload.file.name)
 
 @router.post(
     "/embeddings/generateFromFile",
-    response_model=StatusOkResponseSchema,
+    response_model=GenerateEmbeddingsJobOutputSchema,
     status_code=status.HTTP_200_OK,
     tags=["Embeddings"]
 )
-def generate_embeddings_from_file(request: Request, background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+def generate_embeddings_from_file(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    replace: bool = Query(False)
+):
     """
     Generate embeddings for a given file. 
     
@@ -138,6 +207,16 @@ def generate_embeddings_from_file(request: Request, background_tasks: Background
         - application/gzip
     Please mind that archive files must contain only files with the aforementioned content types.
 
+    The file is checked before starting the process, while its documents are extracted in background, one at a time,
+    so that the memory used does not depend on the size of the upload. If the uncompressed size of the file exceeds
+    the configured limit, it returns a 413 status code.
+
+    The process runs as a job, whose ID is returned: its status and progress can be read from `/embeddings/jobs/{jobId}`.
+    If the maximum number of jobs is already running, it will return a 409 status code (Conflict). When the worker
+    processes are enabled, the job is queued and run by a worker instead.
+
+    With the `replace` query parameter set to true, the chunks of the previous version of the file (uploaded with
+    the same name) that are not part of the new one are removed once the new chunks are stored.
 
     Args:
         request (Request): The request object.
@@ -147,23 +226,156 @@ def generate_embeddings_from_file(request: Request, background_tasks: Background
     
     request_context: AppContext = request.state.app_context
     request_context.logger.info(f"Generate embeddings request received for file {file.filename} (content type: {file.content_type})")
-    
+
+    worker_configuration = request_context.configurations.ingestion.worker
+    if not worker_configuration.enabled and request_context.ingestion_job_manager.is_full:
+        raise HTTPException(status_code=409, detail="A process to generate embeddings is already in progress.")
+
+    from application.embeddings.file_parser.file_parser import FileParser
+
+    file_parser_configuration = request_context.configurations.ingestion.fileParser
+    file_parser = FileParser(
+        request_context.logger,
+        processes=file_parser_configuration.processes,
+        pages_per_task=file_parser_configuration.pagesPerTask,
+        max_uncompressed_bytes=file_parser_configuration.maxUncompressedBytes
+    )
     try:
-        file_parser = FileParser(request_context.logger)
-        docs = list(file_parser.extract_documents_from_file(file))
+        upload = _copy_upload(file, worker_configuration.uploadsPath if worker_configuration.enabled else None)
+    except Exception as ex:
+        raise HTTPException(status_code=500, detail=f"Error reading file: {str(ex)}") from ex
+
+    try:
+        file_parser.check_file(upload)
     except (BadZipFile, BadGzipFile, TarError) as ex:
+        _remove_upload_copy(upload)
         raise HTTPException(status_code=400, detail="The file uploaded is not a valid archive file.") from ex
     except InvalidFileError as ex:
+        _remove_upload_copy(upload)
         raise HTTPException(status_code=400, detail=str(ex)) from ex
+    except FileTooLargeError as ex:
+        _remove_upload_copy(upload)
+        raise HTTPException(status_code=413, detail=str(ex)) from ex
     except Exception as ex:
+        _remove_upload_copy(upload)
         raise HTTPException(status_code=500, detail=f"Error parsing file: {str(ex)}") from ex
 
-    if not router.lock:
-        background_tasks.add_task(generate_embeddings_from_file_background_task, request_context, docs)
-        request_context.logger.info("Generation embeddings process started.")
-        return {"statusOk": True}
-    
-    raise HTTPException(status_code=409, detail="A process to generate embeddings is already in progress.")
+    if worker_configuration.enabled:
+        # The copy of the upload, in the directory shared with the workers, is removed by the worker once the job is finished
+        upload.file.close()
+        try:
+            job_id = request_context.ingestion_job_manager.enqueue_job(
+                FILE_JOB_TYPE,
+                file.filename,
+                {"path": upload.file.name, "fileName": file.filename, "contentType": file.content_type, "replace": replace}
+            )
+        except Exception:
+            _remove_upload_copy(upload)
+            raise
+        request_context.logger.info(f"Generation embeddings process queued (job {job_id}).")
+        return {"statusOk": True, "jobId": job_id}
+
+    try:
+        job = _create_job(request_context, FILE_JOB_TYPE, file.filename)
+    except Exception:
+        _remove_upload_copy(upload)
+        raise
+
+    docs = file_parser.extract_documents_from_file(upload)
+    background_tasks.add_task(generate_embeddings_from_file_background_task, request_context, job, docs, upload, replace)
+    request_context.logger.info(f"Generation embeddings process started (job {job.id}).")
+    return {"statusOk": True, "jobId": job.id}
+
+def rebuild_collection_background_task(app_context: AppContext, job: IngestionJob, data: RebuildCollectionInputSchema):
+    """
+    Rebuild the collection into a new version, served once validated.
+
+    This method is intended to be called as a background task. The status and the progress of the process
+    are tracked by the given job.
+
+    Args:
+        app_context (AppContext): The application context.
+        job (IngestionJob): The job of the rebuild.
+        data (RebuildCollectionInputSchema): The URLs to crawl, and whether the uploaded files are included.
+    """
+    from application.embeddings.collection_rebuilder import CollectionRebuilder
+
+    def ingest(job: IngestionJob):
+        collection_rebuilder = CollectionRebuilder(app_context=app_context, job=job)
+        collection_rebuilder.rebuild([(url.url, url.filterPath) for url in data.urls], include_files=data.includeFiles)
+
+    app_context.ingestion_job_manager.run_job(job, ingest)
+
+@router.post(
+    "/embeddings/rebuild",
+    response_model=GenerateEmbeddingsJobOutputSchema,
+    status_code=status.HTTP_200_OK,
+    tags=["Embeddings"]
+)
+def rebuild_collection(request: Request, data: RebuildCollectionInputSchema, background_tasks: BackgroundTasks):
+    """
+    Rebuild the collection, e.g. after changing the embeddings model or the chunking, without serving a half-built index.
+
+    A new version of the collection is built in background, while queries keep reading the live one through the alias
+    with the configured collection name; once the new version is validated (number of points and sample searches),
+    the alias is switched to it and the old versions are deleted.
+
+    The POST requests require a body that includes:
+
+    - urls: The URLs to crawl again, each with its optional `filterPath`.
+    - includeFiles: Whether the documents stored from the uploaded files of the live collection are chunked again.
+      Defaults to true.
+
+    The process runs as a job, whose ID is returned: its status and progress can be read from `/embeddings/jobs/{jobId}`.
+    If the maximum number of jobs is already running, it will return a 409 status code (Conflict).
+
+    Args:
+        request (Request): The request object.
+        data (RebuildCollectionInputSchema): The input schema.
+        background_tasks (BackgroundTasks): The background tasks object.
+    """
+    request_context: AppContext = request.state.app_context
+    collection_name = request_context.configurations.vectorStore.collectionName
+    request_context.logger.info(f"Rebuild request received for collection {collection_name}")
+
+    if request_context.configurations.ingestion.worker.enabled:
+        job_id = request_context.ingestion_job_manager.enqueue_job(
+            REBUILD_JOB_TYPE, collection_name, data.model_dump()
+        )
+        request_context.logger.info(f"Rebuild process queued (job {job_id}).")
+        return {"statusOk": True, "jobId": job_id}
+
+    job = _create_job(request_context, REBUILD_JOB_TYPE, collection_name)
+    background_tasks.add_task(rebuild_collection_background_task, request_context, job, data)
+    request_context.logger.info(f"Rebuild process started (job {job.id}).")
+    return {"statusOk": True, "jobId": job.id}
+
+@router.delete(
+    "/embeddings/sources",
+    response_model=DeleteSourceOutputSchema,
+    status_code=status.HTTP_200_OK,
+    tags=["Embeddings"]
+)
+def delete_embeddings_source(request: Request, source: str | None = Query(None), prefix: str | None = Query(None)):
+    """
+    Delete the chunks of an indexed source, with exactly one of the query parameters:
+
+    - source: The URL of a page or the name of an uploaded file, whose chunks are deleted.
+    - prefix: A URL prefix (e.g. "https://example.com/docs"): the chunks of all the pages whose URL starts with it,
+      at a path segment boundary, are deleted.
+
+    The crawl state of the deleted pages is removed as well, so that a following crawl ingests them again.
+    It returns a 400 status code if neither or both parameters are set.
+    """
+    request_context: AppContext = request.state.app_context
+    if (source is None) == (prefix is None):
+        raise HTTPException(status_code=400, detail="Exactly one of \"source\" and \"prefix\" must be set.")
+
+    from application.embeddings.source_manager import SourceManager
+
+    source_manager = SourceManager(request_context)
+    deleted_chunks = source_manager.delete_sources([source]) if source is not None else source_manager.delete_prefix(prefix)
+    return {"statusOk": True, "deletedChunks": deleted_chunks}
 
 @router.get(
     "/embeddings/status",
@@ -171,11 +383,76 @@ def generate_embeddings_from_file(request: Request, background_tasks: Background
     status_code=status.HTTP_200_OK,
     tags=["Embeddings"]
 )
-def embeddings_status():
+def embeddings_status(request: Request):
     """
     Get the status of the embeddings generation process.
 
     Returns:
-        dict: A `status` object that can be either "running" (if a process is ongoing) or "idle" (if the service is ready).
+        dict: A `status` object that can be either "running" (if a process is ongoing) or "idle" (if the service is ready),
+            and the IDs of the `runningJobs`.
+    """
+    request_context: AppContext = request.state.app_context
+    running_jobs = [job.id for job in request_context.ingestion_job_manager.active_jobs]
+    return {"status": "running" if running_jobs else "idle", "runningJobs": running_jobs}
+
+def _parse_job_id(job_id: str) -> str:
+    try:
+        return str(uuid.UUID(job_id))
+    except ValueError as ex:
+        raise HTTPException(status_code=404, detail="Job not found.") from ex
+
+@router.get(
+    "/embeddings/jobs",
+    response_model=IngestionJobsListOutputSchema,
+    status_code=status.HTTP_200_OK,
+    tags=["Embeddings"]
+)
+def list_embeddings_jobs(request: Request, limit: int = Query(50, ge=1, le=500)):
+    """
+    List the most recent embeddings generation jobs, with their status and progress.
+    """
+    request_context: AppContext = request.state.app_context
+    return {"jobs": request_context.ingestion_job_manager.list_jobs(limit)}
+
+@router.get(
+    "/embeddings/jobs/{job_id}",
+    response_model=IngestionJobOutputSchema,
+    status_code=status.HTTP_200_OK,
+    tags=["Embeddings"]
+)
+def get_embeddings_job(request: Request, job_id: str):
+    """
+    Get the status and the progress (pages read, chunks and tokens embedded, errors) of an embeddings generation job.
     """
-    return {"status": "running" if router.lock else "idle"}
+    request_context: AppContext = request.state.app_context
+    job = request_context.ingestion_job_manager.get_job(_parse_job_id(job_id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+@router.post(
+    "/embeddings/jobs/{job_id}/cancel",
+    response_model=StatusOkResponseSchema,
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["Embeddings"]
+)
+def cancel_embeddings_job(request: Request, job_id: str):
+    """
+    Request the cancellation of an embeddings generation job. The job stops as soon as possible, keeping
+    the embeddings already stored.
+
+    It returns a 409 status code (Conflict) if the job has already finished.
+    """
+    request_context: AppContext = request.state.app_context
+    job_manager = request_context.ingestion_job_manager
+    job_id = _parse_job_id(job_id)
+
+    if job_manager.cancel_job(job_id):
+        return {"statusOk": True}
+
+    job = job_manager.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if job["status"] in FINAL_STATUSES:
+        raise HTTPException(status_code=409, detail=f"The job has already finished with status \"{job['status']}\".")
+    raise HTTPException(status_code=409, detail="The job cannot be cancelled.")
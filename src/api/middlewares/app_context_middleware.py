@@ -1,16 +1,19 @@
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from context import AppContext
+from infrastracture.startup_profiler import StartupProfiler
 
 
 class AppContextMiddleware(BaseHTTPMiddleware):
     """
-    Middleware to inject a custom application context into the Starlette app state
+    Middleware to inject a custom application context into the Starlette app state.
+    If a startup profiler is given, the first request (excluding the health and metrics endpoints) is recorded by it.
     """
 
-    def __init__(self, app, app_context: AppContext):
+    def __init__(self, app, app_context: AppContext, startup_profiler: StartupProfiler | None = None):
         super().__init__(app)
         self.app_context = app_context
+        self.startup_profiler = startup_profiler
 
     async def dispatch(self, request, call_next):
         excluded_paths = [
@@ -20,6 +23,8 @@ class AppContextMiddleware(BaseHTTPMiddleware):
         ]
 
         if request.url.path not in excluded_paths:
+            if self.startup_profiler is not None and request.url.path != '/-/metrics':
+                self.startup_profiler.record_first_request(request.state.logger, self.app_context.metrics_manager)
             request.state.app_context = self.app_context.create_request_context(
                 request.state.logger,
                 request=request
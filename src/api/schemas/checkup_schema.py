@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import Dict
+
+from pydantic import BaseModel
+
+
+class DependencyHealthSchema(BaseModel):
+    """
+    The Dependency Health scheme describes the result of the last health check of a dependency
+    """
+
+    healthy: bool
+    latencyMs: float | None = None
+    checkedAt: datetime | None = None
+    error: str | None = None
+
+
+class CheckUpResponseSchema(BaseModel):
+    """
+    The Check Up Response scheme describes the response of the check-up endpoint
+    """
+
+    statusOk: bool
+    ready: bool
+    dependencies: Dict[str, DependencyHealthSchema]
+    circuitBreakers: Dict[str, str]
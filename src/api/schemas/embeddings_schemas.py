@@ -1,10 +1,20 @@
-from typing import Any, Dict, Literal
+from datetime import datetime
+from typing import Any, Dict, List, Literal
 from pydantic import BaseModel
 
 
 class GenerateEmbeddingsInputSchema(BaseModel):
     url: str
     filterPath: str | None = None
+    replace: bool = False
+
+class RebuildUrlSchema(BaseModel):
+    url: str
+    filterPath: str | None = None
+
+class RebuildCollectionInputSchema(BaseModel):
+    urls: List[RebuildUrlSchema] = []
+    includeFiles: bool = True
 
 class GenerateEmbeddingsOutputSchema(BaseModel):
     state: str
@@ -12,3 +22,31 @@ class GenerateEmbeddingsOutputSchema(BaseModel):
 
 class GenerateStatusOutputSchema(BaseModel):
     status: Literal["running", "idle"]
+    runningJobs: List[str] = []
+
+class GenerateEmbeddingsJobOutputSchema(BaseModel):
+    statusOk: bool
+    jobId: str
+
+class DeleteSourceOutputSchema(BaseModel):
+    statusOk: bool
+    deletedChunks: int
+
+class IngestionJobOutputSchema(BaseModel):
+    id: str
+    type: Literal["url", "file", "rebuild"]
+    source: str
+    status: Literal["queued", "running", "completed", "failed", "cancelled"]
+    pages: int
+    chunks: int
+    tokens: int
+    errors: int
+    duplicates: int = 0
+    dedupRatio: float = 0.0
+    error: str | None = None
+    createdAt: datetime | None = None
+    startedAt: datetime | None = None
+    finishedAt: datetime | None = None
+
+class IngestionJobsListOutputSchema(BaseModel):
+    jobs: List[IngestionJobOutputSchema]
@@ -1,22 +1,49 @@
-import uvicorn
-from fastapi import FastAPI
-
-from api.controllers.chat import chat_handler
-from api.controllers.chat_completions import chat_completions_handler
-from api.controllers.core.checkup import checkup_handler
-from api.controllers.core.liveness import liveness_handler
-from api.controllers.core.readiness import readiness_handler
-from api.controllers.core.metrics import metrics_handler
-from api.controllers.embeddings import embeddings_handler
-from api.middlewares.app_context_middleware import AppContextMiddleware
-from api.middlewares.logger_middleware import LoggerMiddleware
-from configurations.configuration import get_configuration
-from configurations.variables import get_variables
-from context import AppContext, AppContextParams
-from helpers.sql_storage import SqlStorage
-from infrastracture.logger import get_logger
-from infrastracture.metrics.manager import MetricsManager
-from helpers.vector_search_index_updater import VectorStoreInitializer
+from infrastracture.startup_profiler import StartupProfiler
+
+# The startup profiler is created first, to measure the import of the other modules
+startup_profiler = StartupProfiler()
+
+with startup_profiler.measure("web framework imports"):
+    import uvicorn
+    from fastapi import FastAPI, Request, status
+    from fastapi.responses import JSONResponse
+
+with startup_profiler.measure("api imports"):
+    from api.controllers.chat import chat_handler
+    from api.controllers.chat_completions import chat_completions_handler
+    from api.controllers.core.checkup import checkup_handler
+    from api.controllers.core.liveness import liveness_handler
+    from api.controllers.core.readiness import readiness_handler
+    from api.controllers.core.metrics import metrics_handler
+    from api.controllers.embeddings import embeddings_handler
+    from api.middlewares.app_context_middleware import AppContextMiddleware
+    from api.middlewares.logger_middleware import LoggerMiddleware
+
+with startup_profiler.measure("application imports"):
+    from application.embeddings.file_parser.pdf_process_pool import shutdown_pdf_process_pool, start_pdf_process_pool
+    from application.embeddings.ingestion_jobs import IngestionJobManager
+    from configurations.configuration import get_configuration
+    from configurations.variables import get_variables
+    from context import AppContext, AppContextParams
+    from helpers.sql_storage import SqlStorage
+    from helpers.vector_search_index_updater import VectorStoreInitializer
+
+with startup_profiler.measure("infrastructure imports"):
+    from infrastracture.circuit_breaker.circuit_breaker import CircuitBreakerManager
+    from infrastracture.circuit_breaker.errors import CircuitOpenError
+    from infrastracture.connection_pool_manager.connection_pool_manager import ConnectionPoolManager
+    from infrastracture.health_manager.health_manager import HealthManager
+    from infrastracture.logger import get_logger
+    from infrastracture.metrics.manager import MetricsManager
+    from infrastracture.resources_manager.resources_manager import ResourcesManager
+
+async def circuit_open_exception_handler(request: Request, exc: CircuitOpenError) -> JSONResponse:
+    """Answer the requests failed fast by an open circuit breaker with 503, telling when to retry."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(int(exc.retry_after), 1))}
+    )
 
 
 def create_app(context: AppContext) -> FastAPI:
@@ -27,8 +54,14 @@ def create_app(context: AppContext) -> FastAPI:
         version="1.0.0"
     )
 
-    application.add_middleware(AppContextMiddleware, app_context=context)
+    # The health endpoints do not receive a request context, they read the shared managers from the application state
+    application.state.app_context = context
+    application.add_middleware(AppContextMiddleware, app_context=context, startup_profiler=startup_profiler)
     application.add_middleware(LoggerMiddleware, logger=context.logger)
+    application.add_exception_handler(CircuitOpenError, circuit_open_exception_handler)
+    # The pool of asynchronous connections to the database is bound to the event loop of the server
+    application.add_event_handler("startup", context.connection_pool_manager.open_async)
+    application.add_event_handler("shutdown", context.connection_pool_manager.close_async)
 
     application.include_router(liveness_handler.router)
     application.include_router(readiness_handler.router)
@@ -43,26 +76,54 @@ def create_app(context: AppContext) -> FastAPI:
 
 logger = get_logger()
 metrics_manager = MetricsManager()
-env_vars = get_variables(logger)
-configurations = get_configuration(env_vars.CONFIGURATION_PATH, logger)
-
-app_context = AppContext(
-    params=AppContextParams(
-        logger=logger,
-        metrics_manager=metrics_manager,
-        env_vars=env_vars,
-        configurations=configurations
-    )
+with startup_profiler.measure("configuration load"):
+    env_vars = get_variables(logger)
+    configurations = get_configuration(env_vars.CONFIGURATION_PATH, logger)
+
+# The processes extracting the PDF files are forked before any thread is started; with the worker processes
+# enabled, the uploaded files are extracted by the workers
+if not configurations.ingestion.worker.enabled:
+    with startup_profiler.measure("pdf process pool start"):
+        start_pdf_process_pool(configurations.ingestion.fileParser.processes)
+
+app_context_params = AppContextParams(
+    logger=logger,
+    metrics_manager=metrics_manager,
+    env_vars=env_vars,
+    configurations=configurations
 )
+# The connections to the database are borrowed from a pool shared by all the requests
+app_context_params.connection_pool_manager = ConnectionPoolManager(AppContext(params=app_context_params))
+# The circuit breakers of the dependencies are shared by all the requests, and used by the shared resources
+app_context_params.circuit_breaker_manager = CircuitBreakerManager(AppContext(params=app_context_params))
+# The ingestion job manager uses the context to access the database, through the pool and the circuit breaker
+# created above, and it is shared by all the requests
+app_context_params.ingestion_job_manager = IngestionJobManager(AppContext(params=app_context_params))
+# The resources shared by the requests are warmed up at startup, and the health of the dependencies is checked in background
+app_context_params.resources_manager = ResourcesManager(AppContext(params=app_context_params))
+app_context_params.health_manager = HealthManager(AppContext(params=app_context_params))
+app_context = AppContext(params=app_context_params)
 
 app = create_app(app_context)
 
-vector_store_initializer = VectorStoreInitializer(app_context)
-vector_store_initializer.init_collection()
+with startup_profiler.measure("collection initialization"):
+    vector_store_initializer = VectorStoreInitializer(app_context)
+    vector_store_initializer.init_collection()
 
 # Ensure SQL tables exist:
-sql_storage = SqlStorage(app_context)
-sql_storage.create_tables()
+with startup_profiler.measure("tables creation"):
+    app_context.connection_pool_manager.open()
+    sql_storage = SqlStorage(app_context)
+    sql_storage.create_tables()
+
+# The jobs abandoned by a previous run are marked as failed, and the heartbeat of the jobs of this process is started
+app_context.ingestion_job_manager.start()
+
+# The service is ready once the warmup is completed
+app_context.resources_manager.start_warmup()
+app_context.health_manager.start()
+
+startup_profiler.report(logger, metrics_manager)
 
 uvicorn.run(
     app,
@@ -70,3 +131,6 @@ uvicorn.run(
     port=int(app_context.env_vars.PORT),
     log_level='error'
 )
+
+app_context.connection_pool_manager.close()
+shutdown_pdf_process_pool()
@@ -15,7 +15,8 @@ class AggregateDocsChunksChain(BaseCombineDocumentsChain):
     tokenizer_model_name: str = "gpt-4o"
     """The language model to use for tokenization."""
 
-    tokenizer: tiktoken.Encoding = tiktoken.encoding_for_model(tokenizer_model_name)
+    tokenizer: tiktoken.Encoding | None = None
+    """The tokenizer, loaded from `tokenizer_model_name` on first use if not given."""
 
     def acombine_docs(self, docs: List[Document], **kwargs: Any) -> Coroutine[Any, Any, Tuple[str | dict]]:
         return self.combine_docs(docs, **kwargs)
@@ -31,12 +32,17 @@ class AggregateDocsChunksChain(BaseCombineDocumentsChain):
             f"Combined text length: {token_count} tokens")
         return combined_text, {}
 
+    def _get_tokenizer(self) -> tiktoken.Encoding:
+        if self.tokenizer is None:
+            self.tokenizer = tiktoken.encoding_for_model(self.tokenizer_model_name)
+        return self.tokenizer
+
     def _aggregate_docs_until_token_limit(self, docs):
         combined_text = ''
         token_count = 0
         limit_exceeded = False
         for doc in docs:
-            new_tokens = self.tokenizer.encode(doc.page_content)
+            new_tokens = self._get_tokenizer().encode(doc.page_content)
             if token_count + len(new_tokens) > self.aggregate_max_token_number:
                 limit_exceeded = True
                 break
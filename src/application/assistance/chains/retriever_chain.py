@@ -5,10 +5,11 @@ from langchain.chains.base import Chain
 from langchain_core.callbacks import CallbackManagerForChainRun
 from langchain_core.embeddings import Embeddings
 from langchain_core.runnables import RunnableConfig
-from langchain_qdrant import FastEmbedSparse, QdrantVectorStore, RetrievalMode
+from langchain_qdrant import QdrantVectorStore
 from pydantic import BaseModel, create_model
 
 from context import AppContext
+from infrastracture.circuit_breaker.errors import CircuitOpenError
 
 
 @dataclass
@@ -65,28 +66,32 @@ class RetrieverChain(Chain):
             )},  # type: ignore[call-overload]
         )
 
-    def _setup_vector_search(self):
-        sparse_embeddings = FastEmbedSparse(model_name="Qdrant/bm25")
-
-        return QdrantVectorStore.from_existing_collection(
-            url=self.context.env_vars.VECTOR_DB_CLUSTER_URI,
-            api_key=self.context.env_vars.VECTOR_DB_API_KEY,
-            collection_name=self.configuration.collection_name,
-            embedding=self.configuration.embeddings,
-            sparse_embedding=sparse_embeddings,
-            vector_name=self.configuration.embedding_key,
-            sparse_vector_name=self.configuration.text_key,
-            retrieval_mode=RetrievalMode.HYBRID
-        )
+    def _setup_vector_search(self) -> QdrantVectorStore:
+        # The vector store, with the sparse embeddings model and the metadata of the collection, is shared by all the requests
+        return self.context.resources_manager.vector_store
 
     def _call(self, inputs: Dict[str, Any], run_manager: CallbackManagerForChainRun | None = None) -> Dict[str, Any]:
         query = inputs[self.query_key]
         vector_search = self._setup_vector_search()
-        result = vector_search.similarity_search(
-            query,
-            k=self.configuration.max_number_of_results,
-            # score_threshold=0.6
-        )
+        circuit_breaker_manager = self.context.circuit_breaker_manager
+        if circuit_breaker_manager is None:
+            result = vector_search.similarity_search(query, k=self.configuration.max_number_of_results)
+            return {self.output_key: result}
+
+        try:
+            result = circuit_breaker_manager.qdrant.call(
+                vector_search.similarity_search,
+                query,
+                k=self.configuration.max_number_of_results,
+                # score_threshold=0.6
+            )
+        except CircuitOpenError:
+            if not circuit_breaker_manager.degraded_mode:
+                raise
+            # Degraded mode: the LLM answers without the documentation while the vector store is unavailable
+            self.context.logger.warning("The vector store is unavailable, answering without retrieval context.")
+            self.context.metrics_manager.degraded_responses.inc()
+            result = []
         return {
             self.output_key: result
         }
@@ -11,8 +11,6 @@ from application.assistance.chains.combine_docs_chain import \
 from application.assistance.chains.retriever_chain import (
     RetrieverChainConfiguration, RetrieverChain)
 from context import AppContext
-from infrastracture.embeddings_manager.embeddings_manager import EmbeddingsManager
-from infrastracture.llm_manager.llm_manager import LlmManager
 
 
 @dataclass
@@ -42,10 +40,11 @@ class AssistantService:
         self._setup_assistant()
 
     def _init_embeddings(self):
-        return EmbeddingsManager(self.app_context).get_embeddings_instance()
+        # The clients are shared by all the requests, and created at startup by the warmup
+        return self.app_context.resources_manager.embeddings
 
     def _init_llm(self):
-        return LlmManager(self.app_context).get_llm_instance()
+        return self.app_context.resources_manager.llm
 
     def _init_retriever_chain(self, embeddings: Embeddings):
         """
@@ -90,6 +89,7 @@ class AssistantService:
         return AggregateDocsChunksChain(
             context=self.app_context,
             tokenizer_model_name=tokenizer_config.name,
+            tokenizer=self.app_context.resources_manager.tokenizer,
             aggregate_max_token_number=chain_config.aggregateMaxTokenNumber
         )
 
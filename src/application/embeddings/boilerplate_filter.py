@@ -0,0 +1,120 @@
+"""
+Module providing the BoilerplateFilter class, which removes the blocks of text repeated across the pages of a website.
+"""
+
+import hashlib
+import threading
+from collections import Counter
+from typing import Any, Callable, List, Tuple
+
+# The size, in bytes, of the fingerprint of a block
+FINGERPRINT_SIZE = 8
+
+
+class BoilerplateFilter:
+    """
+    Detects the blocks of text (the lines of the text extracted from a page) repeated on many pages of a crawl,
+    such as headers, menus, cookie banners and footers, and strips them from the pages before chunking.
+
+    Each page registers the fingerprints of its blocks with `add_page`, or, when it has not changed since the last
+    crawl and is not parsed again, with `add_fingerprints`, from the fingerprints returned by `add_page` on the last
+    crawl. A block found on more than `threshold` of the pages is boilerplate. As the frequencies are not reliable on the first pages of a crawl, the first pages are held
+    with `hold` until `min_pages` pages have been registered, and released all together afterwards; the pages still
+    held at the end of the crawl are returned by `release`. With fewer than `min_pages` pages, nothing is stripped.
+
+    The methods can be called from any thread.
+
+    Args:
+        threshold (float): The fraction of the pages a block must be found on to be stripped.
+        min_pages (int): The number of pages registered before blocks are stripped.
+        count_tokens (Callable): Function returning the number of tokens of a text, used to count the tokens saved.
+    """
+
+    def __init__(self, threshold: float, min_pages: int, count_tokens: Callable[[str], int]):
+        self._threshold = threshold
+        self._min_pages = max(min_pages, 2)
+        self._count_tokens = count_tokens
+        self._pages = 0
+        self._block_pages = Counter()
+        self._held: List[Any] = []
+        self._lock = threading.Lock()
+        self.blocks_removed = 0
+        self.tokens_saved = 0
+
+    @staticmethod
+    def _get_fingerprint(block: str) -> bytes:
+        return hashlib.blake2b(block.encode('utf-8'), digest_size=FINGERPRINT_SIZE).digest()
+
+    @property
+    def is_ready(self) -> bool:
+        """Whether enough pages have been registered to strip the boilerplate."""
+        return self._pages >= self._min_pages
+
+    def add_page(self, text: str) -> bytes:
+        """
+        Register the blocks of a page, each block being counted once per page.
+
+        Returns:
+            bytes: The fingerprints of the blocks of the page, to be registered again with `add_fingerprints`.
+        """
+        fingerprints = sorted({self._get_fingerprint(block) for block in text.split("\n") if block.strip()})
+        with self._lock:
+            self._pages += 1
+            self._block_pages.update(fingerprints)
+        return b"".join(fingerprints)
+
+    def add_fingerprints(self, fingerprints: bytes):
+        """Register the blocks of a page from the fingerprints returned by `add_page`."""
+        with self._lock:
+            self._pages += 1
+            self._block_pages.update(
+                bytes(fingerprints[start:start + FINGERPRINT_SIZE])
+                for start in range(0, len(fingerprints), FINGERPRINT_SIZE)
+            )
+
+    def hold(self, item: Any) -> List[Any]:
+        """
+        Hold an item until enough pages have been registered.
+
+        Returns:
+            list: The items to be processed now: none if the item is held, otherwise the item and the ones held so far.
+        """
+        with self._lock:
+            if not self.is_ready:
+                self._held.append(item)
+                return []
+            items, self._held = self._held + [item], []
+            return items
+
+    def release(self) -> List[Any]:
+        """Return the items still held, e.g. at the end of the crawl."""
+        with self._lock:
+            items, self._held = self._held, []
+            return items
+
+    def strip(self, text: str) -> Tuple[str, int]:
+        """
+        Remove the boilerplate blocks from the text of a page.
+
+        Returns:
+            tuple: The text without the boilerplate, and the number of tokens removed.
+        """
+        with self._lock:
+            if not self.is_ready:
+                return text, 0
+            min_count = self._threshold * self._pages
+            blocks, removed = [], []
+            for block in text.split("\n"):
+                count = self._block_pages[self._get_fingerprint(block)]
+                if count > 1 and count > min_count:
+                    removed.append(block)
+                else:
+                    blocks.append(block)
+
+        if not removed:
+            return text, 0
+        tokens = self._count_tokens("\n".join(removed))
+        with self._lock:
+            self.blocks_removed += len(removed)
+            self.tokens_saved += tokens
+        return "\n".join(blocks), tokens
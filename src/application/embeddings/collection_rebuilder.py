@@ -0,0 +1,273 @@
+"""
+Module providing the CollectionRebuilder class, which rebuilds the collection into a new version served through an alias.
+"""
+
+import re
+from typing import Iterator, List, Tuple
+
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client.models import (
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    FieldCondition,
+    Filter,
+    MatchValue,
+)
+
+from application.embeddings.embedding_generator import EmbeddingGenerator
+from application.embeddings.errors import CollectionValidationError, IngestionCancelledError
+from application.embeddings.file_parser.parsed_document import ParsedDocument
+from application.embeddings.ingestion_jobs import REBUILD_JOB_TYPE, IngestionJob
+from application.embeddings.source_manager import SCROLL_LIMIT, get_source_prefixes
+from constants import SOURCE_PAYLOAD_KEY
+from context import AppContext
+from helpers.sql_storage import SqlStorage
+from helpers.vector_search_index_updater import VectorStoreInitializer, get_collection_version_name
+
+# Number of stored documents of an uploaded file read by each query
+FILE_DOCUMENTS_PAGE_SIZE = 100
+
+
+def get_rebuild_version(job_id: str) -> str:
+    """
+    Get the version of the collection built by a rebuild job: a job put back in the queue resumes the same version.
+    """
+    return job_id.replace("-", "")[:12]
+
+
+class CollectionRebuilder:
+    """
+    Rebuilds the collection, e.g. after changing the embeddings model or the chunking, without serving
+    a half-built index.
+
+    The configured collection name is an alias, pointing to a version of the collection. A rebuild writes
+    a new version (`<collectionName>_v<version>`) in the background, crawling the given URLs again and chunking again
+    the documents stored from the uploaded files of the live version. The new version is then validated, comparing
+    its number of points with the live one and searching a sample of the live chunks in it, and the alias is switched
+    to it with a single atomic operation: queries read either the old or the new version, never a partial one.
+    Finally the crawl state and the chunk signatures of the new version take the alias name, and the versions no longer
+    needed are deleted.
+
+    Args:
+        app_context (AppContext): The application context.
+        job (IngestionJob): The job of the rebuild, whose ID identifies the new version.
+    """
+
+    def __init__(self, app_context: AppContext, job: IngestionJob):
+        self.logger = app_context.logger
+        self._app_context = app_context
+        self._job = job
+        self._configuration = app_context.configurations.ingestion.rebuild
+        self._alias_name = app_context.configurations.vectorStore.collectionName
+        self._embedding_key = app_context.configurations.vectorStore.embeddingKey
+        self._version_name = get_collection_version_name(self._alias_name, get_rebuild_version(job.id))
+        self._sql_storage = SqlStorage(app_context)
+        self._vector_store_initializer = VectorStoreInitializer(app_context)
+        self._qdrant_client = app_context.resources_manager.qdrant_client
+
+    def _check_cancelled(self):
+        if self._job.is_cancelled:
+            raise IngestionCancelledError()
+
+    def _get_live_collection(self) -> str | None:
+        """Get the name of the collection currently served, either through the alias or with the alias name."""
+        alias_target = self._vector_store_initializer.get_alias_target(self._alias_name)
+        if alias_target is not None:
+            return alias_target
+        return self._alias_name if self._qdrant_client.collection_exists(self._alias_name) else None
+
+    def _get_file_sources(self, collection_name: str) -> List[str]:
+        """Get the sources of the chunks of the uploaded files, i.e. the sources that are not URLs."""
+        sources = set()
+        offset = None
+        while True:
+            points, offset = self._qdrant_client.scroll(
+                collection_name=collection_name,
+                limit=SCROLL_LIMIT,
+                offset=offset,
+                with_payload=[SOURCE_PAYLOAD_KEY],
+                with_vectors=False
+            )
+            sources.update(
+                point.payload[QdrantVectorStore.METADATA_KEY]["source"] for point in points
+                if not get_source_prefixes(point.payload[QdrantVectorStore.METADATA_KEY]["source"])
+            )
+            if offset is None:
+                return sorted(sources)
+
+    def _read_file_documents(self, source: str) -> Iterator[ParsedDocument]:
+        """Read, in order, the documents stored from the last upload of a file, as the file itself is not kept."""
+        position = -1
+        while True:
+            rows = self._sql_storage.read_file_documents(self._alias_name, source, position, FILE_DOCUMENTS_PAGE_SIZE)
+            for position, text, file_name, page, markdown in rows:
+                yield ParsedDocument(text=text, file_name=file_name, page=page, markdown=markdown)
+            if len(rows) < FILE_DOCUMENTS_PAGE_SIZE:
+                return
+
+    def _carry_over_file_sources(self, live_collection: str, sources: List[str]):
+        """
+        Copy unchanged the chunks of the uploaded files without stored documents (uploaded before the documents were
+        stored), which cannot be chunked again. They are dropped if the vectors of the new version changed.
+        """
+        live_params = self._qdrant_client.get_collection(live_collection).config.params
+        version_params = self._qdrant_client.get_collection(self._version_name).config.params
+        if (live_params.vectors, live_params.sparse_vectors) != (version_params.vectors, version_params.sparse_vectors):
+            self.logger.warning(
+                f"Rebuilding collection {self._version_name}: the chunks of {len(sources)} uploaded files without stored "
+                f"documents are not carried over, as the vectors changed: upload them again. Files: {', '.join(sources)}."
+            )
+            return
+
+        self.logger.warning(
+            f"Rebuilding collection {self._version_name}: carrying over unchanged the chunks of {len(sources)} uploaded "
+            f"files without stored documents: upload them again to chunk them again. Files: {', '.join(sources)}."
+        )
+        for source in sources:
+            self._check_cancelled()
+            self._vector_store_initializer.copy_points(
+                live_collection,
+                self._version_name,
+                Filter(must=[FieldCondition(key=SOURCE_PAYLOAD_KEY, match=MatchValue(value=source))])
+            )
+
+    def _build(self, urls: List[Tuple[str, str | None]], live_collection: str | None, include_files: bool):
+        if not self._qdrant_client.collection_exists(self._version_name):
+            self._vector_store_initializer.create_collection(self._version_name)
+        else:
+            self.logger.info(f"Resuming the rebuild of collection {self._version_name}.")
+
+        for url, filter_path in urls:
+            self._check_cancelled()
+            self.logger.info(f"Rebuilding collection {self._version_name}: crawling {url}...")
+            with EmbeddingGenerator(self._app_context, job=self._job, collection_name=self._version_name) as generator:
+                generator.generate_from_url(url, filter_path)
+
+        if include_files and live_collection is not None:
+            stored_sources = set(self._sql_storage.list_file_document_sources(self._alias_name))
+            for source in sorted(stored_sources):
+                self._check_cancelled()
+                self.logger.info(f"Rebuilding collection {self._version_name}: chunking again the documents of {source}...")
+                with EmbeddingGenerator(self._app_context, job=self._job, collection_name=self._version_name) as generator:
+                    generator.generate_from_documents(self._read_file_documents(source), source=source)
+
+            unstored_sources = [source for source in self._get_file_sources(live_collection) if source not in stored_sources]
+            if unstored_sources:
+                self._carry_over_file_sources(live_collection, unstored_sources)
+
+    def _validate(self, live_collection: str | None):
+        """
+        Check the new version against the live one: it must have enough points, and the sources of a sample
+        of live chunks must be found by searching their text in the new version.
+        """
+        points = self._qdrant_client.count(collection_name=self._version_name, exact=True).count
+        live_points = self._qdrant_client.count(collection_name=live_collection, exact=True).count if live_collection else 0
+        self.logger.info(f"Rebuilt collection {self._version_name}: {points} points, {live_points} in the live collection.")
+        if points == 0:
+            raise CollectionValidationError(self._version_name, "the collection is empty.")
+        if points < self._configuration.minPointsRatio * live_points:
+            raise CollectionValidationError(
+                self._version_name,
+                f"{points} points, fewer than {self._configuration.minPointsRatio:.0%} of the {live_points} points of the live collection."
+            )
+        if not live_points or self._configuration.sampleSize <= 0:
+            return
+
+        samples, _ = self._qdrant_client.scroll(
+            collection_name=live_collection,
+            limit=self._configuration.sampleSize,
+            with_payload=True,
+            with_vectors=False
+        )
+        embeddings = self._app_context.resources_manager.embeddings
+        vectors = embeddings.embed_documents([sample.payload[QdrantVectorStore.CONTENT_KEY] for sample in samples])
+        found = 0
+        for sample, vector in zip(samples, vectors):
+            results = self._qdrant_client.query_points(
+                collection_name=self._version_name,
+                query=vector,
+                using=self._embedding_key,
+                limit=self._configuration.sampleTopK,
+                with_payload=[SOURCE_PAYLOAD_KEY]
+            ).points
+            source = sample.payload[QdrantVectorStore.METADATA_KEY]["source"]
+            if any(result.payload[QdrantVectorStore.METADATA_KEY]["source"] == source for result in results):
+                found += 1
+
+        recall = found / len(samples)
+        self.logger.info(f"Rebuilt collection {self._version_name}: {found} of {len(samples)} sample searches found their source.")
+        if recall < self._configuration.minSampleRecall:
+            raise CollectionValidationError(
+                self._version_name,
+                f"the sample searches found their source {recall:.0%} of the times, less than {self._configuration.minSampleRecall:.0%}."
+            )
+
+    def _swap(self, live_collection: str | None):
+        """Point the alias to the new version, and give its state the alias name."""
+        operations = [
+            CreateAliasOperation(create_alias=CreateAlias(collection_name=self._version_name, alias_name=self._alias_name))
+        ]
+        if live_collection is not None:
+            operations.insert(0, DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=self._alias_name)))
+        self._qdrant_client.update_collection_aliases(change_aliases_operations=operations)
+        self._sql_storage.move_collection_state(self._version_name, self._alias_name)
+        self.logger.info(f"Alias {self._alias_name} switched to collection {self._version_name}.")
+
+    def _delete_version(self, collection_name: str):
+        self._qdrant_client.delete_collection(collection_name)
+        self._sql_storage.delete_collection_state(collection_name)
+
+    def _collect_garbage(self, previous_collection: str | None):
+        """
+        Delete the versions of the collection no longer needed: all but the new one, the previous one if it is kept,
+        and the ones being built by other rebuild jobs.
+        """
+        keep = {self._version_name}
+        if self._configuration.keepPreviousVersion and previous_collection is not None:
+            keep.add(previous_collection)
+        keep.update(
+            get_collection_version_name(self._alias_name, get_rebuild_version(job_id))
+            for job_id in self._sql_storage.list_active_ingestion_job_ids(REBUILD_JOB_TYPE)
+        )
+
+        version_pattern = re.compile(rf"^{re.escape(self._alias_name)}_v[0-9a-z]+$")
+        for collection in self._qdrant_client.get_collections().collections:
+            if version_pattern.match(collection.name) and collection.name not in keep:
+                self.logger.info(f"Deleting old version {collection.name} of the collection.")
+                self._delete_version(collection.name)
+
+    def rebuild(self, urls: List[Tuple[str, str | None]], include_files: bool = True):
+        """
+        Build a new version of the collection, and serve it once validated.
+
+        Args:
+            urls (List[Tuple[str, str | None]]): The URLs to crawl, with their filter path.
+            include_files (bool): Whether the documents stored from the uploaded files of the live collection are chunked
+                again in the new version. Defaults to True.
+        """
+        live_collection = self._get_live_collection()
+        if live_collection == self._alias_name:
+            # A collection created before the aliases becomes the first version first, so that it is never deleted
+            # by the swap and is kept or deleted like any previous version
+            self.logger.info(f"Migrating collection {self._alias_name} to the first version behind an alias...")
+            live_collection = self._vector_store_initializer.migrate_legacy_collection(self._alias_name)
+        swapped = False
+        try:
+            self._build(urls, live_collection, include_files)
+            self._check_cancelled()
+            self._validate(live_collection)
+            self._check_cancelled()
+            self._swap(live_collection)
+            swapped = True
+        finally:
+            # A job put back in the queue resumes the same version; a failed or cancelled one discards it
+            if not swapped and not self._job.is_released:
+                self.logger.info(f"Discarding the rebuilt collection {self._version_name}.")
+                try:
+                    self._delete_version(self._version_name)
+                except Exception as ex:
+                    self.logger.warning(f"Unable to delete the rebuilt collection {self._version_name}: {str(ex)}")
+
+        self._collect_garbage(live_collection)
@@ -3,27 +3,98 @@ Module to include the EmbeddingGenerator class, a class that generates embedding
 """
 
 import hashlib
+import re
+import uuid
 from typing import List
+
+import tiktoken
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
-from langchain_experimental.text_splitter import SemanticChunker
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from application.embeddings.markdown_chunker import MarkdownChunker
+
+# Strategies used to split the texts into chunks
+TOKENS_STRATEGY = "tokens"
+CHARACTERS_STRATEGY = "characters"
+SEMANTIC_STRATEGY = "semantic"
+
+# Separators tried in order to split a text: paragraphs, lines, sentences, words
+SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+# Regex pattern to match a sequence of blank lines
+BLANK_LINES_PATTERN = re.compile(r"\n[ \t]*(?:\n[ \t]*)+")
+
 
 class DocumentChunker():
     """
     Initialize the DocumentChunker class.
+
+    Texts are split with one of the following strategies:
+    - `tokens`: recursively on paragraphs, lines, sentences and words, with chunk size and overlap measured in tokens
+      of the given tokenizer, so that chunks have a similar size regardless of the language or the kind of text;
+    - `characters`: as `tokens`, with chunk size and overlap measured in characters;
+    - `semantic`: on the breakpoints between sentences whose embeddings differ the most. Chunk size and overlap are
+      ignored, and each text is embedded sentence by sentence while being split.
+
+    Markdown texts are split following their heading hierarchy (see `MarkdownChunker`), with chunks up to the chunk
+    size (in tokens for the `semantic` strategy), falling back to the strategy for the paragraphs longer than a chunk.
+
+    Args:
+        embedding (Embeddings): The embeddings model, used by the `semantic` strategy.
+        tokenizer (tiktoken.Encoding | None): The tokenizer used by the `tokens` strategy. Defaults to `cl100k_base`.
+        strategy (str): The strategy used to split the texts.
+        chunk_size (int): The maximum size of a chunk, in tokens or characters.
+        chunk_overlap (int): The size of the overlap between consecutive chunks, in tokens or characters.
     """
 
-    def __init__(self, embedding: Embeddings) -> None:
-        #self._chunker = SemanticChunker(embeddings=embedding, breakpoint_threshold_type='percentile')
-        self._chunker = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, add_start_index=True)
+    def __init__(
+        self,
+        embedding: Embeddings,
+        tokenizer: tiktoken.Encoding | None = None,
+        strategy: str = TOKENS_STRATEGY,
+        chunk_size: int = 256,
+        chunk_overlap: int = 50
+    ) -> None:
+        if strategy == CHARACTERS_STRATEGY:
+            length_function = len
+        else:
+            tokenizer = tokenizer or tiktoken.get_encoding("cl100k_base")
+            length_function = lambda text: len(tokenizer.encode_ordinary(text))
+
+        if strategy == SEMANTIC_STRATEGY:
+            # Imported only when used, as it loads the experimental package of langchain
+            from langchain_experimental.text_splitter import SemanticChunker
+            self._chunker = SemanticChunker(embeddings=embedding, breakpoint_threshold_type='percentile')
+        elif strategy == CHARACTERS_STRATEGY:
+            self._chunker = RecursiveCharacterTextSplitter(
+                separators=SEPARATORS,
+                keep_separator="end",
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap
+            )
+        elif strategy == TOKENS_STRATEGY:
+            self._chunker = RecursiveCharacterTextSplitter(
+                separators=SEPARATORS,
+                keep_separator="end",
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                length_function=length_function
+            )
+        else:
+            raise ValueError(f"Unsupported chunking strategy \"{strategy}\".")
+
+        self._markdown_chunker = MarkdownChunker(
+            length_function=length_function,
+            chunk_size=chunk_size,
+            fallback_split=self._chunker.split_text
+        )
 
     def _remove_consecutive_newlines(self, text: str) -> str:
         """
-        Remove duplicate newlines from the text.
+        Remove duplicate newlines from the text, keeping a single blank line between paragraphs.
         """
-        return "\n".join([line for line in text.split("\n\n") if line.strip()])
+        return BLANK_LINES_PATTERN.sub("\n\n", text).strip()
 
     def _generate_sha(self, content: str) -> str:
         """
@@ -31,22 +102,70 @@ class DocumentChunker():
         """
         return hashlib.sha256(content.encode()).hexdigest()
 
-    def split_text_into_chunks(self, text: str, url: str | None = None) -> List[Document]:
+    def get_content_sha(self, text: str) -> str:
+        """
+        Generate the SHA of a text after the same normalization applied before splitting it into chunks.
+        """
+        return self._generate_sha(self._remove_consecutive_newlines(text))
+
+    def _generate_point_id(self, source: str, chunk_sha: str) -> str:
+        """
+        Generate a deterministic point ID from the source of a chunk and its content hash.
+
+        The same chunk coming from the same source always maps to the same ID, so that
+        re-ingesting unchanged content overwrites the existing point instead of duplicating it.
+        """
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{source}#{chunk_sha}"))
+
+    def split_text_into_chunks(
+        self,
+        text: str,
+        url: str | None = None,
+        source: str | None = None,
+        metadata: dict | None = None,
+        markdown: bool = False
+    ) -> List[Document]:
         """
         Generate chunks via semantic separation from a given text
 
+        Each chunk carries the SHA of the whole document (`sha`), the SHA of its own content (`chunk_sha`)
+        and the `source` it comes from. The Document ID is derived from the source and the chunk SHA.
+
         Args:
             text (str): The input text.
             url (str | None): The URL of the text. Could be None if the text is not from a URL (e.g. from an uploaded file).
+            source (str | None): The source of the text (e.g. the name of the uploaded file). Defaults to the URL.
+            metadata (dict | None): Further metadata of the text stored with each chunk (e.g. the page number).
+            markdown (bool): Whether the text is Markdown, to be split following its headings. The breadcrumb of the
+                headings of the section of each chunk is stored in its metadata (`headings`).
         """
         content = self._remove_consecutive_newlines(text)
         sha = self._generate_sha(content)
+        source = source or url or ""
 
-        metadata = {"sha": sha}
+        document_metadata = {**(metadata or {}), "sha": sha, "source": source}
         if url:
-            metadata["url"] = url
+            document_metadata["url"] = url
+
+        document = Document(page_content=content, metadata=document_metadata)
+        if markdown:
+            split_chunks = self._markdown_chunker.split_text(document.page_content)
+        else:
+            split_chunks = [(chunk, None) for chunk in self._chunker.split_text(document.page_content)]
 
-        document = Document(page_content=content, metadata=metadata)
-        chunks = [Document(page_content=chunk) for chunk in self._chunker.split_text(document.page_content)]
-        # NOTE: "copy" method actually exists.
-        return [Document(page_content=chunk.page_content, metadata=document.metadata.copy()) for chunk in chunks]
+        chunks = []
+        for chunk, headings in split_chunks:
+            chunk_sha = self._generate_sha(chunk)
+            # NOTE: "copy" method actually exists.
+            chunk_metadata = document.metadata.copy()
+            chunk_metadata["chunk_sha"] = chunk_sha
+            if headings:
+                chunk_metadata["headings"] = headings
+            chunks.append(
+                Document(
+                    id=self._generate_point_id(source, chunk_sha),
+                    page_content=chunk,
+                    metadata=chunk_metadata
+                )
+            )
+        return chunks
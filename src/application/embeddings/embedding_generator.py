@@ -1,72 +1,288 @@
+import asyncio
 import re
-from collections import deque
-from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Coroutine, Iterable, Iterator, List, Set
+from urllib.parse import urldefrag, urljoin, urlparse
 
-import requests
-from bs4 import BeautifulSoup
-from langchain_qdrant import QdrantVectorStore, FastEmbedSparse, RetrievalMode
+from langchain_core.documents import Document
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client.models import PointStruct, SparseVector
 
+from application.embeddings.boilerplate_filter import BoilerplateFilter
 from application.embeddings.document_chunker import DocumentChunker
-from application.embeddings.hyperlink_parser import HyperlinkParser
+from application.embeddings.errors import IngestionCancelledError
+from application.embeddings.file_parser.parsed_document import ParsedDocument
+from application.embeddings.html_extractor import HtmlExtractor
+from application.embeddings.ingestion_jobs import IngestionJob
+from application.embeddings.ingestion_pipeline import BatchPolicy, IngestionPipeline, PipelineStage, RoutedItem
+from application.embeddings.near_duplicate_detector import ChunkSignature, NearDuplicateDetector
+from application.embeddings.qdrant_writer import QdrantWriter
+from application.embeddings.source_manager import SourceManager, get_source_prefixes
+from application.embeddings.web_crawler import WebCrawler, WebCrawlerConfiguration
+from constants import SOURCE_PREFIXES_PAYLOAD_KEY
 from context import AppContext
-from infrastracture.embeddings_manager.embeddings_manager import EmbeddingsManager
+from helpers.sql_storage import SqlStorage
 
 # Regex pattern to match a URL
 HTTP_URL_PATTERN = r"^http[s]*://.+"
 
+# Names of the stages of the ingestion pipeline
+FETCH_STAGE = "fetch"
+PARSE_STAGE = "parse"
+CHUNK_STAGE = "chunk"
+EMBED_STAGE = "embed"
+UPSERT_STAGE = "upsert"
+
+
+@dataclass
+class IngestionItem:
+    """
+    A web page or a document flowing through the stages of the ingestion pipeline.
+    """
+    source: str
+    url: str | None = None
+    crawl_state: tuple | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+    raw_html: str | None = None
+    text: str | None = None
+    metadata: dict = field(default_factory=dict)
+    markdown: bool = False
+    content_sha: str | None = None
+    block_fingerprints: bytes | None = None
+    hyperlinks: List[str] = field(default_factory=list)
+    chunks: List[Document] = field(default_factory=list)
+    # IDs of the chunks stored in the collection: already stored, or new, but not skipped as near-duplicates
+    point_ids: List[str] = field(default_factory=list)
+    new_chunks: List[Document] = field(default_factory=list)
+    new_chunk_tokens: List[int] = field(default_factory=list)
+    new_chunk_signatures: List[ChunkSignature] = field(default_factory=list)
+
+
+@dataclass
+class EmbeddedBatch:
+    """
+    The points generated from a batch of items, grouped by embeddings request.
+    """
+    items: List[IngestionItem]
+    points: List[List[PointStruct]]
+
+
+@dataclass
+class CrawlScope:
+    local_domain: str
+    path: str | None
+    seen: Set[str]
+    # The pages fetched and fully processed: the crawl frontier is made of the pages seen but not processed yet
+    processed: Set[str] = field(default_factory=set)
+
 
 class EmbeddingGenerator:
     """
     Class to generate embeddings for text data.
+
+    Web pages and documents are processed by a pipeline of stages connected by bounded queues
+    (fetch -> parse -> chunk -> embed -> upsert), so that network requests, parsing, embeddings generation
+    and writes on the vector store overlap. The documents of uploaded files enter the pipeline at the chunk stage.
+
+    The embed stage collects the new chunks of several pages and documents up to a chunks and tokens budget,
+    sending one embeddings request for each batch. The points are written by a `QdrantWriter`, with concurrent
+    non-blocking upserts, and the ingestion waits for them to be applied before returning.
+
+    Args:
+        app_context (AppContext): The application context.
+        job (IngestionJob | None): The job the embeddings are generated for, if any. The progress of the
+            ingestion is reported to the job, and the ingestion stops when the job is cancelled.
+        collection_name (str | None): The collection the chunks are stored in, e.g. the new version of a collection
+            being rebuilt. Defaults to the configured one.
     """
 
-    def __init__(self, app_context: AppContext):
+    def __init__(self, app_context: AppContext, job: IngestionJob | None = None, collection_name: str | None = None):
         self.logger = app_context.logger
+        self._metrics_manager = app_context.metrics_manager
         configuration = app_context.configurations
+        self._collection_name = collection_name or configuration.vectorStore.collectionName
+        self._vector_name = configuration.vectorStore.embeddingKey
+        self._sparse_vector_name = configuration.vectorStore.textKey
+
+        # The models and clients are shared by all the ingestions of the process
+        resources_manager = app_context.resources_manager
+        self._embedding = resources_manager.embeddings
+        self._tokenizer = resources_manager.embeddings_tokenizer
+        self._sparse_embeddings = resources_manager.sparse_embeddings
+
+        chunking_configuration = configuration.ingestion.chunking
+        self._document_chunker = DocumentChunker(
+            embedding=self._embedding,
+            tokenizer=self._tokenizer,
+            strategy=chunking_configuration.strategy.value,
+            chunk_size=chunking_configuration.chunkSize,
+            chunk_overlap=chunking_configuration.chunkOverlap
+        )
+        self._sql_storage = SqlStorage(app_context)
+        self._source_manager = SourceManager(app_context, self._collection_name)
+
+        near_duplicates_configuration = configuration.ingestion.nearDuplicates
+        self._near_duplicate_detector = NearDuplicateDetector(
+            self._sql_storage,
+            self._collection_name,
+            threshold=near_duplicates_configuration.threshold,
+            num_permutations=near_duplicates_configuration.numPermutations,
+            bands=near_duplicates_configuration.bands
+        ) if near_duplicates_configuration.enabled else None
+
+        self._qdrant_client = resources_manager.qdrant_client
+        writer_configuration = configuration.ingestion.writer
+        self._qdrant_writer = QdrantWriter(
+            self._qdrant_client,
+            self._collection_name,
+            self.logger,
+            self._metrics_manager,
+            batch_size=writer_configuration.batchSize,
+            max_in_flight=writer_configuration.maxInFlight
+        )
 
-        embedding = EmbeddingsManager(app_context).get_embeddings_instance()
-
-        self._document_chunker = DocumentChunker(embedding=embedding)
-
-        sparse_embeddings = FastEmbedSparse(model_name="Qdrant/bm25")
+        crawler_configuration = configuration.ingestion.crawler
+        self._crawler_configuration = WebCrawlerConfiguration(
+            max_connections=crawler_configuration.maxConnections,
+            max_concurrency_per_host=crawler_configuration.maxConcurrencyPerHost,
+            politeness_delay=crawler_configuration.politenessDelay,
+            max_retries=crawler_configuration.maxRetries,
+            retry_backoff=crawler_configuration.retryBackoff,
+            max_retry_delay=crawler_configuration.maxRetryDelay,
+            request_timeout=crawler_configuration.requestTimeout
+        )
+        self._crawler_checkpoint_interval = crawler_configuration.checkpointInterval
+        self._pipeline_configuration = configuration.ingestion.pipeline
+        self._batching_configuration = configuration.ingestion.batching
+        self._boilerplate_configuration = configuration.ingestion.boilerplate
+
+        self._job = job
+        self._pipeline: IngestionPipeline | None = None
+        self._crawler: WebCrawler | None = None
+        self._crawl_scope: CrawlScope | None = None
+        self._boilerplate_filter: BoilerplateFilter | None = None
+        # IDs of the chunks of the ingested sources, stored or already in the collection
+        self._source_point_ids: Set[str] = set()
+
+    def __enter__(self) -> "EmbeddingGenerator":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stop the threads writing the points to the collection."""
+        self._qdrant_writer.close()
+
+    def _filter_existing_chunks(self, chunks: List[Document]) -> List[Document]:
+        """
+        Remove from the list the chunks that are already stored in the collection.
 
-        self._embedding_vector_store = QdrantVectorStore.from_existing_collection(
-            url=app_context.env_vars.VECTOR_DB_CLUSTER_URI,
-            api_key=app_context.env_vars.VECTOR_DB_API_KEY,
-            collection_name=configuration.vectorStore.collectionName,
-            embedding=embedding,
-            sparse_embedding=sparse_embeddings,
-            vector_name=configuration.vectorStore.embeddingKey,
-            sparse_vector_name=configuration.vectorStore.textKey,
-            retrieval_mode=RetrievalMode.HYBRID
+        Chunk IDs are derived from the source and the content hash of each chunk, so a chunk whose ID
+        already exists in the collection has already been embedded and does not need to be sent again
+        to the embeddings API. Chunks with the same ID inside the list are also deduplicated.
+        """
+        unique_chunks = {chunk.id: chunk for chunk in chunks}
+        if not unique_chunks:
+            return []
+
+        existing_points = self._qdrant_client.retrieve(
+            collection_name=self._collection_name,
+            ids=list(unique_chunks.keys()),
+            with_payload=False,
+            with_vectors=False
         )
+        existing_ids = {str(point.id) for point in existing_points}
 
-        print('initialized vector store')
+        new_chunks = [chunk for chunk_id, chunk in unique_chunks.items() if chunk_id not in existing_ids]
+        skipped_chunks = len(chunks) - len(new_chunks)
+        if skipped_chunks:
+            self._metrics_manager.ingestion_chunks_deduplicated.inc(skipped_chunks)
 
+        return new_chunks
 
-    def _get_hyperlinks(self, raw_text: str):
+    def _build_points(self, chunks: List[Document]) -> List[PointStruct]:
+        """
+        Generate the dense and sparse embeddings of the chunks, and build the points to be stored in the collection
+        with the same payload structure used by the retriever.
         """
-        Function to get the hyperlinks from a raw HTML text
+        texts = [chunk.page_content for chunk in chunks]
+        dense_embeddings = self._embedding.embed_documents(texts)
+        sparse_embeddings = self._sparse_embeddings.embed_documents(texts)
+
+        return [
+            PointStruct(
+                id=chunk.id,
+                vector={
+                    self._vector_name: dense_vector,
+                    self._sparse_vector_name: SparseVector(indices=sparse_vector.indices, values=sparse_vector.values)
+                },
+                payload={
+                    QdrantVectorStore.CONTENT_KEY: chunk.page_content,
+                    QdrantVectorStore.METADATA_KEY: chunk.metadata,
+                    SOURCE_PREFIXES_PAYLOAD_KEY: get_source_prefixes(chunk.metadata["source"])
+                }
+            )
+            for chunk, dense_vector, sparse_vector in zip(chunks, dense_embeddings, sparse_embeddings)
+        ]
+
+    def _delete_stale_points(self, previous_point_ids: List[str], point_ids: List[str]):
         """
-        # Create the HTML Parser and then Parse the HTML to get hyperlinks
-        parser = HyperlinkParser()
-        parser.feed(raw_text)
+        Remove the points of the previous version of a page that are not part of the new one.
 
-        return parser.hyperlinks
+        This is done only after the new points are written: the page is never missing from the collection
+        while it is being replaced.
+        """
+        stale_point_ids = set(previous_point_ids) - set(point_ids)
+        if stale_point_ids:
+            self.logger.debug(f"Removing {len(stale_point_ids)} stale chunks of the previous version of the page.")
+            self._qdrant_writer.delete(list(stale_point_ids))
+            if self._near_duplicate_detector is not None:
+                self._near_duplicate_detector.delete_signatures(list(stale_point_ids))
+
+    def _save_crawl_state(self, item: IngestionItem, point_ids: List[str]):
+        self._sql_storage.save_crawl_state(
+            collection_name=self._collection_name,
+            url=item.url,
+            etag=item.etag,
+            last_modified=item.last_modified,
+            content_sha=item.content_sha,
+            point_ids=point_ids,
+            hyperlinks=item.hyperlinks,
+            block_fingerprints=item.block_fingerprints
+        )
 
-    def _get_domain_hyperlinks(self, raw_text: str, local_domain: str, path: str | None = None):
+    def _build_conditional_headers(self, crawl_state) -> dict:
+        """
+        Build the headers of a conditional request from the state of the last crawl of a page.
+        """
+        headers = {}
+        if crawl_state is None:
+            return headers
+
+        etag, last_modified = crawl_state[0], crawl_state[1]
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def _get_domain_hyperlinks(self, hyperlinks: List[str], page_url: str, local_domain: str, path: str | None = None):
         """
         Function to get the hyperlinks from a URL that are within the same domain
         
         Args:
-            raw_text (str): The raw HTML text to extract hyperlinks from.
+            hyperlinks (List[str]): The hyperlinks extracted from the page.
+            page_url (str): The URL of the page, used to resolve relative hyperlinks.
             local_domain (str): The domain to compare the hyperlinks against.
         
         Returns:
             list: A list of hyperlinks that are within the same domain.
         """
         clean_links = []
-        for link in set(self._get_hyperlinks(raw_text)):
+        for link in set(hyperlinks):
             clean_link = None
 
             # If the link is a URL, check if it is within the same domain
@@ -79,11 +295,10 @@ class EmbeddingGenerator:
 
             # If the link is not a URL, check if it is a relative link
             else:
-                if link.startswith("/"):
-                    link = link[1:]
-                elif link.startswith("#") or link.startswith("mailto:") or link.startswith("tel:"):
+                if link.startswith("#") or link.startswith("mailto:") or link.startswith("tel:"):
                     continue
-                clean_link = "https://" + local_domain + "/" + link
+                # Resolve the link against the page it was found in, keeping the scheme of the page
+                clean_link = urldefrag(urljoin(page_url, link)).url
 
             if clean_link is not None:
                 if clean_link.endswith("/"):
@@ -97,82 +312,542 @@ class EmbeddingGenerator:
 
         return list(set(clean_links))
 
-    def generate_from_url(self, url: str, filter_path: str | None = None):
+    def _route_hyperlinks(self, hyperlinks: List[str]) -> List[RoutedItem]:
         """
-        Crawls the given URL and saves the text content of each page to a text file.
+        Route the hyperlinks not seen yet during the crawl to the fetch stage.
+        """
+        if len(hyperlinks) == 0:
+            self.logger.debug("No links found, move on.")
+
+        routed_items = []
+        for link in hyperlinks:
+            if link not in self._crawl_scope.seen:
+                self.logger.debug(f"Found new link: {link}")
+                self._crawl_scope.seen.add(link)
+                routed_items.append((FETCH_STAGE, link))
+        return routed_items
+
+    async def _fetch_stage(self, url: str) -> List[RoutedItem] | None:
+        self.logger.debug(f"Scraping page: {url}")  # for debugging and to see the progress
+
+        # The state of the previous crawl, if any, is used to send a conditional request
+        crawl_state = await asyncio.to_thread(self._sql_storage.read_crawl_state, self._collection_name, url)
+
+        page = await self._crawler.fetch(url, headers=self._build_conditional_headers(crawl_state))
+        await asyncio.to_thread(self._report_progress, pages=1)
+        if page.not_modified and crawl_state is not None:
+            self.logger.debug(f"Page {url} not modified since last crawl, skipping it.")
+            await asyncio.to_thread(self._sql_storage.touch_crawl_state, self._collection_name, url)
+            # The blocks of the page are still counted to detect the boilerplate of the pages that changed
+            if self._boilerplate_filter is not None and crawl_state[6]:
+                self._boilerplate_filter.add_fingerprints(crawl_state[6])
+            self._crawl_scope.processed.add(url)
+            return self._route_hyperlinks(crawl_state[5])
+
+        if page.status_code >= 400:
+            self.logger.warning(f"Skipping page {url} as the server answered with status code {page.status_code}.")
+            self._crawl_scope.processed.add(url)
+            return None
+
+        # check the response headers to see if the content is HTML
+        if not page.is_html:
+            self.logger.debug(f"Skipping page {url} as it is not HTML content.")
+            self._crawl_scope.processed.add(url)
+            return None
+
+        item = IngestionItem(
+            source=url,
+            url=url,
+            crawl_state=crawl_state,
+            etag=page.headers.get("ETag"),
+            last_modified=page.headers.get("Last-Modified"),
+            raw_html=page.text
+        )
+        return [(PARSE_STAGE, item)]
 
-        Args:
-            url (str): The URL to crawl. From this URL, the crawler will extract the text content 
-                of said page and any other page connected via hyperlinks (anchor tags).
-            domain (str | None, optional): The domain to compare the hyperlinks against. If None,
-                the hyperlinks will not be filtered by domain. Defaults to None.
+    def _parse_page(self, item: IngestionItem) -> bool:
+        """
+        Extract the text, the hyperlinks and the content SHA of a fetched page.
 
         Returns:
-            None
+            bool: False if the page cannot be parsed, True otherwise.
+        """
+        # Get the text without the tags, and the hyperlinks, parsing the page once
+        extractor = HtmlExtractor()
+        extractor.feed(item.raw_html)
+        extractor.close()
+        text = extractor.text
+
+        # If the crawler gets to a page that requires JavaScript, it will stop the crawl
+        if "You need to enable JavaScript to run this app." in text:
+            self.logger.debug(
+                f"Unable to parse page {item.url} due to JavaScript being required"
+            )
+            return False
+
+        item.hyperlinks = self._get_domain_hyperlinks(
+            extractor.hyperlinks, item.url, self._crawl_scope.local_domain, self._crawl_scope.path
+        )
+        if self._boilerplate_filter is not None:
+            item.block_fingerprints = self._boilerplate_filter.add_page(text)
+        item.text = text
+        item.content_sha = self._document_chunker.get_content_sha(text)
+        item.raw_html = None
+        return True
+
+    async def _parse_stage(self, item: IngestionItem) -> List[RoutedItem] | None:
+        if not await asyncio.to_thread(self._parse_page, item):
+            self._crawl_scope.processed.add(item.url)
+            return None
+
+        routed_items = self._route_hyperlinks(item.hyperlinks)
+        if item.crawl_state is not None and item.crawl_state[2] == item.content_sha:
+            self.logger.debug(f"Content of page {item.url} not changed since last crawl, skipping it.")
+            await asyncio.to_thread(self._save_crawl_state, item, item.crawl_state[4])
+            self._crawl_scope.processed.add(item.url)
+        else:
+            ready_items = await asyncio.to_thread(self._strip_boilerplate, item)
+            routed_items.extend((CHUNK_STAGE, ready_item) for ready_item in ready_items)
+        return routed_items
+
+    def _strip_item_boilerplate(self, item: IngestionItem):
+        item.text, tokens = self._boilerplate_filter.strip(item.text)
+        if tokens:
+            self._metrics_manager.ingestion_boilerplate_tokens_saved.inc(tokens)
+
+    def _strip_boilerplate(self, item: IngestionItem) -> List[IngestionItem]:
         """
+        Remove the blocks repeated across the pages of the crawl from the text of a parsed page.
 
-        local_domain = urlparse(url).netloc
-        path = urlparse(filter_path).path if filter_path else None
+        The first pages of the crawl are held until the frequency of their blocks is known.
 
-        queue = deque([url])
-        seen = set([url])
+        Returns:
+            list: The items ready to be chunked: none if the page is held, otherwise the page and the ones held so far.
+        """
+        if self._boilerplate_filter is None:
+            return [item]
 
-        # While the queue is not empty, continue crawling
-        while queue:
-            # Get the next URL from the queue
-            url = queue.pop()
-            self.logger.debug(f"Scraping page: {url}")  # for debugging and to see the progress
+        ready_items = self._boilerplate_filter.hold(item)
+        for ready_item in ready_items:
+            self._strip_item_boilerplate(ready_item)
+        return ready_items
 
-            # Get the text from the URL using BeautifulSoup
-            response = requests.get(url, timeout=5)
-            response.raise_for_status()
-            # check the response headers to see if the content is HTML
-            if not response.headers.get("Content-Type", "").startswith("text/html"):
-                self.logger.debug(f"Skipping page {url} as it is not HTML content.")
-                continue
+    def _chunk_item(self, item: IngestionItem):
+        """
+        Split the text of an item into chunks, and select the ones not yet stored in the collection.
+        """
+        item.chunks = self._document_chunker.split_text_into_chunks(
+            text=item.text,
+            url=item.url,
+            source=item.source,
+            metadata=item.metadata,
+            markdown=item.markdown
+        )
+        item.text = None
+
+        item.new_chunks = self._filter_existing_chunks(item.chunks)
+        skipped_ids = set()
+        if self._near_duplicate_detector is not None and item.new_chunks:
+            new_chunk_ids = {chunk.id for chunk in item.new_chunks}
+            self._filter_near_duplicates(item)
+            skipped_ids = new_chunk_ids - {chunk.id for chunk in item.new_chunks}
+        # The near-duplicates skipped are not stored: they must not be recorded as points of the item
+        item.point_ids = [
+            chunk_id for chunk_id in dict.fromkeys(chunk.id for chunk in item.chunks) if chunk_id not in skipped_ids
+        ]
+        item.new_chunk_tokens = [len(self._tokenizer.encode(chunk.page_content)) for chunk in item.new_chunks]
+        self.logger.debug(
+            f"Extracted {len(item.chunks)} chunks from {item.source}, "
+            f"{len(item.chunks) - len(item.new_chunks)} of them already stored."
+        )
 
-            raw_text = response.text
+    def _filter_near_duplicates(self, item: IngestionItem):
+        """
+        Remove from the new chunks of an item the near-duplicates of the chunks already stored, except the ones of the
+        previous version of the same page, which are going to be replaced.
+        """
+        previous_point_ids = set(item.crawl_state[4]) if item.crawl_state is not None else None
+        new_chunks, item.new_chunk_signatures = self._near_duplicate_detector.filter_chunks(
+            item.new_chunks, previous_point_ids
+        )
+        duplicates = len(item.new_chunks) - len(new_chunks)
+        item.new_chunks = new_chunks
+        if duplicates:
+            self.logger.debug(f"Skipped {duplicates} near-duplicate chunks of {item.source}.")
+            self._metrics_manager.ingestion_chunks_near_duplicates.inc(duplicates)
+            self._report_progress(duplicates=duplicates)
+
+    async def _chunk_stage(self, item: IngestionItem) -> List[RoutedItem]:
+        await asyncio.to_thread(self._chunk_item, item)
+        return [(EMBED_STAGE, item)]
+
+    def _get_batch_load(self, items: List[IngestionItem]) -> float:
+        """
+        Get the fraction of the chunks and tokens budget of an embeddings request used by the new chunks of the items.
+        """
+        chunks = sum(len(item.new_chunks) for item in items)
+        tokens = sum(sum(item.new_chunk_tokens) for item in items)
+        return max(chunks / self._batching_configuration.maxChunks, tokens / self._batching_configuration.maxTokens)
 
-            # Get the text but remove the tags
-            soup = BeautifulSoup(raw_text, "html.parser")
-            text = soup.get_text()
+    def _split_into_batches(self, items: List[IngestionItem]) -> List[List[Document]]:
+        """
+        Group the new chunks of the items into batches respecting the maximum number of chunks and tokens.
+        """
+        batches = []
+        batch, batch_tokens = [], 0
+        for item in items:
+            for chunk, tokens in zip(item.new_chunks, item.new_chunk_tokens):
+                if batch and (
+                    len(batch) >= self._batching_configuration.maxChunks
+                    or batch_tokens + tokens > self._batching_configuration.maxTokens
+                ):
+                    batches.append(batch)
+                    batch, batch_tokens = [], 0
+                batch.append(chunk)
+                batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _embed_items(self, items: List[IngestionItem]) -> EmbeddedBatch:
+        """
+        Generate the embeddings of the new chunks of a batch of items, with one request for each batch of chunks.
+        """
+        chunk_batches = self._split_into_batches(items)
+        tokens = sum(sum(item.new_chunk_tokens) for item in items)
+        self.logger.debug(
+            f"Generating embeddings for {sum(len(batch) for batch in chunk_batches)} chunks ({tokens} tokens) "
+            f"from {len(items)} items in {len(chunk_batches)} requests..."
+        )
 
-            # If the crawler gets to a page that requires JavaScript, it will stop the crawl
-            if "You need to enable JavaScript to run this app." in text:
-                self.logger.debug(
-                    f"Unable to parse page {url} due to JavaScript being required"
-                )
-                continue
+        points = [self._build_points(batch) for batch in chunk_batches]
+        self._metrics_manager.ingestion_tokens_consumed.inc(tokens)
+        return EmbeddedBatch(items=items, points=points)
 
-            chunks = self._document_chunker.split_text_into_chunks(text=text, url=url)
-            self.logger.debug(f"Extracted {len(chunks)} chunks from the page. Generated embeddings for these...")
-            self._embedding_vector_store.add_documents(chunks)
+    async def _embed_stage(self, items: List[IngestionItem]) -> List[RoutedItem]:
+        batch = await asyncio.to_thread(self._embed_items, items)
+        return [(UPSERT_STAGE, batch)]
 
-            self.logger.debug("Embeddings generation completed. Extracting links...")
-            hyperlinks = self._get_domain_hyperlinks(raw_text, local_domain, path)
-            if len(hyperlinks) == 0:
-                self.logger.debug("No links found, move on.")
+    def _write_batch(self, batch: EmbeddedBatch):
+        """
+        Write the new points of a batch, then, for each item, remove the stale points and save the crawl state.
+
+        The points are acknowledged, not yet applied: the stale points are removed after them, as Qdrant applies
+        the operations in order, and `_flush_writes` waits for all of them at the end of the ingestion.
+        """
+        self._qdrant_writer.write([point for points in batch.points for point in points])
+        if self._near_duplicate_detector is not None:
+            self._near_duplicate_detector.save_signatures(
+                [signature for item in batch.items for signature in item.new_chunk_signatures]
+            )
+
+        for item in batch.items:
+            if item.crawl_state is not None:
+                self._delete_stale_points(item.crawl_state[4], item.point_ids)
+            if item.url is not None:
+                self._save_crawl_state(item, item.point_ids)
+            self.logger.debug(f"Embeddings generation completed for {item.source}.")
+
+        self._report_progress(
+            chunks=sum(len(item.new_chunks) for item in batch.items),
+            tokens=sum(sum(item.new_chunk_tokens) for item in batch.items)
+        )
+
+    async def _upsert_stage(self, batch: EmbeddedBatch) -> None:
+        await asyncio.to_thread(self._write_batch, batch)
+        self._source_point_ids.update(point_id for item in batch.items for point_id in item.point_ids)
+        if self._crawl_scope is not None:
+            self._crawl_scope.processed.update(item.url for item in batch.items if item.url is not None)
+
+    def _build_pipeline(self) -> IngestionPipeline:
+        configuration = self._pipeline_configuration
+        stages = [
+            # The fetch stage is fed back with the hyperlinks found while parsing: its queue, the crawl frontier,
+            # must be unbounded to avoid a deadlock
+            PipelineStage(FETCH_STAGE, self._fetch_stage, self._crawler_configuration.max_connections, 0),
+            PipelineStage(PARSE_STAGE, self._parse_stage, configuration.parse.workers, configuration.parse.queueSize),
+            PipelineStage(CHUNK_STAGE, self._chunk_stage, configuration.chunk.workers, configuration.chunk.queueSize),
+            # The embed stage collects the chunks of several pages and documents, to send them in a few large requests
+            PipelineStage(
+                EMBED_STAGE,
+                self._embed_stage,
+                configuration.embed.workers,
+                configuration.embed.queueSize,
+                batch=BatchPolicy(load=self._get_batch_load, max_wait=self._batching_configuration.flushInterval)
+            ),
+            PipelineStage(UPSERT_STAGE, self._upsert_stage, configuration.upsert.workers, configuration.upsert.queueSize),
+        ]
+        return IngestionPipeline(self.logger, self._metrics_manager, stages)
+
+    def _report_progress(self, pages: int = 0, chunks: int = 0, tokens: int = 0, duplicates: int = 0):
+        """
+        Report the progress of the ingestion to its job, if any. It can be blocking, as the job may persist it.
+        """
+        if self._job is None:
+            return
+        if self._pipeline is not None:
+            self._job.set_errors(sum(self._pipeline.errors.values()))
+        self._job.add_progress(pages=pages, chunks=chunks, tokens=tokens, duplicates=duplicates)
+
+    async def _run_with_executor(self, coroutine: Coroutine):
+        """
+        Run the coroutine with a thread pool large enough for all the workers running blocking operations,
+        shared by all the pipelines it runs, and shut down once it completes.
+        """
+        configuration = self._pipeline_configuration
+        max_workers = self._crawler_configuration.max_connections + sum(
+            stage.workers for stage in (configuration.parse, configuration.chunk, configuration.embed, configuration.upsert)
+        )
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=max_workers))
+        try:
+            return await coroutine
+        finally:
+            await loop.shutdown_default_executor()
+
+    def _run_ingestion(self, coroutine: Coroutine):
+        """
+        Run the ingestion in a new event loop, then wait for its writes to be applied. If the ingestion fails,
+        an error of the flush is logged, so that it does not hide the error of the ingestion.
+        """
+        try:
+            asyncio.run(self._run_with_executor(coroutine))
+        except BaseException:
+            try:
+                self._flush_writes()
+            except Exception as ex:
+                self.logger.warning(f"Unable to flush the writes of the failed ingestion: {str(ex)}")
+            raise
+        self._flush_writes()
+
+    async def _run_pipeline(self, pipeline: IngestionPipeline, **kwargs):
+        """
+        Run the pipeline. If the ingestion has a job, the pipeline stops when the job is cancelled.
+        """
+        self._pipeline = pipeline
+        try:
+            await pipeline.run(**kwargs, is_cancelled=(lambda: self._job.is_cancelled) if self._job else None)
+        finally:
+            if self._job is not None:
+                self._job.set_errors(sum(pipeline.errors.values()))
+
+    async def _save_checkpoint(self, url: str, filter_path: str):
+        """
+        Save the state of the crawl, copied from the event loop thread, where the crawl scope is updated.
+        """
+        processed = list(self._crawl_scope.processed)
+        frontier = list(self._crawl_scope.seen - self._crawl_scope.processed)
+        try:
+            await asyncio.to_thread(
+                self._sql_storage.save_crawl_checkpoint, self._collection_name, url, filter_path, frontier, processed
+            )
+        except Exception as ex:
+            self.logger.warning(f"Unable to save the checkpoint of the crawl of {url}: {str(ex)}")
+
+    async def _run_checkpoints(self, url: str, filter_path: str):
+        while True:
+            await asyncio.sleep(self._crawler_checkpoint_interval)
+            await self._save_checkpoint(url, filter_path)
+
+    async def _crawl(self, url: str, filter_path: str | None = None):
+        self._crawl_scope = CrawlScope(
+            local_domain=urlparse(url).netloc,
+            path=urlparse(filter_path).path if filter_path else None,
+            seen=set([url])
+        )
+        frontier = [url]
+        checkpoint_key = filter_path or ""
+
+        # A crawl of the same URL interrupted before completing (e.g. by a restart) is resumed from its last checkpoint
+        checkpoint = None
+        if self._crawler_checkpoint_interval > 0:
+            checkpoint = await asyncio.to_thread(
+                self._sql_storage.read_crawl_checkpoint, self._collection_name, url, checkpoint_key
+            )
+        if checkpoint is not None:
+            # checkpoint -> (frontier, processed, updated_at)
+            frontier = checkpoint[0]
+            self._crawl_scope.processed = set(checkpoint[1])
+            self._crawl_scope.seen = set(frontier) | self._crawl_scope.processed
+            self.logger.info(
+                f"Resuming the crawl of {url} from the checkpoint of {checkpoint[2]}: "
+                f"{len(self._crawl_scope.processed)} pages already processed, {len(frontier)} pages to fetch."
+            )
+
+        checkpoint_task = None
+        if self._crawler_checkpoint_interval > 0:
+            checkpoint_task = asyncio.create_task(self._run_checkpoints(url, checkpoint_key))
+        completed = False
+        try:
+            await self._crawl_pages(frontier)
+            completed = True
+        except IngestionCancelledError:
+            # A job stopped to be put back in the queue is resumed from the checkpoint, a cancelled one is not
+            completed = self._job is None or not self._job.is_released
+            raise
+        finally:
+            if checkpoint_task is not None:
+                checkpoint_task.cancel()
+                await asyncio.gather(checkpoint_task, return_exceptions=True)
+                if completed:
+                    try:
+                        await asyncio.to_thread(
+                            self._sql_storage.delete_crawl_checkpoint, self._collection_name, url, checkpoint_key
+                        )
+                    except Exception as ex:
+                        self.logger.warning(f"Unable to delete the checkpoint of the crawl of {url}: {str(ex)}")
+                else:
+                    await self._save_checkpoint(url, checkpoint_key)
+
+        self.logger.info(f"Scraping completed: {len(self._crawl_scope.seen)} pages found.")
+
+    async def _crawl_pages(self, frontier: List[str]):
+        """
+        Crawl the pages of the frontier, and the ones linked by them, until all the pages in scope are processed.
+        """
+        if self._boilerplate_configuration.enabled:
+            self._boilerplate_filter = BoilerplateFilter(
+                threshold=self._boilerplate_configuration.threshold,
+                min_pages=self._boilerplate_configuration.minPages,
+                count_tokens=lambda text: len(self._tokenizer.encode(text))
+            )
+
+        async with WebCrawler(self.logger, self._crawler_configuration) as crawler:
+            self._crawler = crawler
+            try:
+                await self._run_pipeline(self._build_pipeline(), items=[(FETCH_STAGE, link) for link in frontier])
+            finally:
+                self._crawler = None
+
+        if self._boilerplate_filter is not None:
+            # The pages still held, as the crawl ended before enough pages were parsed, are chunked now
+            held_items = self._boilerplate_filter.release()
+            if held_items:
+                for item in held_items:
+                    self._strip_item_boilerplate(item)
+                await self._run_pipeline(self._build_pipeline(), items=[(CHUNK_STAGE, item) for item in held_items])
+            self.logger.info(
+                f"Boilerplate removal: {self._boilerplate_filter.blocks_removed} repeated blocks stripped, "
+                f"{self._boilerplate_filter.tokens_saved} tokens saved."
+            )
+
+    def _replace_crawled_sources(self, url: str, filter_path: str | None):
+        """
+        Remove the pages in the scope of a completed crawl that have not been found by it.
+        """
+        errors = sum(self._pipeline.errors.values()) if self._pipeline is not None else 0
+        if errors:
+            self.logger.warning(f"The crawl of {url} had {errors} errors: the pages not found are not removed.")
+            return
 
-            # Get the hyperlinks from the URL and add them to the queue
-            for link in hyperlinks:
-                if link not in seen:
-                    self.logger.debug(f"Found new link: {link}")
-                    queue.append(link)
-                    seen.add(link)
+        parsed_url = urlparse(url)
+        prefix = f"{parsed_url.scheme}://{parsed_url.netloc}{self._crawl_scope.path or ''}"
+        self._source_manager.replace_crawled_sources(prefix, self._crawl_scope.seen)
 
-        self.logger.debug("Scraping completed.")
+    def _flush_writes(self):
+        """
+        Wait until the writes sent to the collection are applied, so that the ingestion is searchable once completed.
+        """
+        self._qdrant_writer.flush()
 
-    def generate_from_text(self, text: str):
+    def generate_from_url(self, url: str, filter_path: str | None = None, replace: bool = False):
+        """
+        Crawls the given URL and saves the text content of each page to a text file.
+
+        Pages are fetched concurrently, breadth-first, by an asynchronous crawler that reuses connections,
+        limits the concurrency on each host and retries the requests failed with temporary errors.
+
+        The state of each crawled page (ETag, Last-Modified, content SHA, point IDs and hyperlinks) is persisted,
+        so that following crawls send conditional requests and skip pages that have not changed.
+
+        Args:
+            url (str): The URL to crawl. From this URL, the crawler will extract the text content 
+                of said page and any other page connected via hyperlinks (anchor tags).
+            domain (str | None, optional): The domain to compare the hyperlinks against. If None,
+                the hyperlinks will not be filtered by domain. Defaults to None.
+            replace (bool): Whether to remove, once the crawl is completed, the pages stored by previous crawls
+                in the same scope that have not been found. Defaults to False.
+
+        Returns:
+            None
+        """
+        self._run_ingestion(self._crawl(url, filter_path))
+        if replace:
+            self._replace_crawled_sources(url, filter_path)
+
+    def _read_document(self, documents: Iterator[ParsedDocument], source: str | None, position: int) -> ParsedDocument | None:
+        """
+        Read the next document, storing it when it has a source, so that a rebuild can parse it again
+        as the uploaded file is not kept.
+        """
+        document = next(documents, None)
+        if document is not None and source:
+            self._sql_storage.save_file_document(
+                self._collection_name,
+                source,
+                position,
+                document.text,
+                document.file_name,
+                document.page,
+                document.markdown
+            )
+        return document
+
+    async def _produce_documents(
+        self,
+        documents: Iterable[ParsedDocument],
+        source: str | None
+    ) -> AsyncIterator[RoutedItem]:
+        """
+        Route the documents to the chunk stage, reading them in a separate thread as extracting them can be blocking.
+        """
+        iterator = iter(documents)
+        position = 0
+        while (document := await asyncio.to_thread(self._read_document, iterator, source, position)) is not None:
+            position += 1
+            await asyncio.to_thread(self._report_progress, pages=1)
+            yield (
+                CHUNK_STAGE,
+                IngestionItem(source=source or "", text=document.text, metadata=document.metadata, markdown=document.markdown)
+            )
+
+    def generate_from_documents(self, documents: Iterable[ParsedDocument], source: str | None = None, replace: bool = False):
+        """
+        Separates each text of the iterable into chunks and generates embeddings for each chunk.
+
+        The iterable is consumed lazily, while the texts already read are processed.
+
+        Args:
+            documents (Iterable[ParsedDocument]): The documents to generate embeddings for (e.g. the pages of an uploaded file).
+                Their file name and page number are stored in the metadata of the chunks. With a source, the documents
+                are also stored in Postgres, replacing the ones of its previous upload, for the rebuilds of the collection.
+            source (str | None): The source of the texts (e.g. the name of the uploaded file), used to build the chunk IDs.
+            replace (bool): Whether to remove, once the new chunks are stored, the chunks of the previous version
+                of the source. Defaults to False.
+
+        Returns:
+            None
+        """
+        if source:
+            # The documents of the previous upload of the source are replaced by the ones read
+            self._sql_storage.delete_file_documents(self._collection_name, [source])
+        self._run_ingestion(self._run_pipeline(self._build_pipeline(), producer=self._produce_documents(documents, source)))
+        if replace:
+            errors = sum(self._pipeline.errors.values())
+            if errors:
+                self.logger.warning(f"The ingestion of {source} had {errors} errors: its previous version is not removed.")
+                return
+            self._source_manager.replace_source(source or "", self._source_point_ids)
+
+    def generate_from_text(self, text: str, source: str | None = None):
         """
         Take the string passed as argument, it separates the text into chunks and generates embeddings for each chunk.
 
         Args:
             text (str): The text to generate embeddings for.
+            source (str | None): The source of the text (e.g. the name of the uploaded file), used to build the chunk IDs.
 
         Returns:
             None
         """
-        chunks = self._document_chunker.split_text_into_chunks(text=text)
-        self.logger.debug(f"Extracted {len(chunks)} chunks from the page. Generated embeddings for these...")
-        self._embedding_vector_store.add_documents(chunks)
-        self.logger.debug("Embeddings generation completed.")
+        self.generate_from_documents([ParsedDocument(text=text)], source)
@@ -0,0 +1,31 @@
+class PageFetchError(Exception):
+    """Exception raised when a page cannot be fetched during a crawl, even after retrying the request."""
+
+    def __init__(self, url: str, reason: str):
+        super().__init__(f"Unable to fetch page {url}: {reason}")
+        self.url = url
+        self.reason = reason
+
+
+class IngestionCancelledError(Exception):
+    """Exception raised when an ingestion is stopped because its job has been cancelled."""
+
+    def __init__(self):
+        super().__init__("The ingestion has been cancelled.")
+
+
+class TooManyIngestionJobsError(Exception):
+    """Exception raised when a new ingestion job is requested while the maximum number of jobs is already running."""
+
+    def __init__(self, max_concurrent_jobs: int):
+        super().__init__(f"The maximum number of ingestion jobs running at the same time ({max_concurrent_jobs}) has been reached.")
+        self.max_concurrent_jobs = max_concurrent_jobs
+
+
+class CollectionValidationError(Exception):
+    """Exception raised when a rebuilt version of the collection fails the checks done before serving it."""
+
+    def __init__(self, collection_name: str, reason: str):
+        super().__init__(f"The rebuilt collection {collection_name} is not valid: {reason}")
+        self.collection_name = collection_name
+        self.reason = reason
@@ -15,3 +15,12 @@ class InvalidFileError(Exception):
     def __init__(self, filename):
         self.message = f"The file {filename} cannot be processed. File must include one of the specific ContentType: {', '.join(SUPPORTED_CONTENT_TYPES_TUPLE)}. Otherwise can have the following extensions: {', '.join(SUPPORTED_EXT_TUPLE)}."
         super().__init__(self.message)
+
+
+class FileTooLargeError(Exception):
+    """
+        Exception raised when the files extracted from an upload, once decompressed, exceed the maximum size.
+    """
+    def __init__(self, filename, max_uncompressed_bytes):
+        self.message = f"The file {filename} cannot be processed. The uncompressed size of the uploaded files exceeds the limit of {max_uncompressed_bytes} bytes."
+        super().__init__(self.message)
@@ -1,17 +1,22 @@
 import gzip
-import io
+import os
+from collections import deque
+from concurrent.futures import Executor, Future
 from logging import Logger
 from tempfile import TemporaryDirectory
 
-from typing import IO, Generator
+from typing import IO, Callable, Deque, Generator, Iterator, List
 from zipfile import BadZipFile, ZipFile
 import tarfile
-from pymupdf import Document
 from fastapi import File, UploadFile
 
-from application.embeddings.file_parser.errors import InvalidFileError
+from application.embeddings.file_parser.errors import FileTooLargeError, InvalidFileError
 from application.embeddings.file_parser.get_file_type import FileType, get_file_type
+from application.embeddings.file_parser.parsed_document import ParsedDocument
+from application.embeddings.file_parser.pdf_extractor import count_pdf_pages, extract_pdf_pages, split_pdf_pages
+from application.embeddings.file_parser.pdf_process_pool import get_pdf_process_pool
 from constants import (
+    MD_CONTENT_TYPE,
     MD_EXTENSION,
     MDX_EXTENSION,
     PDF_EXTENSION,
@@ -19,6 +24,9 @@ from constants import (
     TEXT_EXTENSION,
 )
 
+# The size, in bytes, of the blocks in which the files of an archive are copied to disk
+MEMBER_COPY_BLOCK_SIZE = 1024 * 1024
+
 
 class FileParser:
     """
@@ -35,13 +43,41 @@ class FileParser:
         - Extract text content from PDF files
         - Process ZIP files and extract supported file types within them
         - Handle file content encoding and conversion
+
+        Archives are read as a stream, straight from the uploaded file, one member at a time: each member is copied
+        in blocks to a temporary file, read from disk by the PDF extraction, so that a large member is never held
+        in memory. Text files are held in memory once decoded, as their text is a single document.
+
+        PDF files are extracted in ranges of pages. When `processes` is greater than 1, the ranges of pages,
+        of a single PDF file or of all the PDF files of an archive, are extracted in parallel by a pool of processes;
+        the documents are yielded in the same order as the sequential extraction. The pool is shared by the whole
+        process, and must be started at startup with `start_pdf_process_pool`: without it, the PDF files are
+        extracted sequentially.
     
         Args:
             logger (Logger): A logger instance for tracking operations and debugging    
+            processes (int): The number of processes extracting the PDF files. With 0 or 1, the PDF files are
+                extracted sequentially in the calling thread.
+            pages_per_task (int): The number of pages of a PDF file extracted by a single task of the pool.
+            max_uncompressed_bytes (int): The maximum total size of the files extracted from an upload, including
+                the files of an archive once decompressed. Zero means no limit.
     """
     
-    def __init__(self, logger: Logger):
+    def __init__(
+        self,
+        logger: Logger,
+        processes: int = 0,
+        pages_per_task: int = 16,
+        max_uncompressed_bytes: int = 0
+    ):
         self.logger = logger
+        self._processes = processes
+        self._pages_per_task = pages_per_task
+        self._max_uncompressed_bytes = max_uncompressed_bytes
+        self._uncompressed_bytes = 0
+        self._executor: Executor | None = None
+        self._temp_dir: str | None = None
+        self._temp_files_count = 0
 
     def _convert_bytes_to_str(self, content: bytes) -> str:
         return content.decode("utf-8")
@@ -51,112 +87,227 @@ class FileParser:
         content = file.file.read()
         return self._convert_bytes_to_str(content)
 
-    def _convert_from_doc_to_str(self, doc: Document) -> Generator[str, None, None]:
-        for page in doc:
-            yield page.get_text()
+    def _submit(self, function: Callable, *args) -> Future:
+        """
+        Run a function in the pool of processes, if any, or immediately in the calling thread.
+        """
+        if self._executor is not None:
+            return self._executor.submit(function, *args)
+
+        future = Future()
+        try:
+            future.set_result(function(*args))
+        except Exception as ex:
+            future.set_exception(ex)
+        return future
+
+    def _completed(self, documents: List[ParsedDocument]) -> Future:
+        future = Future()
+        future.set_result(documents)
+        return future
+
+    def _submit_pdf(self, source: str | bytes, file_name: str) -> Generator[Future, None, None]:
+        """
+        Submit the extraction of each range of pages of a PDF file, given its path or its content.
+        """
+        self.logger.debug(f'Extracting text from PDF file {file_name}')
+        if self._executor is not None and isinstance(source, bytes):
+            # The processes of the pool read the PDF file from disk, instead of receiving a copy of it for each task
+            self._temp_files_count += 1
+            path = os.path.join(self._temp_dir, f"{self._temp_files_count}.pdf")
+            with open(path, "wb") as temp_file:
+                temp_file.write(source)
+            source = path
+
+        for start, end in split_pdf_pages(count_pdf_pages(source), self._pages_per_task):
+            yield self._submit(extract_pdf_pages, source, file_name, start, end)
+
+    def _is_markdown(self, file_name: str) -> bool:
+        return file_name.removesuffix('.gz').split('.')[-1] in (MD_EXTENSION, MDX_EXTENSION)
 
-    def _convert_pdf_to_str(self, file: UploadFile) -> Generator[str, None, None]:
-        self.logger.debug(f'Extracting text from PDF file {file.filename}')
-        file_content = file.file.read()
-        doc = Document(stream=file_content)
-        yield from self._convert_from_doc_to_str(doc)
+    def _submit_text(self, content: bytes, file_name: str) -> Generator[Future, None, None]:
+        document = ParsedDocument(
+            text=self._convert_bytes_to_str(content),
+            file_name=file_name,
+            markdown=self._is_markdown(file_name)
+        )
+        yield self._completed([document])
 
-    def _convert_file_to_str(self, file: IO[bytes], file_name: str) -> Generator[str, None, None]:
-        file_content = file.read()
+    def _submit_text_file(self, path: str, file_name: str) -> Generator[Future, None, None]:
+        with open(path, "rb") as text_file:
+            content = text_file.read()
+        os.remove(path)
+        yield from self._submit_text(content, file_name)
+
+    def _submit_file(self, file: IO[bytes], file_name: str) -> Generator[Future, None, None]:
         file_extension = file_name.split('.')[-1]
 
         if file_extension == PDF_EXTENSION:
-            doc = Document(stream=file_content)
-            yield from self._convert_from_doc_to_str(doc)
+            yield from self._submit_pdf(self._copy_member(file, file_name), file_name)
         elif file_extension == TEXT_EXTENSION:
-            yield self._convert_bytes_to_str(file_content)
+            yield from self._submit_text_file(self._copy_member(file, file_name), file_name)
         elif file_extension in (MD_EXTENSION, MDX_EXTENSION):
-            yield self._convert_bytes_to_str(file_content)
-    
-    def _extract_documents_from_zip_file(self, file: UploadFile = File(...)) -> Generator[str, None, None]:
+            yield from self._submit_text_file(self._copy_member(file, file_name), file_name)
+
+    def _collect(self, futures: Iterator[Future]) -> Generator[ParsedDocument, None, None]:
+        """
+        Yield the documents extracted by the submitted tasks, in order of submission.
+
+        When a pool of processes is used, a bounded number of tasks is submitted ahead of the one whose documents
+        are being yielded, so that the processes are kept busy without extracting the whole file in memory.
+        """
+        max_pending = max(self._processes, 1) * 2
+        pending: Deque[Future] = deque()
+        for future in futures:
+            pending.append(future)
+            while len(pending) > max_pending or (pending and self._executor is None):
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+    def _submit_pdf_upload(self, file: UploadFile) -> Generator[Future, None, None]:
+        self._check_uncompressed_size(file.size or 0, file.filename)
+        # When the upload is stored on disk, pages are read from the file instead of loading it in memory
+        path = getattr(file.file, "name", None)
+        if isinstance(path, str) and os.path.isfile(path):
+            yield from self._submit_pdf(path, file.filename)
+        else:
+            yield from self._submit_pdf(file.file.read(), file.filename)
+
+    def _check_uncompressed_size(self, size: int, file_name: str):
+        self._uncompressed_bytes += size
+        if self._max_uncompressed_bytes and self._uncompressed_bytes > self._max_uncompressed_bytes:
+            raise FileTooLargeError(file_name, self._max_uncompressed_bytes)
+
+    def _copy_member(self, file: IO[bytes], file_name: str) -> str:
+        """
+        Copy a file of an archive to a temporary file, in blocks, counting its size towards the limit of uncompressed
+        bytes of the upload. The declared size of the member is not trusted: the copy stops once the limit is exceeded.
+
+        Returns:
+            str: The path of the temporary file.
+        """
+        self._temp_files_count += 1
+        path = os.path.join(self._temp_dir, f"{self._temp_files_count}.{file_name.split('.')[-1]}")
+        with open(path, "wb") as temp_file:
+            while block := file.read(MEMBER_COPY_BLOCK_SIZE):
+                self._check_uncompressed_size(len(block), file_name)
+                temp_file.write(block)
+        return path
+
+    def _submit_archive_members(self, archive: tarfile.TarFile | ZipFile) -> Generator[Future, None, None]:
+        """
+        Submit the extraction of the supported files of an archive, reading them one at a time.
+        """
+        if isinstance(archive, ZipFile):
+            members = ((info.filename, info) for info in archive.infolist() if not info.is_dir())
+            open_member = archive.open
+        else:
+            # Tar archives are read as a stream: each member must be read before moving to the next one
+            members = ((member.name, member) for member in archive if member.isfile())
+            open_member = archive.extractfile
+
+        files_count = 0
+        for file_name, member in members:
+            # For now we do not support folders inside archives: the supported files are matched by extension
+            if file_name.endswith(SUPPORTED_EXT_IN_COMPRESSED_FILE_TUPLE):
+                with open_member(member) as f:
+                    self.logger.info(f'Reading file {file_name}')
+                    files_count += 1
+                    yield from self._submit_file(f, file_name)
+        self.logger.info(f'Processed {files_count} files.')
+
+    def _extract_documents_from_zip_file(self, file: UploadFile = File(...)) -> Generator[Future, None, None]:
         self.logger.debug(f'Extracting files from zip file {file.filename}')
         try:
-            content = file.file.read()
-            with (
-                TemporaryDirectory() as temp_dir,
-                ZipFile(io.BytesIO(content)) as zipf
-            ):
-                zipf.extractall(path=temp_dir, members=zipf.namelist())
-
-                self.logger.info(f'Extracted {len(zipf.namelist())} files. Processing them...')
-
-                # Check for the list of file: we extract the files then we check if the extension match the available ones (supported: pdf, txt, md)
-                for file_name in zipf.namelist():
-                    # For now we do not support folders inside zip files.
-                    if file_name.endswith(SUPPORTED_EXT_IN_COMPRESSED_FILE_TUPLE):
-                        with zipf.open(file_name) as f:
-                            self.logger.info(f'Reading file {file_name}')
-                            yield from self._convert_file_to_str(f, file_name)
+            with ZipFile(file.file) as zipf:
+                yield from self._submit_archive_members(zipf)
         except BadZipFile as bad_zip_file_ex:
             self.logger.error(bad_zip_file_ex)
             raise BadZipFile(bad_zip_file_ex)
+        except FileTooLargeError:
+            raise
         except Exception as ex:
             raise Exception(f"An error occurred while extracting the file {file.filename}") from ex
 
-    def _extract_documents_from_tar_file(self, file: UploadFile = File(...)) -> Generator[str, None, None]:
+    def _extract_documents_from_tar_file(self, file: UploadFile = File(...)) -> Generator[Future, None, None]:
         self.logger.debug(f'Extracting files from tar file {file.filename}')
         try:
-            content = file.file.read()
-            with (
-                TemporaryDirectory() as temp_dir,
-                tarfile.open(fileobj=io.BytesIO(content)) as tarf
-            ):
-                tarf.extractall(path=temp_dir, filter="data")
-                self.logger.info(f'Extracted {len(tarf.getmembers())} files. Processing them...')
-
-                # Process each file in the tar archive
-                for member in tarf.getmembers():
-                    # Skip if it's a directory
-                    if member.isfile() and member.name.endswith(SUPPORTED_EXT_IN_COMPRESSED_FILE_TUPLE):
-                        with tarf.extractfile(member) as f:
-                            self.logger.info(f'Reading file {member.name}')
-                            yield from self._convert_file_to_str(f, member.name)
+            with tarfile.open(fileobj=file.file, mode="r|*") as tarf:
+                yield from self._submit_archive_members(tarf)
         except tarfile.TarError as tar_error:
             self.logger.error(tar_error)
             raise tarfile.TarError(f"Invalid tar file: {tar_error}")
+        except FileTooLargeError:
+            raise
         except Exception as ex:
             raise Exception(f"An error occurred while extracting the file {file.filename}") from ex
     
-    def _extract_documents_from_gzip_file(self, file: UploadFile = File(...)) -> Generator[str, None, None]:
+    def _extract_documents_from_gzip_file(self, file: UploadFile = File(...)) -> Generator[Future, None, None]:
         self.logger.debug(f'Extracting files from gzip file {file.filename}')
         try:
-            content = file.file.read()
-            with (
-                TemporaryDirectory() as temp_dir,
-                gzip.open(io.BytesIO(content)) as gzf
-            ):
+            with gzip.open(file.file) as gzf:
                 # For .tar.gz files
                 if file.filename.endswith('.tar.gz'):
-                    with tarfile.open(fileobj=gzf) as tarf:
-                        tarf.extractall(path=temp_dir, filter="data")
-                        self.logger.info(f'Extracted {len(tarf.getmembers())} files. Processing them...')
-                        
-                        for member in tarf.getmembers():
-                            if member.isfile() and member.name.endswith(SUPPORTED_EXT_IN_COMPRESSED_FILE_TUPLE):
-                                with tarf.extractfile(member) as f:
-                                    self.logger.info(f'Reading file {member.name}')
-                                    yield from self._convert_file_to_str(f, member.name)
+                    with tarfile.open(fileobj=gzf, mode="r|") as tarf:
+                        yield from self._submit_archive_members(tarf)
                 # For single .gz files
                 else:
-                    decompressed_content = gzf.read()
+                    file_name = file.filename.removesuffix('.gz')
                     if file.filename.endswith('.pdf.gz'):
-                        doc = Document(stream=decompressed_content)
-                        yield from self._convert_from_doc_to_str(doc)
+                        yield from self._submit_pdf(self._copy_member(gzf, file_name), file_name)
                     elif file.filename.endswith(('.txt.gz', '.md.gz')):
-                        yield self._convert_bytes_to_str(decompressed_content)
+                        yield from self._submit_text_file(self._copy_member(gzf, file_name), file_name)
                         
         except gzip.BadGzipFile as gzip_error:
             self.logger.error(gzip_error)
             raise gzip.BadGzipFile(f"Invalid gzip file: {gzip_error}")
+        except FileTooLargeError:
+            raise
         except Exception as ex:
             raise Exception(f"An error occurred while extracting the file {file.filename}") from ex
 
-    def extract_documents_from_file(self, file: UploadFile = File(...)) -> Generator[str, None, None]:
+    def check_file(self, file: UploadFile = File(...)):
+        """
+        Check, without extracting it, that a file can be processed, so that errors can be reported before
+        the extraction starts in background.
+
+        The file is read from its current position, which is restored afterwards.
+
+        Args:
+            file (UploadFile): The file to check.
+
+        Raises:
+            InvalidFileError: If the file extension is not supported
+            BadZipFile: If the zip file is corrupted or invalid
+            TarError: If the tar file is corrupted or invalid
+            BadGzipFile: If the gzip file is corrupted or invalid
+            FileTooLargeError: If the file, or the declared size of the files of a zip archive, exceeds the limit
+        """
+        file_type = get_file_type(file)
+        position = file.file.tell()
+        try:
+            match file_type:
+                case FileType.TEXT | FileType.PDF:
+                    if self._max_uncompressed_bytes and (file.size or 0) > self._max_uncompressed_bytes:
+                        raise FileTooLargeError(file.filename, self._max_uncompressed_bytes)
+                case FileType.ZIP:
+                    with ZipFile(file.file) as zipf:
+                        declared_size = sum(info.file_size for info in zipf.infolist())
+                    if self._max_uncompressed_bytes and declared_size > self._max_uncompressed_bytes:
+                        raise FileTooLargeError(file.filename, self._max_uncompressed_bytes)
+                case FileType.TAR:
+                    with tarfile.open(fileobj=file.file, mode="r|*") as tarf:
+                        tarf.next()
+                case FileType.GZIP:
+                    with gzip.open(file.file) as gzf:
+                        gzf.read(1)
+                case _:
+                    raise InvalidFileError(filename=file.filename)
+        finally:
+            file.file.seek(position)
+
+    def extract_documents_from_file(self, file: UploadFile = File(...)) -> Generator[ParsedDocument, None, None]:
         """
         Extract text content from various file types and return it as a Generator.
                 
@@ -172,38 +323,63 @@ class FileParser:
             file (UploadFile): The file to process, supported formats are PDF, TXT, MD, and ZIP
             
         Returns:
-            Generator[str, None, None]: A generator that yields strings of text content
+            Generator[ParsedDocument, None, None]: A generator that yields the text content, with the name of the
+                file it comes from and, for PDF files, the number of the page
             
         Raises:
             InvalidFileError: If the file extension is not supported
             BadZipFile: If the zip file is corrupted or invalid
             TarError: If the tar file is corrupted or invalid
             BadGzipFile: If the gzip file is corrupted or invalid
+            FileTooLargeError: If the files extracted exceed the maximum number of uncompressed bytes
             Exception: For general processing errors
         
         """
         self.logger.info(f"Extracting documents from file {file.filename}")
 
+        self._uncompressed_bytes = 0
         file_type = get_file_type(file)
 
         if file_type is None:
             raise InvalidFileError(filename=file.filename)
         
-        result: list[str] | Generator[str, None, None] = []
-
         match file_type:
             case FileType.TEXT:
-                result = [self._convert_text_to_str(file)]
+                self._check_uncompressed_size(file.size or 0, file.filename)
+                result = [
+                    ParsedDocument(
+                        text=self._convert_text_to_str(file),
+                        file_name=file.filename,
+                        markdown=file.content_type == MD_CONTENT_TYPE or self._is_markdown(file.filename)
+                    )
+                ]
             case FileType.PDF:
-                result = self._convert_pdf_to_str(file)
+                result = self._collect_with_pool(self._submit_pdf_upload, file)
             case FileType.ZIP:
-                result = self._extract_documents_from_zip_file(file)
+                result = self._collect_with_pool(self._extract_documents_from_zip_file, file)
             case FileType.TAR:
-                result = self._extract_documents_from_tar_file(file)
+                result = self._collect_with_pool(self._extract_documents_from_tar_file, file)
             case FileType.GZIP:
-                result = self._extract_documents_from_gzip_file(file)
+                result = self._collect_with_pool(self._extract_documents_from_gzip_file, file)
             case _:
                 raise InvalidFileError(filename=file.filename)
-            
-        self.logger.info(f"Completed documents extraction from file {file.filename}")
+
         yield from result
+        self.logger.info(f"Completed documents extraction from file {file.filename}")
+
+    def _collect_with_pool(
+        self,
+        submit: Callable[[UploadFile], Iterator[Future]],
+        file: UploadFile
+    ) -> Generator[ParsedDocument, None, None]:
+        """
+        Collect the documents of the tasks submitted for a file, in the pool of processes if enabled and started.
+        The files of an archive are copied to a temporary directory, removed once the documents are collected.
+        """
+        executor = get_pdf_process_pool() if self._processes > 1 else None
+        with TemporaryDirectory() as temp_dir:
+            self._temp_dir, self._temp_files_count, self._executor = temp_dir, 0, executor
+            try:
+                yield from self._collect(submit(file))
+            finally:
+                self._temp_dir, self._executor = None, None
@@ -0,0 +1,32 @@
+"""
+Module providing the ParsedDocument class, a text extracted from an uploaded file.
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass
+class ParsedDocument:
+    """
+    A text extracted from an uploaded file, such as a page of a PDF file or a text file inside an archive.
+
+    Attributes:
+        text (str): The extracted text.
+        file_name (str | None): The name of the file the text comes from (for archives, the name of the member).
+        page (int | None): The 1-based number of the page the text comes from, for PDF files.
+        markdown (bool): Whether the text is Markdown, as it comes from a .md or .mdx file.
+    """
+    text: str
+    file_name: str | None = None
+    page: int | None = None
+    markdown: bool = False
+
+    @property
+    def metadata(self) -> dict:
+        """The metadata stored with the chunks of the document."""
+        metadata = {}
+        if self.file_name is not None:
+            metadata["file_name"] = self.file_name
+        if self.page is not None:
+            metadata["page"] = self.page
+        return metadata
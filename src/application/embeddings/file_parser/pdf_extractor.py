@@ -0,0 +1,57 @@
+"""
+Module providing the functions extracting the text of PDF files, that can be run in the processes of a pool.
+
+This module must stay lightweight, as it is the only one the processes of the pool need.
+"""
+
+from typing import List, Tuple
+
+from pymupdf import Document
+
+from application.embeddings.file_parser.parsed_document import ParsedDocument
+
+
+def _open_document(source: str | bytes) -> Document:
+    return Document(stream=source) if isinstance(source, bytes) else Document(source)
+
+
+def count_pdf_pages(source: str | bytes) -> int:
+    """
+    Count the pages of a PDF file.
+
+    Args:
+        source (str | bytes): The path or the content of the PDF file.
+    """
+    with _open_document(source) as doc:
+        return doc.page_count
+
+
+def split_pdf_pages(page_count: int, pages_per_task: int) -> List[Tuple[int, int]]:
+    """
+    Split the pages of a PDF file into ranges of at most `pages_per_task` pages.
+
+    Returns:
+        List[Tuple[int, int]]: The ranges, as 0-based tuples (start, end), end excluded.
+    """
+    return [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+
+
+def extract_pdf_pages(source: str | bytes, file_name: str | None, start: int, end: int) -> List[ParsedDocument]:
+    """
+    Extract the text of a range of pages of a PDF file.
+
+    Args:
+        source (str | bytes): The path or the content of the PDF file. Processes of a pool should receive a path,
+            to avoid copying the whole file for each range of pages.
+        file_name (str | None): The name of the PDF file, stored in the metadata of the pages.
+        start (int): The 0-based number of the first page of the range.
+        end (int): The 0-based number of the page following the last one of the range.
+
+    Returns:
+        List[ParsedDocument]: The text of each page, in order.
+    """
+    with _open_document(source) as doc:
+        return [
+            ParsedDocument(text=doc[number].get_text(), file_name=file_name, page=number + 1)
+            for number in range(start, end)
+        ]
@@ -0,0 +1,47 @@
+"""
+Module providing the pool of processes extracting the PDF files, shared by all the uploads of the process.
+
+The processes are forked once, by `start_pdf_process_pool`, which must be called at startup, before the application
+starts any thread: forking a process running threads can deadlock the child on a lock held by another thread at the
+time of the fork. They are forked rather than spawned, as spawned processes would import again the entry point of
+the application, which starts the server.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def start_pdf_process_pool(processes: int) -> ProcessPoolExecutor | None:
+    """
+    Start the pool of processes extracting the PDF files, if not started yet.
+
+    Args:
+        processes (int): The number of processes of the pool. With 0 or 1, no pool is started.
+
+    Returns:
+        ProcessPoolExecutor | None: The pool, or None if no pool is started.
+    """
+    global _executor
+    if processes <= 1 or _executor is not None:
+        return _executor
+
+    _executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("fork"))
+    # With the fork context, all the processes of the pool are forked when the first task is submitted
+    _executor.submit(os.getpid).result()
+    return _executor
+
+
+def get_pdf_process_pool() -> ProcessPoolExecutor | None:
+    """The pool of processes extracting the PDF files, or None if it was not started."""
+    return _executor
+
+
+def shutdown_pdf_process_pool():
+    """Stop the processes of the pool, if started."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
@@ -0,0 +1,77 @@
+"""
+Module providing the HtmlExtractor class.
+"""
+
+from html.parser import HTMLParser
+
+# Tags whose content is not part of the text of the page: scripts and styles, and the navigation and footer
+# blocks repeated on every page of a website
+SKIPPED_TAGS = {"script", "style", "template", "nav", "footer"}
+
+# Tags starting a new block of text
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "details", "div", "dl", "dt", "figcaption", "figure",
+    "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "noscript", "ol", "p", "pre", "section",
+    "summary", "table", "td", "th", "title", "tr", "ul",
+}
+
+
+class HtmlExtractor(HTMLParser):
+    """
+    A class that parses HTML in a single pass, extracting both the text and the hyperlinks.
+
+    The content of scripts, styles, navigation menus and footers is dropped from the text, while their hyperlinks
+    are kept, so that the crawl can still follow them. Whitespace is collapsed, and each block of text
+    (paragraph, heading, list item, ...) is returned on its own line.
+
+    Attributes:
+        hyperlinks (list): A list to store the extracted hyperlinks.
+
+    Methods:
+        handle_starttag(tag, attrs): Overrides the HTMLParser's handle_starttag method to extract hyperlinks.
+        handle_data(data): Overrides the HTMLParser's handle_data method to extract the text.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # Create a list to store the hyperlinks
+        self.hyperlinks = []
+        self._lines = []
+        self._line = []
+        # Number of skipped tags the parser is currently inside of
+        self._skipped_depth = 0
+
+    @property
+    def text(self) -> str:
+        """The text of the page, with a line for each block."""
+        self._end_line()
+        return "\n".join(self._lines)
+
+    def _end_line(self):
+        line = " ".join("".join(self._line).split())
+        if line:
+            self._lines.append(line)
+        self._line = []
+
+    # Override the HTMLParser's handle_starttag method to get the hyperlinks
+    def handle_starttag(self, tag, attrs):
+        # If the tag is an anchor tag and it has an href attribute, add the href attribute to the list of hyperlinks
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.hyperlinks.append(href)
+
+        if tag in SKIPPED_TAGS:
+            self._skipped_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._end_line()
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self._skipped_depth = max(self._skipped_depth - 1, 0)
+        elif tag in BLOCK_TAGS:
+            self._end_line()
+
+    def handle_data(self, data):
+        if not self._skipped_depth:
+            self._line.append(data)
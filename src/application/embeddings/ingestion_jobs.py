@@ -0,0 +1,409 @@
+"""
+Module providing the IngestionJobManager class, which tracks the embeddings generation processes as jobs.
+"""
+
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from application.embeddings.errors import IngestionCancelledError, TooManyIngestionJobsError
+from context import AppContext
+from helpers.sql_storage import SqlStorage
+
+# Types of ingestion jobs
+URL_JOB_TYPE = "url"
+FILE_JOB_TYPE = "file"
+REBUILD_JOB_TYPE = "rebuild"
+
+# Statuses of ingestion jobs
+QUEUED_STATUS = "queued"
+RUNNING_STATUS = "running"
+COMPLETED_STATUS = "completed"
+FAILED_STATUS = "failed"
+CANCELLED_STATUS = "cancelled"
+
+FINAL_STATUSES = (COMPLETED_STATUS, FAILED_STATUS, CANCELLED_STATUS)
+
+
+def get_dedup_ratio(chunks: int, duplicates: int) -> float:
+    """The fraction of the chunks skipped as near-duplicates, out of the chunks embedded or skipped."""
+    return duplicates / (chunks + duplicates) if chunks + duplicates else 0.0
+
+
+class IngestionJob:
+    """
+    An embeddings generation process, with its progress.
+
+    The progress is updated by the threads running the ingestion, and read by the requests asking for the job
+    status: access to the counters is synchronized.
+    """
+
+    def __init__(self, job_id: str, job_type: str, source: str, on_progress: Callable[["IngestionJob"], None]):
+        self.id = job_id
+        self.job_type = job_type
+        self.source = source
+        self.status = QUEUED_STATUS
+        self.error: str | None = None
+        self.pages = 0
+        self.chunks = 0
+        self.tokens = 0
+        self.errors = 0
+        self.duplicates = 0
+        self.created_at = datetime.now()
+        self.started_at: datetime | None = None
+        self._on_progress = on_progress
+        self._lock = threading.Lock()
+        self._cancel_requested = threading.Event()
+        self._released = False
+        # The time the job was last persisted, on the monotonic clock
+        self._persisted_at = 0.0
+        # The worker process the job has been claimed by, if any
+        self.worker_id: str | None = None
+
+    @property
+    def is_cancelled(self) -> bool:
+        """Whether the cancellation of the job has been requested."""
+        return self._cancel_requested.is_set()
+
+    @property
+    def is_released(self) -> bool:
+        """Whether the job has been stopped to be put back in the queue, instead of being cancelled."""
+        return self._released
+
+    def cancel(self):
+        """Request the cancellation of the job. The ingestion stops as soon as it checks the request."""
+        self._cancel_requested.set()
+
+    def release(self):
+        """Stop the job to put it back in the queue, e.g. because its worker is shutting down."""
+        self._released = True
+        self._cancel_requested.set()
+
+    def add_progress(self, pages: int = 0, chunks: int = 0, tokens: int = 0, duplicates: int = 0):
+        """
+        Add the pages (or documents) read, the chunks and tokens embedded, and the chunks skipped as near-duplicates,
+        to the progress of the job.
+        """
+        with self._lock:
+            self.pages += pages
+            self.chunks += chunks
+            self.tokens += tokens
+            self.duplicates += duplicates
+        self._on_progress(self)
+
+    def is_persist_due(self, interval: float) -> bool:
+        """Whether the job has not been persisted in the last `interval` seconds."""
+        with self._lock:
+            return time.monotonic() - self._persisted_at >= interval
+
+    def mark_persisted(self):
+        """Record that the job has just been persisted."""
+        with self._lock:
+            self._persisted_at = time.monotonic()
+
+    def set_errors(self, errors: int):
+        """Set the number of items failed while processing the job."""
+        with self._lock:
+            self.errors = errors
+
+    def snapshot(self) -> dict:
+        """The job and its progress, as a dictionary."""
+        with self._lock:
+            return {
+                "id": self.id,
+                "type": self.job_type,
+                "source": self.source,
+                "status": self.status,
+                "pages": self.pages,
+                "chunks": self.chunks,
+                "tokens": self.tokens,
+                "errors": self.errors,
+                "duplicates": self.duplicates,
+                "dedupRatio": get_dedup_ratio(self.chunks, self.duplicates),
+                "error": self.error,
+                "createdAt": self.created_at,
+                "startedAt": self.started_at,
+                "finishedAt": None,
+            }
+
+
+class IngestionJobManager:
+    """
+    Runs the embeddings generation processes as jobs, up to a maximum number at the same time.
+
+    Each job has an ID, a status and a progress, persisted in the `ingestion_jobs` table: the progress is written
+    at most once every `progressInterval` seconds while the job runs, and when it finishes. Running jobs can be
+    cancelled.
+
+    The jobs created in this process are assigned to it: once started with `start`, the manager updates their
+    heartbeat every `worker.heartbeatInterval` seconds, and stops the ones whose cancellation has been requested
+    by another process (e.g. another replica of the API). The jobs of a process without heartbeat for
+    `worker.heartbeatTimeout` seconds (e.g. because it was restarted) are marked as failed.
+
+    Jobs can also be enqueued in the `ingestion_jobs` table, with the parameters needed to run them, to be claimed
+    and run by the worker processes (see `IngestionWorker`).
+
+    Args:
+        app_context (AppContext): The application context, used to access the database.
+    """
+
+    def __init__(self, app_context: AppContext):
+        self.logger = app_context.logger
+        self._sql_storage = SqlStorage(app_context)
+        configuration = app_context.configurations.ingestion.jobs
+        self._max_concurrent_jobs = configuration.maxConcurrentJobs
+        self._progress_interval = configuration.progressInterval
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._lock = threading.Lock()
+        worker_configuration = app_context.configurations.ingestion.worker
+        self._heartbeat_interval = worker_configuration.heartbeatInterval
+        self._heartbeat_timeout = worker_configuration.heartbeatTimeout
+        # The unique ID of this process, stored in the jobs it creates and runs
+        self._owner_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    @property
+    def active_jobs(self) -> List[IngestionJob]:
+        """The jobs queued or running in this process."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    @property
+    def is_full(self) -> bool:
+        """Whether the maximum number of jobs is already queued or running in this process."""
+        with self._lock:
+            return len(self._jobs) >= self._max_concurrent_jobs
+
+    def create_job(self, job_type: str, source: str) -> IngestionJob:
+        """
+        Create a new job, to be run with `run_job`.
+
+        Raises:
+            TooManyIngestionJobsError: If the maximum number of jobs is already queued or running.
+        """
+        with self._lock:
+            if len(self._jobs) >= self._max_concurrent_jobs:
+                raise TooManyIngestionJobsError(self._max_concurrent_jobs)
+            job = IngestionJob(str(uuid.uuid4()), job_type, source, on_progress=self._persist_progress)
+            job.worker_id = self._owner_id
+            self._jobs[job.id] = job
+
+        try:
+            self._sql_storage.create_ingestion_job(job.id, job.job_type, job.source, job.status, worker_id=job.worker_id)
+        except Exception:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            raise
+        self.logger.info(f"Created ingestion job {job.id} ({job_type}: {source}).")
+        return job
+
+    def enqueue_job(self, job_type: str, source: str, payload: dict, job_id: str | None = None) -> str:
+        """
+        Enqueue a new job, to be run by a worker process.
+
+        Args:
+            job_type (str): The type of the job.
+            source (str): The URL or the name of the file to generate embeddings from.
+            payload (dict): The parameters needed by the worker to run the job.
+            job_id (str | None): The ID of the job, generated if not provided.
+
+        Returns:
+            str: The ID of the job.
+        """
+        job_id = job_id or str(uuid.uuid4())
+        self._sql_storage.enqueue_ingestion_job(job_id, job_type, source, payload)
+        self.logger.info(f"Enqueued ingestion job {job_id} ({job_type}: {source}).")
+        return job_id
+
+    def adopt_job(self, job_id: str, job_type: str, source: str, worker_id: str) -> IngestionJob:
+        """
+        Track a job claimed from the queue by a worker process, to be run with `run_job`. The job is persisted
+        only while it is still assigned to the worker.
+        """
+        job = IngestionJob(job_id, job_type, source, on_progress=self._persist_progress)
+        job.status = RUNNING_STATUS
+        job.worker_id = worker_id
+        with self._lock:
+            self._jobs[job.id] = job
+        return job
+
+    def _persist(self, job: IngestionJob, finished: bool = False):
+        snapshot = job.snapshot()
+        self._sql_storage.update_ingestion_job(
+            job.id,
+            snapshot["status"],
+            snapshot["pages"],
+            snapshot["chunks"],
+            snapshot["tokens"],
+            snapshot["errors"],
+            snapshot["error"],
+            finished=finished,
+            worker_id=job.worker_id,
+            duplicates=snapshot["duplicates"]
+        )
+        job.mark_persisted()
+
+    def _persist_progress(self, job: IngestionJob):
+        """
+        Persist the progress of a running job, if it was not persisted in the last `progressInterval` seconds.
+        """
+        if not job.is_persist_due(self._progress_interval):
+            return
+        try:
+            self._persist(job)
+        except Exception as ex:
+            self.logger.warning(f"Unable to persist the progress of ingestion job {job.id}: {str(ex)}")
+
+    def run_job(self, job: IngestionJob, ingest: Callable[[IngestionJob], None]):
+        """
+        Run the ingestion of a job, tracking its status. Errors are logged and stored in the job, not raised.
+
+        Args:
+            job (IngestionJob): The job created with `create_job`.
+            ingest (Callable): The function running the ingestion, receiving the job to report its progress.
+        """
+        try:
+            if job.is_cancelled:
+                raise IngestionCancelledError()
+            job.status = RUNNING_STATUS
+            job.started_at = datetime.now()
+            self._persist(job)
+            self.logger.info(f"Starting ingestion job {job.id}.")
+            ingest(job)
+            job.status = COMPLETED_STATUS
+            self.logger.info(
+                f"Ingestion job {job.id} completed: {job.chunks} chunks embedded, {job.duplicates} near-duplicates "
+                f"skipped (dedup ratio {get_dedup_ratio(job.chunks, job.duplicates):.2%})."
+            )
+        except IngestionCancelledError:
+            if job.is_released:
+                job.status = QUEUED_STATUS
+                self.logger.info(f"Ingestion job {job.id} stopped and put back in the queue.")
+            else:
+                job.status = CANCELLED_STATUS
+                self.logger.info(f"Ingestion job {job.id} cancelled.")
+        except Exception as ex:
+            job.status = FAILED_STATUS
+            job.error = str(ex)
+            self.logger.error(f"Error in ingestion job {job.id}: {str(ex)}")
+        finally:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            try:
+                self._persist(job, finished=job.status in FINAL_STATUSES)
+            except Exception as ex:
+                self.logger.error(f"Unable to persist the status of ingestion job {job.id}: {str(ex)}")
+
+    def _heartbeat(self):
+        """
+        Update the heartbeat of the jobs created in this process, stopping the ones cancelled from another process
+        or no longer assigned to this process.
+        """
+        jobs = {job.id: job for job in self.active_jobs if job.worker_id == self._owner_id}
+        if not jobs:
+            return
+
+        assigned = {
+            str(job_id): cancel_requested
+            for job_id, cancel_requested in self._sql_storage.heartbeat_ingestion_jobs(self._owner_id, list(jobs))
+        }
+        for job_id, job in jobs.items():
+            if job_id not in assigned:
+                self.logger.warning(f"Ingestion job {job_id} is no longer assigned to this process, stopping it.")
+                job.cancel()
+            elif assigned[job_id]:
+                job.cancel()
+
+    def _fail_abandoned_jobs(self):
+        for job_id in self._sql_storage.fail_abandoned_ingestion_jobs(self._heartbeat_timeout):
+            self.logger.warning(f"Ingestion job {job_id} abandoned by the process running it, marked as failed.")
+
+    def _run_heartbeat(self):
+        while True:
+            time.sleep(self._heartbeat_interval)
+            try:
+                self._heartbeat()
+                self._fail_abandoned_jobs()
+            except Exception as ex:
+                self.logger.error(f"Error updating the heartbeat of the ingestion jobs: {str(ex)}")
+
+    def start(self):
+        """
+        Mark as failed the jobs abandoned by a previous run of the process, then start updating the heartbeat
+        of the jobs created in this process in background.
+        """
+        try:
+            self._fail_abandoned_jobs()
+        except Exception as ex:
+            self.logger.error(f"Error checking the abandoned ingestion jobs: {str(ex)}")
+        threading.Thread(target=self._run_heartbeat, name="ingestion-jobs-heartbeat", daemon=True).start()
+
+    def cancel_job(self, job_id: str) -> bool:
+        """
+        Request the cancellation of a queued or running job. A job running in another process (e.g. a worker,
+        or another replica of the API) is stopped by that process, once it reads the request from the database.
+
+        Returns:
+            bool: True if the job has been found queued or running, False otherwise.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            row = self._sql_storage.request_ingestion_job_cancellation(job_id)
+            if row is None:
+                return False
+            # row -> (status, payload): the file uploaded for a queued job is not needed anymore
+            status, payload = row
+            if status == CANCELLED_STATUS and payload and payload.get("path") and os.path.exists(payload["path"]):
+                os.remove(payload["path"])
+        else:
+            job.cancel()
+        self.logger.info(f"Cancellation of ingestion job {job_id} requested.")
+        return True
+
+    def get_job(self, job_id: str) -> dict | None:
+        """
+        Get a job and its progress, from memory if it runs in this process, from the database otherwise.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job.snapshot()
+
+        row = self._sql_storage.read_ingestion_job(job_id)
+        return self._row_to_dict(row) if row else None
+
+    def list_jobs(self, limit: int = 50) -> List[dict]:
+        """
+        List the most recent jobs, with the live progress of the ones running in this process.
+        """
+        with self._lock:
+            jobs = dict(self._jobs)
+        return [
+            jobs[str(row[0])].snapshot() if str(row[0]) in jobs else self._row_to_dict(row)
+            for row in self._sql_storage.list_ingestion_jobs(limit)
+        ]
+
+    @staticmethod
+    def _row_to_dict(row) -> dict:
+        # row -> (id, job_type, source, status, pages, chunks, tokens, errors, error, created_at, started_at, finished_at,
+        #         duplicates)
+        return {
+            "id": str(row[0]),
+            "type": row[1],
+            "source": row[2],
+            "status": row[3],
+            "pages": row[4],
+            "chunks": row[5],
+            "tokens": row[6],
+            "errors": row[7],
+            "duplicates": row[12],
+            "dedupRatio": get_dedup_ratio(row[5], row[12]),
+            "error": row[8],
+            "createdAt": row[9],
+            "startedAt": row[10],
+            "finishedAt": row[11],
+        }
@@ -0,0 +1,256 @@
+"""
+Module providing the IngestionPipeline class, a set of asynchronous stages connected by bounded queues.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from logging import Logger
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Tuple
+
+from application.embeddings.errors import IngestionCancelledError
+from infrastracture.metrics.manager import MetricsManager
+
+# An item routed to a stage, as a tuple (stage name, item)
+RoutedItem = Tuple[str, Any]
+
+# The interval, in seconds, between two checks of the cancellation of the pipeline
+CANCELLATION_CHECK_INTERVAL = 0.5
+
+
+@dataclass
+class BatchPolicy:
+    """
+    The policy used by a stage to process its items in batches.
+
+    Attributes:
+        load (Callable): Function returning the fraction of the budget used by a batch. A batch is processed as soon
+            as its load reaches 1; an item that would bring the load over 1 is kept for the following batch.
+        max_wait (float): The maximum time, in seconds, to wait for further items before processing a batch that is not full.
+    """
+    load: Callable[[List[Any]], float]
+    max_wait: float = 1.0
+
+
+@dataclass
+class PipelineStage:
+    """
+    A stage of the pipeline.
+
+    Attributes:
+        name (str): The name of the stage, used to route items to it and as label of its metrics.
+        handler (Callable): The coroutine processing an item of the stage. It returns the items produced for the
+            following stages, as a list of tuples (stage name, item), or None.
+        workers (int): The number of items processed at the same time by the stage.
+        queue_size (int): The maximum number of items waiting to be processed by the stage. When the queue is full,
+            the stages producing items for this one wait for it to make room (backpressure). Zero means unbounded.
+        batch (BatchPolicy | None): If provided, each worker collects items until the batch is full or the maximum
+            wait elapses, and the handler receives the list of the collected items.
+    """
+    name: str
+    handler: Callable[[Any], Awaitable[Iterable[RoutedItem] | None]]
+    workers: int = 1
+    queue_size: int = 0
+    batch: BatchPolicy | None = None
+
+
+class IngestionPipeline:
+    """
+    Runs a set of stages concurrently, each one with its own workers and its own bounded input queue.
+
+    Items can be routed to any stage, including a previous one (e.g. the links found while parsing a page are
+    routed back to the fetch stage): to avoid a deadlock, such a stage must have an unbounded queue.
+
+    An error while processing an item is logged and counted, and it does not stop the pipeline. The pipeline
+    completes when all the initial items, and all the items they produced, have been processed.
+    """
+
+    def __init__(self, logger: Logger, metrics_manager: MetricsManager, stages: List[PipelineStage]):
+        self.logger = logger
+        self._metrics_manager = metrics_manager
+        self._stages: Dict[str, PipelineStage] = {stage.name: stage for stage in stages}
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._processed: Dict[str, int] = {stage.name: 0 for stage in stages}
+        self._errors: Dict[str, int] = {stage.name: 0 for stage in stages}
+        self._pending = 0
+        self._idle: asyncio.Event | None = None
+
+    @property
+    def processed(self) -> Dict[str, int]:
+        """The number of items processed by each stage."""
+        return self._processed
+
+    @property
+    def errors(self) -> Dict[str, int]:
+        """The number of items failed in each stage."""
+        return self._errors
+
+    def _update_queue_depth(self, stage_name: str):
+        self._metrics_manager.ingestion_pipeline_queue_depth.labels(stage=stage_name).set(
+            self._queues[stage_name].qsize()
+        )
+
+    def _acquire(self):
+        self._pending += 1
+        self._idle.clear()
+
+    def _release(self):
+        self._pending -= 1
+        if self._pending == 0:
+            self._idle.set()
+
+    async def _put(self, stage_name: str, item: Any):
+        """
+        Route an item to a stage, waiting if the queue of the stage is full.
+        """
+        self._acquire()
+        await self._queues[stage_name].put(item)
+        self._update_queue_depth(stage_name)
+
+    async def _collect_batch(
+        self,
+        stage: PipelineStage,
+        queue: asyncio.Queue,
+        carried_item: Any = None
+    ) -> Tuple[List[Any], Any]:
+        """
+        Collect items from the queue of the stage until the batch is full or the maximum wait elapses.
+
+        Returns:
+            tuple: The batch, and the item that did not fit in it (or None), to be carried into the following batch.
+        """
+        if carried_item is None:
+            carried_item = await queue.get()
+            self._update_queue_depth(stage.name)
+        batch = [carried_item]
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + stage.batch.max_wait
+        while stage.batch.load(batch) < 1:
+            remaining_wait = deadline - loop.time()
+            if remaining_wait <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), remaining_wait)
+            except asyncio.TimeoutError:
+                break
+            self._update_queue_depth(stage.name)
+
+            if stage.batch.load(batch + [item]) > 1:
+                return batch, item
+            batch.append(item)
+
+        return batch, None
+
+    async def _run_stage_worker(self, stage: PipelineStage):
+        queue = self._queues[stage.name]
+        carried_item = None
+        while True:
+            if stage.batch is None:
+                items = [await queue.get()]
+                self._update_queue_depth(stage.name)
+            else:
+                items, carried_item = await self._collect_batch(stage, queue, carried_item)
+
+            try:
+                outputs = await stage.handler(items if stage.batch is not None else items[0]) or []
+                for next_stage_name, next_item in outputs:
+                    await self._put(next_stage_name, next_item)
+                self._processed[stage.name] += len(items)
+                self._metrics_manager.ingestion_pipeline_items_processed.labels(stage=stage.name).inc(len(items))
+            except Exception as ex:
+                self._errors[stage.name] += len(items)
+                self._metrics_manager.ingestion_pipeline_errors.labels(stage=stage.name).inc(len(items))
+                self.logger.error(f"Error in ingestion stage \"{stage.name}\": {str(ex)}")
+            finally:
+                for _ in items:
+                    queue.task_done()
+                    self._release()
+
+    async def _run_producer(self, producer: AsyncIterable[RoutedItem]):
+        try:
+            async for stage_name, item in producer:
+                await self._put(stage_name, item)
+        finally:
+            self._release()
+
+    def _log_summary(self, elapsed: float):
+        for stage_name, processed in self._processed.items():
+            if processed == 0 and self._errors[stage_name] == 0:
+                continue
+            throughput = processed / elapsed if elapsed > 0 else 0
+            self.logger.info(
+                f"Ingestion stage \"{stage_name}\": {processed} items processed ({throughput:.2f} items/s), "
+                f"{self._errors[stage_name]} errors."
+            )
+
+    async def _wait_idle(self, is_cancelled: Callable[[], bool] | None):
+        if is_cancelled is None:
+            await self._idle.wait()
+            return
+
+        while not self._idle.is_set():
+            if is_cancelled():
+                raise IngestionCancelledError()
+            try:
+                await asyncio.wait_for(self._idle.wait(), CANCELLATION_CHECK_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(
+        self,
+        items: Iterable[RoutedItem] = (),
+        producer: AsyncIterable[RoutedItem] | None = None,
+        is_cancelled: Callable[[], bool] | None = None
+    ):
+        """
+        Run the pipeline until all the items have been processed.
+
+        Args:
+            items (Iterable[RoutedItem]): The initial items, as tuples (stage name, item).
+            producer (AsyncIterable[RoutedItem] | None): An optional asynchronous iterable of further initial items,
+                consumed while the pipeline is running, respecting the backpressure of the stages.
+            is_cancelled (Callable | None): An optional function, checked periodically, telling whether the pipeline
+                must be stopped. It can be called from any thread.
+
+        Raises:
+            IngestionCancelledError: If the pipeline has been stopped because cancelled.
+            Exception: The error raised by the producer, if any, once the items already produced are processed.
+        """
+        self._queues = {name: asyncio.Queue(maxsize=stage.queue_size) for name, stage in self._stages.items()}
+        self._idle = asyncio.Event()
+        self._idle.set()
+        start_time = time.monotonic()
+
+        workers = [
+            asyncio.create_task(self._run_stage_worker(stage))
+            for stage in self._stages.values()
+            for _ in range(stage.workers)
+        ]
+        producer_task = None
+        try:
+            if producer is not None:
+                self._acquire()
+                producer_task = asyncio.create_task(self._run_producer(producer))
+
+            # The pipeline cannot be idle until all the initial items are routed
+            self._acquire()
+            try:
+                for stage_name, item in items:
+                    await self._put(stage_name, item)
+            finally:
+                self._release()
+
+            await self._wait_idle(is_cancelled)
+        finally:
+            tasks = workers + ([producer_task] if producer_task is not None and not producer_task.done() else [])
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for stage_name in self._queues:
+                self._update_queue_depth(stage_name)
+            self._log_summary(time.monotonic() - start_time)
+
+        if producer_task is not None:
+            # Re-raise the error of the producer, if any
+            producer_task.result()
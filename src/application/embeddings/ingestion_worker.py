@@ -0,0 +1,185 @@
+"""
+Module providing the IngestionWorker class, which runs the ingestion jobs queued in the database.
+"""
+
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import UploadFile
+
+from application.embeddings.collection_rebuilder import CollectionRebuilder
+from application.embeddings.embedding_generator import EmbeddingGenerator
+from application.embeddings.file_parser.file_parser import FileParser
+from application.embeddings.ingestion_jobs import (
+    FILE_JOB_TYPE,
+    FINAL_STATUSES,
+    REBUILD_JOB_TYPE,
+    URL_JOB_TYPE,
+    IngestionJob,
+)
+from context import AppContext
+from helpers.sql_storage import SqlStorage
+
+
+class IngestionWorker:
+    """
+    Claims the ingestion jobs queued in the `ingestion_jobs` table and runs them, up to `maxConcurrentJobs`
+    at the same time.
+
+    Jobs are claimed with `FOR UPDATE SKIP LOCKED`, so that any number of workers, on any node, can share the queue.
+    While a job runs, the worker updates its heartbeat every `heartbeatInterval` seconds and stops it if its
+    cancellation has been requested. Jobs whose heartbeat is older than `heartbeatTimeout` seconds (e.g. because
+    their worker crashed) are put back in the queue, up to `maxAttempts` times.
+
+    Args:
+        app_context (AppContext): The application context, with the ingestion job manager.
+    """
+
+    def __init__(self, app_context: AppContext):
+        self.logger = app_context.logger
+        self._app_context = app_context
+        self._job_manager = app_context.ingestion_job_manager
+        self._sql_storage = SqlStorage(app_context)
+        self._configuration = app_context.configurations.ingestion.worker
+        self._worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._executor = ThreadPoolExecutor(
+            max_workers=app_context.configurations.ingestion.jobs.maxConcurrentJobs,
+            thread_name_prefix="ingestion-job"
+        )
+        self._stopped = threading.Event()
+
+    @property
+    def worker_id(self) -> str:
+        """The unique ID of the worker, stored in the jobs it claims."""
+        return self._worker_id
+
+    def stop(self):
+        """
+        Stop claiming jobs, and put the running ones back in the queue, so that other workers can resume them.
+        """
+        self.logger.info(f"Stopping ingestion worker {self._worker_id}...")
+        self._stopped.set()
+        for job in self._job_manager.active_jobs:
+            job.release()
+
+    def _ingest_url(self, job: IngestionJob, payload: dict):
+        with EmbeddingGenerator(app_context=self._app_context, job=job) as embedding_generator:
+            embedding_generator.generate_from_url(payload["url"], payload.get("filterPath"), replace=payload.get("replace", False))
+
+    def _ingest_file(self, job: IngestionJob, payload: dict):
+        file_parser_configuration = self._app_context.configurations.ingestion.fileParser
+        file_parser = FileParser(
+            self.logger,
+            processes=file_parser_configuration.processes,
+            pages_per_task=file_parser_configuration.pagesPerTask,
+            max_uncompressed_bytes=file_parser_configuration.maxUncompressedBytes
+        )
+        with open(payload["path"], "rb") as file:
+            upload = UploadFile(
+                file=file,
+                filename=payload["fileName"],
+                size=os.path.getsize(payload["path"]),
+                headers={"content-type": payload.get("contentType") or ""}
+            )
+            document_generator = file_parser.extract_documents_from_file(upload)
+            try:
+                with EmbeddingGenerator(app_context=self._app_context, job=job) as embedding_generator:
+                    embedding_generator.generate_from_documents(
+                        document_generator, source=upload.filename, replace=payload.get("replace", False)
+                    )
+            finally:
+                document_generator.close()
+
+    def _rebuild(self, job: IngestionJob, payload: dict):
+        collection_rebuilder = CollectionRebuilder(app_context=self._app_context, job=job)
+        collection_rebuilder.rebuild(
+            [(url["url"], url.get("filterPath")) for url in payload["urls"]],
+            include_files=payload.get("includeFiles", True)
+        )
+
+    def _run_job(self, job: IngestionJob, payload: dict):
+        def ingest(job: IngestionJob):
+            if job.job_type == URL_JOB_TYPE:
+                self._ingest_url(job, payload)
+            elif job.job_type == FILE_JOB_TYPE:
+                self._ingest_file(job, payload)
+            elif job.job_type == REBUILD_JOB_TYPE:
+                self._rebuild(job, payload)
+            else:
+                raise ValueError(f"Unsupported ingestion job type \"{job.job_type}\".")
+
+        self._job_manager.run_job(job, ingest)
+
+        # The uploaded file is kept until the job is finished, as a job put back in the queue needs it again
+        if job.job_type == FILE_JOB_TYPE and job.status in FINAL_STATUSES and os.path.exists(payload["path"]):
+            os.remove(payload["path"])
+
+    def _heartbeat(self):
+        """
+        Update the heartbeat of the running jobs, stopping the ones cancelled or no longer assigned to this worker.
+        """
+        jobs = {job.id: job for job in self._job_manager.active_jobs}
+        if not jobs:
+            return
+
+        assigned = {
+            str(job_id): cancel_requested
+            for job_id, cancel_requested in self._sql_storage.heartbeat_ingestion_jobs(self._worker_id, list(jobs))
+        }
+        for job_id, job in jobs.items():
+            if job_id not in assigned:
+                self.logger.warning(f"Ingestion job {job_id} is no longer assigned to this worker, stopping it.")
+                job.cancel()
+            elif assigned[job_id]:
+                job.cancel()
+
+    def _run_heartbeat(self):
+        while not self._stopped.wait(self._configuration.heartbeatInterval):
+            try:
+                self._heartbeat()
+                for job_id, status in self._sql_storage.requeue_abandoned_ingestion_jobs(
+                    self._configuration.heartbeatTimeout,
+                    self._configuration.maxAttempts
+                ):
+                    self.logger.warning(f"Ingestion job {job_id} abandoned by its worker, marked as {status}.")
+            except Exception as ex:
+                self.logger.error(f"Error updating the heartbeat of the ingestion jobs: {str(ex)}")
+
+    def _claim_job(self) -> bool:
+        """
+        Claim a queued job and start it, if any.
+
+        Returns:
+            bool: True if a job has been claimed, False otherwise.
+        """
+        row = self._sql_storage.claim_ingestion_job(self._worker_id)
+        if row is None:
+            return False
+
+        # row -> (id, job_type, source, payload)
+        job = self._job_manager.adopt_job(str(row[0]), row[1], row[2], self._worker_id)
+        self.logger.info(f"Claimed ingestion job {job.id} ({job.job_type}: {job.source}).")
+        self._executor.submit(self._run_job, job, row[3])
+        return True
+
+    def run(self):
+        """
+        Claim and run the queued jobs until the worker is stopped, then wait for the running jobs to be released.
+        """
+        self.logger.info(f"Ingestion worker {self._worker_id} started.")
+        heartbeat_thread = threading.Thread(target=self._run_heartbeat, name="ingestion-heartbeat", daemon=True)
+        heartbeat_thread.start()
+
+        while not self._stopped.is_set():
+            try:
+                if not self._job_manager.is_full and self._claim_job():
+                    continue
+            except Exception as ex:
+                self.logger.error(f"Error claiming an ingestion job: {str(ex)}")
+            self._stopped.wait(self._configuration.pollInterval)
+
+        self._executor.shutdown(wait=True)
+        self.logger.info(f"Ingestion worker {self._worker_id} stopped.")
@@ -0,0 +1,177 @@
+"""
+Module providing the MarkdownChunker class, which splits Markdown texts following their heading hierarchy.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Callable, List, Tuple
+
+# Regex patterns to match an ATX heading, the opening fence of a code block and a line that can close it
+HEADING_PATTERN = re.compile(r"^ {0,3}(#{1,6})[ \t]+(.+?)[ \t#]*$")
+FENCE_PATTERN = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+CLOSING_FENCE_PATTERN = re.compile(r"^ {0,3}(`{3,}|~{3,})[ \t]*$")
+
+# Separator of the headings in the breadcrumb of a chunk
+BREADCRUMB_SEPARATOR = " > "
+
+
+@dataclass
+class MarkdownSection:
+    """
+    A section of a Markdown text: a heading, the blocks of text before the following heading, and the subsections.
+    """
+    level: int
+    headings: List[str]
+    blocks: List[str] = field(default_factory=list)
+    children: List["MarkdownSection"] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        """The text of the section, including the subsections."""
+        return "\n\n".join(self.blocks + [child.text for child in self.children])
+
+
+class MarkdownChunker:
+    """
+    Splits Markdown texts into chunks following their heading hierarchy.
+
+    A section fitting in a chunk, including its subsections, is kept in a single chunk; otherwise its own text
+    is packed into chunks on paragraph boundaries, and each subsection is split in turn. Code blocks are never split,
+    even when longer than a chunk; other blocks longer than a chunk are split with the fallback splitter.
+
+    Each chunk comes with the breadcrumb of the headings of its section (e.g. "Installation > Linux").
+
+    Args:
+        length_function (Callable): Function returning the length of a text, in the same unit as the chunk size.
+        chunk_size (int): The maximum length of a chunk.
+        fallback_split (Callable): Function splitting a block of text longer than a chunk.
+    """
+
+    def __init__(self, length_function: Callable[[str], int], chunk_size: int, fallback_split: Callable[[str], List[str]]):
+        self._length_function = length_function
+        self._chunk_size = chunk_size
+        self._fallback_split = fallback_split
+
+    @staticmethod
+    def _is_closing_fence(line: str, fence: str) -> bool:
+        """
+        Whether the line closes the code block opened by the fence: as in CommonMark, a line with the character of the
+        fence repeated at least as many times, followed only by whitespace.
+        """
+        closing_match = CLOSING_FENCE_PATTERN.match(line)
+        if closing_match is None:
+            return False
+        closing_fence = closing_match.group(1)
+        return closing_fence[0] == fence[0] and len(closing_fence) >= len(fence)
+
+    def _parse_blocks(self, text: str) -> List[Tuple[str, int, str]]:
+        """
+        Split the text into blocks: headings, code blocks and paragraphs.
+
+        Returns:
+            list: The blocks, as tuples (kind, heading level, text), with kind "heading", "code" or "text".
+        """
+        blocks, paragraph = [], []
+        fence = None
+
+        def end_paragraph():
+            if paragraph:
+                blocks.append(("text", 0, "\n".join(paragraph)))
+                paragraph.clear()
+
+        for line in text.split("\n"):
+            if fence is not None:
+                paragraph.append(line)
+                if self._is_closing_fence(line, fence):
+                    blocks.append(("code", 0, "\n".join(paragraph)))
+                    paragraph.clear()
+                    fence = None
+                continue
+
+            fence_match = FENCE_PATTERN.match(line)
+            heading_match = HEADING_PATTERN.match(line)
+            if fence_match:
+                end_paragraph()
+                fence = fence_match.group(1)
+                paragraph.append(line)
+            elif heading_match:
+                end_paragraph()
+                blocks.append(("heading", len(heading_match.group(1)), line.strip()))
+            elif not line.strip():
+                end_paragraph()
+            else:
+                paragraph.append(line)
+
+        # An unclosed code block extends to the end of the text
+        if fence is not None:
+            blocks.append(("code", 0, "\n".join(paragraph)))
+        else:
+            end_paragraph()
+        return blocks
+
+    def _build_sections(self, text: str) -> MarkdownSection:
+        root = MarkdownSection(level=0, headings=[])
+        stack = [root]
+        for kind, level, block in self._parse_blocks(text):
+            if kind == "heading":
+                while stack[-1].level >= level:
+                    stack.pop()
+                title = HEADING_PATTERN.match(block).group(2).strip()
+                section = MarkdownSection(level=level, headings=stack[-1].headings + [title], blocks=[block])
+                stack[-1].children.append(section)
+                stack.append(section)
+            else:
+                stack[-1].blocks.append(block if kind == "code" else block.strip())
+        return root
+
+    def _pack_blocks(self, blocks: List[str]) -> List[str]:
+        """
+        Pack consecutive blocks into chunks up to the chunk size, splitting the text blocks longer than a chunk.
+        """
+        chunks, current = [], []
+        current_length = 0
+        for block in blocks:
+            length = self._length_function(block)
+            if length > self._chunk_size and not FENCE_PATTERN.match(block):
+                pieces = self._fallback_split(block)
+            else:
+                pieces = [block]
+
+            for piece in pieces:
+                piece_length = self._length_function(piece) if len(pieces) > 1 else length
+                if current and current_length + piece_length > self._chunk_size:
+                    chunks.append("\n\n".join(current))
+                    current, current_length = [], 0
+                current.append(piece)
+                current_length += piece_length
+        if current:
+            chunks.append("\n\n".join(current))
+        return chunks
+
+    def _split_section(self, section: MarkdownSection) -> List[Tuple[str, str]]:
+        breadcrumb = BREADCRUMB_SEPARATOR.join(section.headings)
+        text = section.text
+        if not text.strip():
+            return []
+        if self._length_function(text) <= self._chunk_size:
+            return [(text, breadcrumb)]
+
+        # The heading is prepended to the first chunk of the section, and dropped if the section has no text
+        # of its own, as the breadcrumb of the subsections already includes it
+        heading, blocks = (section.blocks[0], section.blocks[1:]) if section.level > 0 else (None, section.blocks)
+        packed_blocks = self._pack_blocks(blocks)
+        if heading and packed_blocks:
+            packed_blocks[0] = f"{heading}\n\n{packed_blocks[0]}"
+        chunks = [(chunk, breadcrumb) for chunk in packed_blocks]
+        for child in section.children:
+            chunks.extend(self._split_section(child))
+        return chunks
+
+    def split_text(self, text: str) -> List[Tuple[str, str]]:
+        """
+        Split a Markdown text into chunks.
+
+        Returns:
+            list: The chunks, as tuples (text, breadcrumb of the headings of the section the chunk comes from).
+        """
+        return self._split_section(self._build_sections(text))
@@ -0,0 +1,165 @@
+"""
+Module providing the NearDuplicateDetector class, which finds the chunks nearly identical to the ones already stored.
+"""
+
+import hashlib
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from helpers.sql_storage import SqlStorage
+
+# Number of words of the shingles the chunks are split into to compare them
+SHINGLE_WORDS = 3
+
+# Prime and seed of the hash functions (a * x + b) mod p used to compute the MinHash signatures: the signatures are
+# persisted, so they must not change between processes. With 32-bit shingle hashes and coefficients below the prime,
+# the largest 32-bit prime, a * x + b never exceeds 64 bits
+HASH_PRIME = np.uint64((1 << 32) - 5)
+PERMUTATIONS_SEED = 1
+
+
+@dataclass
+class ChunkSignature:
+    """
+    The MinHash signature of a chunk, with the keys of its LSH bands.
+    """
+    point_id: str
+    signature: np.ndarray
+    band_keys: List[int]
+
+
+class NearDuplicateDetector:
+    """
+    Detects the chunks that are near-duplicates of chunks already stored in the collection, or of chunks already
+    selected during the same ingestion, e.g. pages differing only by a date or a tracking parameter.
+
+    Each chunk has a MinHash signature, computed on the shingles of its words, whose fraction of equal values
+    estimates the Jaccard similarity of two chunks. The signatures are split into bands, hashed into keys: chunks
+    sharing at least a band key are candidates (locality-sensitive hashing), and a candidate whose estimated
+    similarity reaches the threshold is a near-duplicate.
+
+    The signatures of the stored chunks are persisted in the `chunk_signatures` table, indexed by band key.
+
+    Args:
+        sql_storage (SqlStorage): The storage of the signatures.
+        collection_name (str): The collection the chunks are stored in.
+        threshold (float): The estimated Jaccard similarity above which a chunk is a near-duplicate.
+        num_permutations (int): The number of values of the signatures.
+        bands (int): The number of LSH bands the signatures are split into.
+    """
+
+    def __init__(self, sql_storage: SqlStorage, collection_name: str, threshold: float, num_permutations: int, bands: int):
+        self._sql_storage = sql_storage
+        self._collection_name = collection_name
+        self._threshold = threshold
+        self._bands = bands
+        self._rows = num_permutations // bands
+
+        generator = np.random.RandomState(PERMUTATIONS_SEED)
+        self._a = generator.randint(1, HASH_PRIME, size=self._rows * bands, dtype=np.uint64)
+        self._b = generator.randint(0, HASH_PRIME, size=self._rows * bands, dtype=np.uint64)
+
+        # Signatures of the chunks selected during this ingestion, by band key
+        self._index: Dict[int, List[np.ndarray]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def _get_signature(self, text: str) -> np.ndarray:
+        words = text.lower().split()
+        shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(len(words) - SHINGLE_WORDS + 1, 1))}
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little') for shingle in shingles],
+            dtype=np.uint64
+        )
+        # Universal hashing of the shingles, without overflow (see HASH_PRIME)
+        values = (np.outer(hashes, self._a) + self._b) % HASH_PRIME
+        return values.min(axis=0).astype(np.uint32)
+
+    def _get_band_keys(self, signature: np.ndarray) -> List[int]:
+        return [
+            int.from_bytes(
+                hashlib.blake2b(
+                    band.to_bytes(2, 'little') + signature[band * self._rows:(band + 1) * self._rows].tobytes(),
+                    digest_size=8
+                ).digest(),
+                'little',
+                signed=True
+            )
+            for band in range(self._bands)
+        ]
+
+    def _is_near_duplicate(self, signature: np.ndarray, candidates: List[np.ndarray]) -> bool:
+        return any(np.mean(signature == candidate) >= self._threshold for candidate in candidates)
+
+    def filter_chunks(
+        self,
+        chunks: List[Document],
+        excluded_point_ids: Set[str] | None = None
+    ) -> Tuple[List[Document], List[ChunkSignature]]:
+        """
+        Remove the near-duplicates from the chunks.
+
+        Args:
+            chunks (List[Document]): The chunks to check, not yet stored in the collection.
+            excluded_point_ids (Set[str] | None): The IDs of the stored chunks not to compare with, e.g. the ones
+                of the previous version of the same page, which are about to be replaced.
+
+        Returns:
+            tuple: The chunks that are not near-duplicates, and their signatures, to be saved with `save_signatures`
+                once the chunks are stored.
+        """
+        signatures = []
+        for chunk in chunks:
+            signature = self._get_signature(chunk.page_content)
+            signatures.append(ChunkSignature(point_id=chunk.id, signature=signature, band_keys=self._get_band_keys(signature)))
+        if not signatures:
+            return [], []
+
+        # rows -> (point_id, signature, band_keys)
+        stored = defaultdict(list)
+        for point_id, signature, band_keys in self._sql_storage.find_chunk_signatures(
+            self._collection_name,
+            list({band_key for chunk_signature in signatures for band_key in chunk_signature.band_keys})
+        ):
+            if excluded_point_ids and str(point_id) in excluded_point_ids:
+                continue
+            for band_key in band_keys:
+                stored[band_key].append(np.frombuffer(signature, dtype=np.uint32))
+
+        kept_chunks, kept_signatures = [], []
+        with self._lock:
+            for chunk, chunk_signature in zip(chunks, signatures):
+                candidates = [
+                    candidate
+                    for band_key in chunk_signature.band_keys
+                    for candidate in stored.get(band_key, []) + self._index.get(band_key, [])
+                ]
+                if self._is_near_duplicate(chunk_signature.signature, candidates):
+                    continue
+                for band_key in chunk_signature.band_keys:
+                    self._index[band_key].append(chunk_signature.signature)
+                kept_chunks.append(chunk)
+                kept_signatures.append(chunk_signature)
+
+        return kept_chunks, kept_signatures
+
+    def save_signatures(self, signatures: List[ChunkSignature]):
+        """
+        Persist the signatures of stored chunks, to detect their near-duplicates in the following ingestions.
+        """
+        if signatures:
+            self._sql_storage.save_chunk_signatures(
+                self._collection_name,
+                [(signature.point_id, signature.signature.tobytes(), signature.band_keys) for signature in signatures]
+            )
+
+    def delete_signatures(self, point_ids: List[str]):
+        """
+        Remove the signatures of chunks deleted from the collection.
+        """
+        if point_ids:
+            self._sql_storage.delete_chunk_signatures(self._collection_name, point_ids)
@@ -0,0 +1,165 @@
+"""
+Module providing the QdrantWriter class, which writes points to a collection with concurrent, non-blocking upserts.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from logging import Logger
+from typing import Callable, List, Set
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import Filter, FilterSelector, HasIdCondition, PointIdsList, PointStruct
+
+from infrastracture.metrics.manager import MetricsManager
+
+# ID of no point, as point IDs are derived from the content of the chunks: deleting it is a no-op
+# operation used as a barrier, completed only once all the operations sent before are applied
+BARRIER_POINT_ID = "00000000-0000-0000-0000-000000000000"
+
+
+class QdrantWriter:
+    """
+    Writes points to a collection, splitting them into batches upserted concurrently with `wait=False`: Qdrant
+    acknowledges each request once the operation is stored in its write-ahead log, without waiting for the points
+    to be indexed.
+
+    At most `max_in_flight` requests, upserts or deletes, are sent at the same time, across all the threads writing:
+    further operations wait for a request to complete (backpressure). As Qdrant applies the operations in the order
+    they are acknowledged, an operation sent after `write` returns (e.g. removing the stale points of a page with
+    `delete`) is applied after the points are written. `flush` waits until all the operations are applied, and reports
+    the throughput; the writer can be used again after it, until `close` stops its threads.
+
+    Args:
+        client (QdrantClient): The client of the vector store.
+        collection_name (str): The collection the points are written to.
+        logger (Logger): The logger.
+        metrics_manager (MetricsManager): The manager of the metrics, exporting the points written and the throughput.
+        batch_size (int): The maximum number of points of a single upsert request.
+        max_in_flight (int): The maximum number of upsert requests sent at the same time.
+    """
+
+    def __init__(
+        self,
+        client: QdrantClient,
+        collection_name: str,
+        logger: Logger,
+        metrics_manager: MetricsManager,
+        batch_size: int,
+        max_in_flight: int
+    ):
+        self._client = client
+        self._collection_name = collection_name
+        self.logger = logger
+        self._metrics_manager = metrics_manager
+        self._batch_size = max(batch_size, 1)
+        self._executor = ThreadPoolExecutor(max_workers=max(max_in_flight, 1), thread_name_prefix="qdrant-writer")
+        self._in_flight = threading.BoundedSemaphore(max(max_in_flight, 1))
+        self._lock = threading.Lock()
+        self._pending: Set[Future] = set()
+        self._points_written = 0
+        self._started_at: float | None = None
+
+    def _run(self, operation: Callable, *args):
+        try:
+            operation(*args)
+        finally:
+            self._in_flight.release()
+
+    def _upsert(self, points: List[PointStruct]):
+        self._client.upsert(collection_name=self._collection_name, points=points, wait=False)
+        with self._lock:
+            self._points_written += len(points)
+        self._metrics_manager.ingestion_points_upserted.inc(len(points))
+
+    def _delete(self, point_ids: List[str]):
+        self._client.delete(
+            collection_name=self._collection_name,
+            points_selector=PointIdsList(points=point_ids),
+            wait=False
+        )
+
+    def _submit(self, operation: Callable, items: List):
+        """
+        Send the operation for each batch of items, waiting for a request to complete while `max_in_flight` are sent,
+        and return once all the requests are acknowledged.
+
+        Raises:
+            Exception: The error of the first failed request, once all the requests are completed.
+        """
+        with self._lock:
+            if self._started_at is None:
+                self._started_at = time.perf_counter()
+
+        futures = []
+        for start in range(0, len(items), self._batch_size):
+            self._in_flight.acquire()
+            try:
+                future = self._executor.submit(self._run, operation, items[start:start + self._batch_size])
+            except Exception:
+                self._in_flight.release()
+                raise
+            with self._lock:
+                self._pending.add(future)
+            future.add_done_callback(self._discard_pending)
+            futures.append(future)
+
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+
+    def _discard_pending(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def write(self, points: List[PointStruct]):
+        """
+        Upsert the points, returning once all of them are acknowledged by Qdrant.
+
+        Raises:
+            Exception: The error of the first failed request, once all the requests are completed.
+        """
+        self._submit(self._upsert, points)
+
+    def delete(self, point_ids: List[str]):
+        """
+        Delete the points, returning once the deletes are acknowledged by Qdrant: they are applied after the
+        operations acknowledged before.
+
+        Raises:
+            Exception: The error of the first failed request, once all the requests are completed.
+        """
+        self._submit(self._delete, point_ids)
+
+    def flush(self):
+        """
+        Wait until all the operations sent to the collection are applied, and report the throughput of the writes
+        since the previous flush.
+        """
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending)
+        with self._lock:
+            started_at, points_written = self._started_at, self._points_written
+            self._started_at, self._points_written = None, 0
+        if started_at is None:
+            return
+
+        # The barrier is filter-based, so that it is sent to all the shards of the collection
+        self._client.delete(
+            collection_name=self._collection_name,
+            points_selector=FilterSelector(filter=Filter(must=[HasIdCondition(has_id=[BARRIER_POINT_ID])])),
+            wait=True
+        )
+        elapsed = time.perf_counter() - started_at
+        throughput = points_written / elapsed if elapsed > 0 else 0.0
+        self._metrics_manager.ingestion_upsert_throughput.set(throughput)
+        self.logger.info(
+            f"Upserted {points_written} points to {self._collection_name} in {elapsed:.2f}s "
+            f"({throughput:.1f} points/s)."
+        )
+
+    def close(self):
+        """Stop the threads sending the requests, once the pending ones are completed."""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,204 @@
+"""
+Module providing the SourceManager class, which removes from the collection the chunks of a source (URL or file).
+"""
+
+from typing import Iterable, List, Set
+from urllib.parse import urlparse
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    MatchAny,
+    MatchValue,
+    PointIdsList,
+)
+
+from constants import SOURCE_PAYLOAD_KEY, SOURCE_PREFIXES_PAYLOAD_KEY
+from context import AppContext
+from helpers.sql_storage import SqlStorage
+
+# The number of points read, deleted by ID, or sources matched, with a single request
+SCROLL_LIMIT = 1000
+MAX_POINTS_PER_REQUEST = 1000
+MAX_SOURCES_PER_REQUEST = 500
+
+
+def get_source_prefixes(source: str) -> List[str]:
+    """
+    Get the prefixes of a URL source, at each segment of its path (e.g. "https://example.com",
+    "https://example.com/docs", "https://example.com/docs/page"), stored with its chunks to delete them by prefix.
+    Sources that are not URLs (e.g. file names) have no prefixes.
+    """
+    url = urlparse(source)
+    if not url.scheme or not url.netloc:
+        return []
+
+    prefix = f"{url.scheme}://{url.netloc}"
+    prefixes = [prefix]
+    for segment in url.path.split("/"):
+        if segment:
+            prefix = f"{prefix}/{segment}"
+            prefixes.append(prefix)
+    return prefixes
+
+
+class SourceManager:
+    """
+    Deletes and replaces the chunks of the sources stored in the collection.
+
+    Chunks are selected with filters on indexed payload fields: `metadata.source` for a single source, and
+    `source_prefixes` for all the URLs starting with a prefix. The crawl state of the deleted URLs and the signatures
+    of the deleted chunks are removed as well, so that a following crawl ingests the pages again.
+
+    Args:
+        app_context (AppContext): The application context.
+        collection_name (str | None): The collection the chunks are stored in. Defaults to the configured one.
+    """
+
+    def __init__(self, app_context: AppContext, collection_name: str | None = None):
+        self.logger = app_context.logger
+        self._collection_name = collection_name or app_context.configurations.vectorStore.collectionName
+        self._sql_storage = SqlStorage(app_context)
+        self._qdrant_client = QdrantClient(
+            url=app_context.env_vars.VECTOR_DB_CLUSTER_URI,
+            api_key=app_context.env_vars.VECTOR_DB_API_KEY
+        )
+
+    def _get_point_ids(self, points_filter: Filter) -> Set[str]:
+        point_ids = set()
+        offset = None
+        while True:
+            points, offset = self._qdrant_client.scroll(
+                collection_name=self._collection_name,
+                scroll_filter=points_filter,
+                limit=SCROLL_LIMIT,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False
+            )
+            point_ids.update(str(point.id) for point in points)
+            if offset is None:
+                return point_ids
+
+    def _delete_point_ids(self, point_ids: List[str]):
+        """
+        Delete the given points, in requests of at most `MAX_POINTS_PER_REQUEST` IDs.
+        """
+        for start in range(0, len(point_ids), MAX_POINTS_PER_REQUEST):
+            self._qdrant_client.delete(
+                collection_name=self._collection_name,
+                points_selector=PointIdsList(points=point_ids[start:start + MAX_POINTS_PER_REQUEST]),
+                wait=True
+            )
+
+    def _delete_points(self, points_filter: Filter, other_point_ids: Iterable[str] = ()) -> int:
+        """
+        Delete the points matching the filter, and the other given points.
+
+        Returns:
+            int: The number of points deleted.
+        """
+        point_ids = self._get_point_ids(points_filter)
+        if point_ids:
+            self._qdrant_client.delete(
+                collection_name=self._collection_name,
+                points_selector=FilterSelector(filter=points_filter),
+                wait=True
+            )
+
+        other_point_ids = list(set(other_point_ids) - point_ids)
+        if other_point_ids:
+            # Points of the crawl state may have been already removed: only the existing ones are counted
+            for start in range(0, len(other_point_ids), MAX_POINTS_PER_REQUEST):
+                existing_points = self._qdrant_client.retrieve(
+                    collection_name=self._collection_name,
+                    ids=other_point_ids[start:start + MAX_POINTS_PER_REQUEST],
+                    with_payload=False,
+                    with_vectors=False
+                )
+                point_ids.update(str(point.id) for point in existing_points)
+            self._delete_point_ids(other_point_ids)
+
+        if point_ids:
+            self._sql_storage.delete_chunk_signatures(self._collection_name, list(point_ids))
+        return len(point_ids)
+
+    def delete_sources(self, sources: List[str]) -> int:
+        """
+        Delete the chunks of the given sources (URLs or file names), the crawl state of the URLs and the stored
+        documents of the files.
+
+        Returns:
+            int: The number of chunks deleted.
+        """
+        deleted = 0
+        for start in range(0, len(sources), MAX_SOURCES_PER_REQUEST):
+            group = sources[start:start + MAX_SOURCES_PER_REQUEST]
+            crawl_point_ids = self._sql_storage.delete_crawl_states(self._collection_name, group)
+            self._sql_storage.delete_file_documents(self._collection_name, group)
+            deleted += self._delete_points(
+                Filter(must=[FieldCondition(key=SOURCE_PAYLOAD_KEY, match=MatchAny(any=group))]),
+                crawl_point_ids
+            )
+        self.logger.info(f"Deleted {deleted} chunks of {len(sources)} sources.")
+        return deleted
+
+    def delete_prefix(self, prefix: str) -> int:
+        """
+        Delete the chunks of all the URLs starting with the given prefix, at a path segment boundary
+        (e.g. "https://example.com/docs" matches "https://example.com/docs/page" but not "https://example.com/docs-old"),
+        and their crawl state.
+
+        Returns:
+            int: The number of chunks deleted.
+        """
+        prefix = prefix.rstrip("/")
+        crawl_point_ids = self._sql_storage.delete_crawl_states_by_prefix(self._collection_name, prefix)
+        deleted = self._delete_points(
+            Filter(must=[FieldCondition(key=SOURCE_PREFIXES_PAYLOAD_KEY, match=MatchValue(value=prefix))]),
+            crawl_point_ids
+        )
+        self.logger.info(f"Deleted {deleted} chunks of the sources starting with {prefix}.")
+        return deleted
+
+    def replace_source(self, source: str, point_ids: Set[str]) -> int:
+        """
+        Delete the chunks of a source that are not among the given ones, i.e. the chunks of the previous version
+        of a source ingested again. It must be called once the new chunks are stored, so that the source is never
+        missing from the collection.
+
+        The IDs of the chunks of the source are read, and the stale ones deleted by ID in bounded requests,
+        instead of sending the IDs to keep in the filter of a single request.
+
+        Returns:
+            int: The number of chunks deleted.
+        """
+        stale_point_ids = sorted(
+            self._get_point_ids(Filter(must=[FieldCondition(key=SOURCE_PAYLOAD_KEY, match=MatchValue(value=source))]))
+            - set(point_ids)
+        )
+        if stale_point_ids:
+            self._delete_point_ids(stale_point_ids)
+            self._sql_storage.delete_chunk_signatures(self._collection_name, stale_point_ids)
+        deleted = len(stale_point_ids)
+        self.logger.info(f"Deleted {deleted} chunks of the previous version of {source}.")
+        return deleted
+
+    def replace_crawled_sources(self, prefix: str, crawled_urls: Set[str]) -> int:
+        """
+        Delete the chunks of the URLs starting with the given prefix, stored by previous crawls, that have not been
+        found by the last crawl (e.g. pages removed from the website).
+
+        Returns:
+            int: The number of chunks deleted.
+        """
+        stale_urls = [
+            url for url in self._sql_storage.list_crawl_state_urls(self._collection_name, prefix.rstrip("/"))
+            if url not in crawled_urls
+        ]
+        if not stale_urls:
+            return 0
+        self.logger.info(f"Removing {len(stale_urls)} pages not found by the last crawl of {prefix}.")
+        return self.delete_sources(stale_urls)
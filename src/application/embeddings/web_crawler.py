@@ -0,0 +1,156 @@
+"""
+Module providing the WebCrawler class, an asynchronous HTTP client used to fetch the pages of a website.
+"""
+
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass
+from logging import Logger
+from urllib.parse import urlparse
+
+import httpx
+
+from application.embeddings.errors import PageFetchError
+
+# Status codes for which a request is retried, as the error is likely to be temporary
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+@dataclass
+class WebCrawlerConfiguration:
+    max_connections: int = 20
+    max_concurrency_per_host: int = 4
+    politeness_delay: float = 0.0
+    max_retries: int = 3
+    retry_backoff: float = 0.5
+    max_retry_delay: float = 30.0
+    request_timeout: float = 10.0
+
+
+@dataclass
+class CrawledPage:
+    url: str
+    status_code: int
+    headers: httpx.Headers
+    text: str
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status_code == 304
+
+    @property
+    def is_html(self) -> bool:
+        return self.headers.get("Content-Type", "").startswith("text/html")
+
+
+class WebCrawler:
+    """
+    Asynchronous HTTP client to fetch web pages.
+
+    All the requests share a pool of HTTP/1.1 keep-alive connections. The number of concurrent requests sent
+    to the same host is limited, and two requests to the same host are spaced by at least the politeness delay.
+    Requests failed with a network error or a temporary error status code are retried with exponential backoff,
+    or after the delay asked by the server, both capped by the maximum retry delay. A request waiting to be retried
+    does not hold its slot of the host, so that it does not hold back the other requests to the same host.
+
+    The class must be used as an asynchronous context manager, that opens and closes the connection pool:
+
+        async with WebCrawler(logger, configuration) as crawler:
+            page = await crawler.fetch(url)
+    """
+
+    def __init__(self, logger: Logger, configuration: WebCrawlerConfiguration):
+        self.logger = logger
+        self._configuration = configuration
+        self._client: httpx.AsyncClient | None = None
+        self._host_semaphores = defaultdict(lambda: asyncio.Semaphore(configuration.max_concurrency_per_host))
+        self._host_locks = defaultdict(asyncio.Lock)
+        self._host_last_request_at: dict[str, float] = {}
+
+    async def __aenter__(self) -> "WebCrawler":
+        self._client = httpx.AsyncClient(
+            http1=True,
+            http2=False,
+            follow_redirects=True,
+            timeout=self._configuration.request_timeout,
+            limits=httpx.Limits(
+                max_connections=self._configuration.max_connections,
+                max_keepalive_connections=self._configuration.max_connections
+            )
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self._client.aclose()
+        self._client = None
+
+    async def _wait_politeness_delay(self, host: str):
+        """
+        Wait until the politeness delay since the last request sent to the host has elapsed.
+        """
+        if self._configuration.politeness_delay <= 0:
+            return
+
+        loop = asyncio.get_running_loop()
+        async with self._host_locks[host]:
+            last_request_at = self._host_last_request_at.get(host)
+            if last_request_at is not None:
+                remaining_delay = last_request_at + self._configuration.politeness_delay - loop.time()
+                if remaining_delay > 0:
+                    await asyncio.sleep(remaining_delay)
+            self._host_last_request_at[host] = loop.time()
+
+    def _get_retry_delay(self, attempt: int, response: httpx.Response | None = None) -> float:
+        """
+        Get the delay before the next attempt, using the Retry-After header if provided by the server,
+        capped by the maximum retry delay.
+        """
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            delay = self._configuration.retry_backoff * (2 ** attempt)
+        return min(delay, self._configuration.max_retry_delay)
+
+    async def fetch(self, url: str, headers: dict | None = None) -> CrawledPage:
+        """
+        Fetch a page, retrying the request in case of temporary errors.
+
+        Args:
+            url (str): The URL of the page.
+            headers (dict | None): Additional headers of the request (e.g. the headers of a conditional request).
+
+        Returns:
+            CrawledPage: The fetched page. Its status code can be a client error (4xx) or a 304 (Not Modified).
+
+        Raises:
+            PageFetchError: If the page cannot be fetched after all the retries.
+        """
+        host = urlparse(url).netloc
+        attempt = 0
+
+        while True:
+            async with self._host_semaphores[host]:
+                await self._wait_politeness_delay(host)
+                response = None
+                try:
+                    response = await self._client.get(url, headers=headers)
+                    if response.status_code not in RETRYABLE_STATUS_CODES:
+                        return CrawledPage(
+                            url=url,
+                            status_code=response.status_code,
+                            headers=response.headers,
+                            text=response.text
+                        )
+                    reason = f"status code {response.status_code}"
+                except httpx.TransportError as ex:
+                    reason = f"{type(ex).__name__} {str(ex)}"
+
+            if attempt >= self._configuration.max_retries:
+                raise PageFetchError(url, reason)
+
+            # The slot of the host is released while waiting, so that the other requests to the host can proceed
+            delay = self._get_retry_delay(attempt, response)
+            self.logger.debug(f"Request to {url} failed ({reason}), retrying in {delay} seconds.")
+            attempt += 1
+            await asyncio.sleep(delay)
@@ -0,0 +1,79 @@
+import argparse
+import statistics
+import time
+
+import tiktoken
+
+from application.embeddings.document_chunker import (
+    CHARACTERS_STRATEGY,
+    SEMANTIC_STRATEGY,
+    TOKENS_STRATEGY,
+    DocumentChunker,
+)
+
+parser = argparse.ArgumentParser(prog="benchmark-chunking.py")
+parser.add_argument("files",            help="Text or Markdown files to split into chunks", nargs="+")
+parser.add_argument("--chunk-size",     help="Chunk size, in tokens (converted to characters for the characters strategy)", type=int, default=256)
+parser.add_argument("--chunk-overlap",  help="Chunk overlap, in tokens (converted to characters for the characters strategy)", type=int, default=50)
+parser.add_argument("--encoding",       help="The tiktoken encoding used to count the tokens", default="cl100k_base")
+parser.add_argument("--semantic-model", help="FastEmbed model used to benchmark the semantic strategy, skipped if not set", default=None)
+parser.add_argument("--rounds",         help="Number of times each file is split", type=int, default=3)
+
+
+def benchmark(chunker: DocumentChunker, texts: list[str], tokenizer: tiktoken.Encoding, rounds: int) -> dict:
+    chunks = []
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        chunks = [chunk for text in texts for chunk in chunker.split_text_into_chunks(text, source="benchmark")]
+    elapsed = (time.perf_counter() - start_time) / rounds
+
+    chunk_tokens = sorted(len(tokenizer.encode_ordinary(chunk.page_content)) for chunk in chunks)
+    text_tokens = sum(len(tokenizer.encode_ordinary(text)) for text in texts)
+    return {
+        "chunks": len(chunks),
+        "chunks/s": len(chunks) / elapsed if elapsed > 0 else 0,
+        "mean tokens": statistics.mean(chunk_tokens) if chunk_tokens else 0,
+        "p95 tokens": chunk_tokens[int(len(chunk_tokens) * 0.95)] if chunk_tokens else 0,
+        "max tokens": chunk_tokens[-1] if chunk_tokens else 0,
+        # Tokens embedded for each token of the texts: the overhead of the overlap between chunks
+        "embedded/text tokens": sum(chunk_tokens) / text_tokens if text_tokens else 0,
+    }
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    tokenizer = tiktoken.get_encoding(args.encoding)
+
+    texts = []
+    for path in args.files:
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            texts.append(f.read())
+    text_tokens = sum(len(tokenizer.encode_ordinary(text)) for text in texts)
+    characters_per_token = sum(len(text) for text in texts) / text_tokens if text_tokens else 4
+    print(f"{len(texts)} files, {text_tokens} tokens, {characters_per_token:.2f} characters per token")
+
+    chunkers = {
+        TOKENS_STRATEGY: DocumentChunker(
+            embedding=None,
+            tokenizer=tokenizer,
+            strategy=TOKENS_STRATEGY,
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap
+        ),
+        CHARACTERS_STRATEGY: DocumentChunker(
+            embedding=None,
+            strategy=CHARACTERS_STRATEGY,
+            chunk_size=round(args.chunk_size * characters_per_token),
+            chunk_overlap=round(args.chunk_overlap * characters_per_token)
+        ),
+    }
+    if args.semantic_model:
+        from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
+        chunkers[SEMANTIC_STRATEGY] = DocumentChunker(
+            embedding=FastEmbedEmbeddings(model_name=args.semantic_model),
+            strategy=SEMANTIC_STRATEGY
+        )
+
+    for strategy, chunker in chunkers.items():
+        results = benchmark(chunker, texts, tokenizer, args.rounds)
+        print(f"{strategy:>10}: " + ", ".join(f"{name} {value:.2f}" for name, value in results.items()))
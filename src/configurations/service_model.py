@@ -139,6 +139,369 @@ class Chain(BaseModel):
     rag: Optional[Rag] = Field(None, description='RAG chain configuration')
 
 
+class Crawler(BaseModel):
+    maxConnections: Optional[int] = Field(
+        20,
+        description='The maximum number of pages fetched at the same time during a crawl, across all hosts.',
+    )
+    maxConcurrencyPerHost: Optional[int] = Field(
+        4,
+        description='The maximum number of pages fetched at the same time from a single host.',
+    )
+    politenessDelay: Optional[float] = Field(
+        0.0,
+        description='The minimum delay, in seconds, between two requests sent to the same host.',
+    )
+    maxRetries: Optional[int] = Field(
+        3,
+        description='The maximum number of retries of a request failed with a network error or a 429/5xx status code.',
+    )
+    retryBackoff: Optional[float] = Field(
+        0.5,
+        description='The base delay, in seconds, of the exponential backoff between two retries of the same request.',
+    )
+    maxRetryDelay: Optional[float] = Field(
+        30.0,
+        description='The maximum delay, in seconds, before retrying a request, also capping the delay asked by the server with the Retry-After header.',
+    )
+    requestTimeout: Optional[float] = Field(
+        10.0,
+        description='The timeout, in seconds, of a single request.',
+    )
+    checkpointInterval: Optional[float] = Field(
+        30.0,
+        description='The interval, in seconds, between two checkpoints of the state of a crawl (pages to fetch and pages processed), from which an interrupted crawl of the same URL is resumed. Zero disables the checkpoints.',
+    )
+
+
+class PipelineStage(BaseModel):
+    workers: Optional[int] = Field(
+        1, description='The number of items processed at the same time by the stage.'
+    )
+    queueSize: Optional[int] = Field(
+        50,
+        description='The maximum number of items waiting to be processed by the stage before the previous stages are paused.',
+    )
+
+
+class Pipeline(BaseModel):
+    parse: Optional[PipelineStage] = Field(
+        default_factory=lambda: PipelineStage.model_validate({'workers': 2, 'queueSize': 50}),
+        description='The stage extracting the text and the hyperlinks from the fetched pages.',
+    )
+    chunk: Optional[PipelineStage] = Field(
+        default_factory=lambda: PipelineStage.model_validate({'workers': 2, 'queueSize': 50}),
+        description='The stage splitting the texts into chunks.',
+    )
+    embed: Optional[PipelineStage] = Field(
+        default_factory=lambda: PipelineStage.model_validate({'workers': 4, 'queueSize': 20}),
+        description='The stage generating the embeddings of the chunks.',
+    )
+    upsert: Optional[PipelineStage] = Field(
+        default_factory=lambda: PipelineStage.model_validate({'workers': 2, 'queueSize': 20}),
+        description='The stage writing the chunks and their embeddings in the vector store.',
+    )
+
+
+class Batching(BaseModel):
+    maxChunks: Optional[int] = Field(
+        512,
+        description='The maximum number of chunks sent in a single embeddings request and written with a single upsert.',
+    )
+    maxTokens: Optional[int] = Field(
+        100000,
+        description='The maximum number of tokens sent in a single embeddings request.',
+    )
+    flushInterval: Optional[float] = Field(
+        1.0,
+        description='The maximum time, in seconds, a batch that is not full waits for further chunks before being sent.',
+    )
+
+
+class Writer(BaseModel):
+    batchSize: Optional[int] = Field(
+        128,
+        description='The maximum number of points written to the vector store with a single upsert request.',
+    )
+    maxInFlight: Optional[int] = Field(
+        8,
+        description='The maximum number of upsert requests sent to the vector store at the same time. Further writes wait for a request to complete.',
+    )
+
+
+class EmbeddingsCache(BaseModel):
+    enabled: Optional[bool] = Field(
+        False,
+        description='Whether the embeddings of the chunks are stored in a local cache, keyed by model, dimensions and hash of the text, and reused instead of calling the embeddings provider again.',
+    )
+    path: Optional[str] = Field(
+        '/tmp/embeddings-cache.sqlite3',
+        description='The path of the SQLite database storing the embeddings cache. Mount a persistent volume to keep it across restarts.',
+    )
+    maxEntries: Optional[int] = Field(
+        1000000,
+        description='The maximum number of embeddings stored in the cache, above which the least recently used ones are evicted.',
+    )
+
+
+class ChunkingStrategy(Enum):
+    tokens = 'tokens'
+    characters = 'characters'
+    semantic = 'semantic'
+
+
+class Chunking(BaseModel):
+    strategy: Optional[ChunkingStrategy] = Field(
+        ChunkingStrategy.tokens,
+        description="The strategy used to split the texts into chunks. Options: 'tokens' (recursively on paragraphs, lines, sentences and words, measuring the chunks in tokens), 'characters' (as 'tokens', measuring the chunks in characters), 'semantic' (on the breakpoints between sentences with the most different embeddings, ignoring chunkSize and chunkOverlap).",
+    )
+    chunkSize: Optional[int] = Field(
+        256,
+        description='The maximum size of a chunk, in tokens or characters depending on the strategy.',
+    )
+    chunkOverlap: Optional[int] = Field(
+        50,
+        description='The size of the overlap between consecutive chunks, in tokens or characters depending on the strategy.',
+    )
+
+
+class Boilerplate(BaseModel):
+    enabled: Optional[bool] = Field(
+        True,
+        description='Whether the blocks of text repeated on many pages of a crawled website (headers, menus, cookie banners, footers) are stripped before chunking.',
+    )
+    threshold: Optional[float] = Field(
+        0.5,
+        description='The fraction of the crawled pages a block of text must be found on to be stripped.',
+    )
+    minPages: Optional[int] = Field(
+        10,
+        description='The number of pages parsed before blocks are stripped. The first pages are held until then; with fewer pages, nothing is stripped.',
+    )
+
+
+class NearDuplicates(BaseModel):
+    enabled: Optional[bool] = Field(
+        False,
+        description='Whether the chunks nearly identical to chunks already stored in the collection, or to other chunks of the same job, are skipped instead of being embedded.',
+    )
+    threshold: Optional[float] = Field(
+        0.9,
+        description='The estimated Jaccard similarity, between 0 and 1, above which a chunk is a near-duplicate.',
+    )
+    numPermutations: Optional[int] = Field(
+        128,
+        description='The number of values of the MinHash signature of each chunk. Changing it invalidates the stored signatures.',
+    )
+    bands: Optional[int] = Field(
+        16,
+        description='The number of LSH bands the signatures are split into to find the candidate near-duplicates. More bands find more candidates, at a higher cost. Changing it invalidates the stored signatures.',
+    )
+
+
+class FileParserConfiguration(BaseModel):
+    processes: Optional[int] = Field(
+        0,
+        description='The number of processes extracting the text of the uploaded PDF files in parallel. With 0 or 1, PDF files are extracted sequentially.',
+    )
+    pagesPerTask: Optional[int] = Field(
+        16,
+        description='The number of pages of a PDF file extracted by a single task of the pool of processes.',
+    )
+    maxUncompressedBytes: Optional[int] = Field(
+        1073741824,
+        description='The maximum total size, in bytes, of the files extracted from an upload, including the files of an archive once decompressed. Zero means no limit.',
+    )
+
+
+class Jobs(BaseModel):
+    maxConcurrentJobs: Optional[int] = Field(
+        1,
+        description='The maximum number of embeddings generation jobs running at the same time. Further requests are rejected until a job finishes.',
+    )
+    progressInterval: Optional[float] = Field(
+        5.0,
+        description='The minimum interval, in seconds, between two writes of the progress of a running job in the database.',
+    )
+
+
+class Worker(BaseModel):
+    enabled: Optional[bool] = Field(
+        False,
+        description='Whether the embeddings generation jobs are queued in the database and run by separate worker processes (src/worker.py) instead of the API process.',
+    )
+    uploadsPath: Optional[str] = Field(
+        '/tmp/uploads',
+        description='The directory where the uploaded files are stored until their job is finished. It must be shared by the API and the worker processes.',
+    )
+    pollInterval: Optional[float] = Field(
+        2.0,
+        description='The interval, in seconds, between two checks of the queue when no job is queued.',
+    )
+    heartbeatInterval: Optional[float] = Field(
+        10.0,
+        description='The interval, in seconds, between two heartbeats of the jobs running on a worker, or in the API process.',
+    )
+    heartbeatTimeout: Optional[float] = Field(
+        60.0,
+        description='The time, in seconds, after which a running job without heartbeat is considered abandoned and put back in the queue (or marked as failed, for the jobs run by the API process).',
+    )
+    maxAttempts: Optional[int] = Field(
+        3,
+        description='The maximum number of times a job is claimed by a worker before being marked as failed.',
+    )
+
+
+class Rebuild(BaseModel):
+    keepPreviousVersion: Optional[bool] = Field(
+        True,
+        description='Whether the version of the collection replaced by a rebuild is kept, to roll back by pointing the alias to it again. Older versions are always deleted.',
+    )
+    minPointsRatio: Optional[float] = Field(
+        0.8,
+        description='The minimum number of points of the rebuilt collection, as a fraction of the points of the live one, for the rebuilt collection to be served.',
+    )
+    sampleSize: Optional[int] = Field(
+        20,
+        description='The number of chunks of the live collection searched in the rebuilt one, to check that their sources are found.',
+    )
+    sampleTopK: Optional[int] = Field(
+        5,
+        description='The number of results of each sample search in which the source of the sample chunk must be found.',
+    )
+    minSampleRecall: Optional[float] = Field(
+        0.8,
+        description='The minimum fraction of the sample searches finding the source of their chunk for the rebuilt collection to be served.',
+    )
+
+
+class Ingestion(BaseModel):
+    crawler: Optional[Crawler] = Field(
+        default_factory=lambda: Crawler.model_validate({}),
+        description='Configuration of the crawler used to generate embeddings from a website.',
+    )
+    pipeline: Optional[Pipeline] = Field(
+        default_factory=lambda: Pipeline.model_validate({}),
+        description='Configuration of the stages of the ingestion pipeline. The number of workers of the fetch stage is the crawler maxConnections.',
+    )
+    batching: Optional[Batching] = Field(
+        default_factory=lambda: Batching.model_validate({}),
+        description='Configuration of the batches of chunks collected across documents and pages before generating their embeddings.',
+    )
+    writer: Optional[Writer] = Field(
+        default_factory=lambda: Writer.model_validate({}),
+        description='Configuration of the concurrent, non-blocking writes of the points to the vector store.',
+    )
+    chunking: Optional[Chunking] = Field(
+        default_factory=lambda: Chunking.model_validate({}),
+        description='Configuration of the splitting of the texts into chunks.',
+    )
+    boilerplate: Optional[Boilerplate] = Field(
+        default_factory=lambda: Boilerplate.model_validate({}),
+        description='Configuration of the removal of the blocks of text repeated across the pages of a crawled website.',
+    )
+    nearDuplicates: Optional[NearDuplicates] = Field(
+        default_factory=lambda: NearDuplicates.model_validate({}),
+        description='Configuration of the detection of the near-duplicate chunks.',
+    )
+    jobs: Optional[Jobs] = Field(
+        default_factory=lambda: Jobs.model_validate({}),
+        description='Configuration of the embeddings generation jobs.',
+    )
+    worker: Optional[Worker] = Field(
+        default_factory=lambda: Worker.model_validate({}),
+        description='Configuration of the worker processes running the embeddings generation jobs.',
+    )
+    fileParser: Optional[FileParserConfiguration] = Field(
+        default_factory=lambda: FileParserConfiguration.model_validate({}),
+        description='Configuration of the extraction of the text of the uploaded files.',
+    )
+    embeddingsCache: Optional[EmbeddingsCache] = Field(
+        default_factory=lambda: EmbeddingsCache.model_validate({}),
+        description='Configuration of the persistent cache of the embeddings of the chunks.',
+    )
+    rebuild: Optional[Rebuild] = Field(
+        default_factory=lambda: Rebuild.model_validate({}),
+        description='Configuration of the rebuilds of the collection into a new version, served through an alias once validated.',
+    )
+
+
+class Warmup(BaseModel):
+    enabled: Optional[bool] = Field(
+        True,
+        description='Whether the shared resources (sparse embeddings model, tokenizer, embeddings and LLM clients, vector store) are created at startup, the service being ready only afterwards.',
+    )
+    syntheticQuery: Optional[str] = Field(
+        'warmup',
+        description='The query of the synthetic retrieval run at the end of the warmup, to warm up the embeddings provider and the vector store. An empty value skips it.',
+    )
+    retryInterval: Optional[float] = Field(
+        10.0,
+        description='The interval, in seconds, between two attempts of a failed warmup.',
+    )
+
+
+class HealthCheck(BaseModel):
+    interval: Optional[float] = Field(
+        15.0,
+        description='The interval, in seconds, between two health checks of the dependencies (Qdrant and Postgres), whose results are returned by the check-up endpoint.',
+    )
+    timeout: Optional[float] = Field(
+        5.0,
+        description='The timeout, in seconds, of the health check of a dependency.',
+    )
+
+
+class CircuitBreakers(BaseModel):
+    enabled: Optional[bool] = Field(
+        True,
+        description='Whether the calls to the vector store, the database and the LLM are rejected immediately while the dependency keeps failing.',
+    )
+    failureThreshold: Optional[int] = Field(
+        5,
+        description='The number of consecutive failed calls to a dependency opening its circuit breaker.',
+    )
+    recoveryTimeout: Optional[float] = Field(
+        30.0,
+        description='The seconds a circuit breaker stays open before letting probe calls through.',
+    )
+    halfOpenMaxCalls: Optional[int] = Field(
+        1,
+        description='The maximum number of probe calls running at the same time while a circuit breaker is half-open.',
+    )
+    degradedMode: Optional[bool] = Field(
+        False,
+        description='Whether the chat completions are answered without retrieval context while the circuit breaker of the vector store is open, instead of failing.',
+    )
+
+
+class ConnectionPool(BaseModel):
+    minSize: Optional[int] = Field(
+        1,
+        description='The minimum number of connections to the database kept open by the connection pool.',
+    )
+    maxSize: Optional[int] = Field(
+        10,
+        description='The maximum number of connections to the database opened by the connection pool.',
+    )
+    timeout: Optional[float] = Field(
+        5.0,
+        description='The maximum time, in seconds, a request waits for a connection of the pool before failing.',
+    )
+    maxIdle: Optional[float] = Field(
+        600.0,
+        description='The time, in seconds, after which an idle connection above the minimum size is closed.',
+    )
+    maxLifetime: Optional[float] = Field(
+        3600.0,
+        description='The time, in seconds, after which a connection is replaced by a new one.',
+    )
+    checkConnections: Optional[bool] = Field(
+        True,
+        description='Whether a connection is checked before being lent, and replaced if broken.',
+    )
+
+
 class RagTemplateConfigSchema(BaseModel):
     llm: Union[AzureLlmConfiguration, OpenAILlmConfiguration]
     tokenizer: Optional[Tokenizer] = Field(
@@ -149,3 +512,18 @@ class RagTemplateConfigSchema(BaseModel):
     chain: Optional[Chain] = Field(
         default_factory=lambda: Chain.model_validate({'aggregateMaxTokenNumber': 4000})
     )
+    ingestion: Optional[Ingestion] = Field(
+        default_factory=lambda: Ingestion.model_validate({})
+    )
+    warmup: Optional[Warmup] = Field(
+        default_factory=lambda: Warmup.model_validate({})
+    )
+    healthCheck: Optional[HealthCheck] = Field(
+        default_factory=lambda: HealthCheck.model_validate({})
+    )
+    circuitBreakers: Optional[CircuitBreakers] = Field(
+        default_factory=lambda: CircuitBreakers.model_validate({})
+    )
+    connectionPool: Optional[ConnectionPool] = Field(
+        default_factory=lambda: ConnectionPool.model_validate({})
+    )
@@ -9,6 +9,10 @@ DIMENSIONS_DICT: Dict[str, int] = {
     "text-embedding-3-large": 3072,
 }
 
+# Payload fields, indexed in the collection, used to select the chunks of a source
+SOURCE_PAYLOAD_KEY = "metadata.source"
+SOURCE_PREFIXES_PAYLOAD_KEY = "source_prefixes"
+
 # Constants related to the embeddings generation via uploaded file
 
 ZIP_CONTENT_TYPE = 'application/zip'
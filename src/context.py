@@ -1,6 +1,6 @@
 
 from logging import Logger
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 from attr import dataclass
 from starlette.requests import Request
 
@@ -9,6 +9,13 @@ from configurations.variables_model import Variables
 from infrastracture.metrics.manager import MetricsManager
 from configurations.service_model import RagTemplateConfigSchema
 
+if TYPE_CHECKING:
+    from application.embeddings.ingestion_jobs import IngestionJobManager
+    from infrastracture.circuit_breaker.circuit_breaker import CircuitBreakerManager
+    from infrastracture.connection_pool_manager.connection_pool_manager import ConnectionPoolManager
+    from infrastracture.health_manager.health_manager import HealthManager
+    from infrastracture.resources_manager.resources_manager import ResourcesManager
+
 class RequestContext:
     def __init__(
         self,
@@ -52,12 +59,18 @@ class AppContextParams:
     env_vars: Variables
     configurations: RagTemplateConfigSchema
     request_context: Optional[RequestContext] = None
+    ingestion_job_manager: Optional["IngestionJobManager"] = None
+    resources_manager: Optional["ResourcesManager"] = None
+    health_manager: Optional["HealthManager"] = None
+    circuit_breaker_manager: Optional["CircuitBreakerManager"] = None
+    connection_pool_manager: Optional["ConnectionPoolManager"] = None
 
 class AppContext:
     """
     The AppContext class serves as a container for key components used across the application.
 
-    It holds instances of the logger, metrics manager, environment variables, and configurations,  allowing these
+    It holds instances of the logger, metrics manager, environment variables, configurations, ingestion job manager,
+    shared resources, database connection pool, health and circuit breakers of the dependencies, allowing these
     instances to be shared and easily accessed throughout the application.
     """
     def __init__(self, params: AppContextParams):
@@ -66,6 +79,11 @@ class AppContext:
         self._env_vars = params.env_vars
         self._configurations = params.configurations
         self._request_context = params.request_context if params.request_context else None
+        self._ingestion_job_manager = params.ingestion_job_manager
+        self._resources_manager = params.resources_manager
+        self._health_manager = params.health_manager
+        self._circuit_breaker_manager = params.circuit_breaker_manager
+        self._connection_pool_manager = params.connection_pool_manager
 
     @property
     def logger(self):
@@ -86,6 +104,26 @@ class AppContext:
     @property
     def request_context(self):
         return self._request_context
+
+    @property
+    def ingestion_job_manager(self):
+        return self._ingestion_job_manager
+
+    @property
+    def resources_manager(self):
+        return self._resources_manager
+
+    @property
+    def health_manager(self):
+        return self._health_manager
+
+    @property
+    def circuit_breaker_manager(self):
+        return self._circuit_breaker_manager
+
+    @property
+    def connection_pool_manager(self):
+        return self._connection_pool_manager
     
     def create_request_context(
         self,
@@ -100,6 +138,11 @@ class AppContext:
             metrics_manager=self._metrics_manager,
             env_vars=self._env_vars,
             configurations=self._configurations,
+            ingestion_job_manager=self._ingestion_job_manager,
+            resources_manager=self._resources_manager,
+            health_manager=self._health_manager,
+            circuit_breaker_manager=self._circuit_breaker_manager,
+            connection_pool_manager=self._connection_pool_manager,
             request_context=RequestContext(
                 logger=request_logger,
                 env_vars=self._env_vars,
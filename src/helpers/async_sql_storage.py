@@ -0,0 +1,133 @@
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import psycopg
+from context import AppContext
+from helpers.sql_storage import DATABASE_UNAVAILABLE_ERRORS
+
+
+class AsyncSqlStorage:
+    """
+    Provides the CRUD operations on chat and messages of `SqlStorage` for the asynchronous handlers,
+    on asynchronous psycopg connections: waiting for the database does not block the event loop.
+    """
+
+    def __init__(self, app_context: AppContext):
+        self.app_context = app_context
+        self.logger = app_context.logger
+        self.conninfo = self.app_context.env_vars.DB_URI
+
+    @asynccontextmanager
+    async def _connect(self) -> AsyncIterator[psycopg.AsyncConnection]:
+        connection_pool_manager = self.app_context.connection_pool_manager
+        if connection_pool_manager is not None:
+            async with connection_pool_manager.async_connection() as conn:
+                yield conn
+        else:
+            async with await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True) as conn:
+                yield conn
+
+    @asynccontextmanager
+    async def get_connection(self) -> AsyncIterator[psycopg.AsyncConnection]:
+        """
+        Yields an asynchronous psycopg connection (autocommit = True) for the duration of the block: a connection
+        borrowed from the asynchronous pool of the application and given back afterwards, or a new one closed
+        afterwards if there is no pool. The connection is obtained through the circuit breaker of the database, if any,
+        and the database errors raised by the block are recorded as failures of the breaker.
+        """
+        async with AsyncExitStack() as stack:
+            circuit_breaker_manager = self.app_context.circuit_breaker_manager
+            if circuit_breaker_manager is None:
+                yield await stack.enter_async_context(self._connect())
+                return
+
+            conn = await circuit_breaker_manager.postgres.call_async(stack.enter_async_context, self._connect())
+            try:
+                yield conn
+            except DATABASE_UNAVAILABLE_ERRORS:
+                circuit_breaker_manager.postgres.record_failure()
+                raise
+
+    # -------------- Chat CRUD ---------------
+    async def create_chat(self, title: Optional[str] = None) -> str:
+        """
+        Inserts a new row into 'chat', returning the new chat's UUID.
+        If 'title' is provided, store it; otherwise leave it NULL.
+        """
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cur:
+                if title:
+                    await cur.execute("INSERT INTO chat (title) VALUES (%s) RETURNING id;", (title,))
+                else:
+                    await cur.execute("INSERT INTO chat DEFAULT VALUES RETURNING id;")
+                chat_id = (await cur.fetchone())[0]  # The UUID from RETURNING id
+                return str(chat_id)
+
+    async def list_chats(self):
+        """
+        Returns a list of all chats (id, title, created_at), ordered by creation time descending.
+        """
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT id, title, created_at FROM chat ORDER BY created_at DESC;")
+                return await cur.fetchall()  # list of tuples (UUID, title, created_at)
+
+    async def read_chat(self, chat_id: str):
+        """
+        Reads a single chat row by UUID, or returns None if not found.
+        """
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT id, title, created_at FROM chat WHERE id = %s;", (chat_id,))
+                return await cur.fetchone()  # (UUID, title, created_at) or None
+
+    async def delete_chat(self, chat_id: str):
+        """
+        Deletes a single chat by UUID. Will cascade-delete messages.
+        """
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("DELETE FROM chat WHERE id = %s;", (chat_id,))
+
+    # -------------- Message CRUD ---------------
+    async def create_message(self, chat_id: str, sender: str, content: str):
+        """
+        Inserts a new message row for a given chat_id.
+        """
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cur:
+                sql = "INSERT INTO messages (chat_id, sender, content) VALUES (%s, %s, %s);"
+                await cur.execute(sql, (chat_id, sender, content))
+
+    async def get_messages(self, chat_id: str, limit: int = None):
+        """
+        Retrieve messages for the given chat_id, in ascending timestamp order.
+        If limit is provided, only retrieve that many messages (from the most recent).
+        """
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cur:
+                limit_expr = ""
+                if isinstance(limit, int):
+                    limit_expr = f"LIMIT {limit}"
+
+                sql = f"""
+                SELECT m.sender, m.content
+                FROM (
+                    SELECT sender, content, timestamp
+                    FROM messages
+                    WHERE chat_id = %s
+                    ORDER BY timestamp DESC
+                    {limit_expr}
+                ) m
+                ORDER BY m.timestamp ASC;
+                """
+                await cur.execute(sql, (chat_id,))
+                return await cur.fetchall()
+
+    async def delete_messages(self, chat_id: str):
+        """
+        Deletes all messages for a given chat_id.
+        """
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("DELETE FROM messages WHERE chat_id = %s;", (chat_id,))
@@ -0,0 +1,216 @@
+"""
+Module providing the versioned migrations of the schema of the database, and the function applying them.
+
+A migration is never changed once released: a change of the schema is a new migration, appended to `MIGRATIONS`
+with the next version.
+"""
+
+from dataclasses import dataclass
+from logging import Logger
+from typing import List
+
+import psycopg
+
+# Key of the advisory lock taken while migrating, so that the API and the workers starting together do not
+# apply the same migration twice
+MIGRATIONS_LOCK_KEY = 7_152_603_114
+
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    statements: List[str]
+
+
+MIGRATIONS: List[Migration] = [
+    # The tables created before the migrations: the statements are no-ops on the databases that already have them
+    Migration(
+        version=1,
+        description="Create the tables of chats, messages, crawl state, ingestion jobs and chunk signatures",
+        statements=[
+            # Create table: chat
+            """
+            CREATE TABLE IF NOT EXISTS chat (
+                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+                title TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            """,
+            # Create table: messages
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+                chat_id UUID NOT NULL,
+                sender TEXT NOT NULL,
+                content TEXT NOT NULL,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY(chat_id) REFERENCES chat(id) ON DELETE CASCADE
+            );
+            """,
+            # Create table: crawl_state
+            """
+            CREATE TABLE IF NOT EXISTS crawl_state (
+                collection_name TEXT NOT NULL,
+                url TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                content_sha TEXT,
+                last_fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                point_ids TEXT[] NOT NULL DEFAULT '{}',
+                hyperlinks TEXT[] NOT NULL DEFAULT '{}',
+                PRIMARY KEY(collection_name, url)
+            );
+            """,
+            # Create table: crawl_checkpoints
+            """
+            CREATE TABLE IF NOT EXISTS crawl_checkpoints (
+                collection_name TEXT NOT NULL,
+                url TEXT NOT NULL,
+                filter_path TEXT NOT NULL DEFAULT '',
+                frontier TEXT[] NOT NULL DEFAULT '{}',
+                processed TEXT[] NOT NULL DEFAULT '{}',
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY(collection_name, url, filter_path)
+            );
+            """,
+            # Create table: ingestion_jobs
+            """
+            CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                id UUID PRIMARY KEY,
+                job_type TEXT NOT NULL,
+                source TEXT NOT NULL,
+                status TEXT NOT NULL,
+                pages INTEGER NOT NULL DEFAULT 0,
+                chunks INTEGER NOT NULL DEFAULT 0,
+                tokens BIGINT NOT NULL DEFAULT 0,
+                errors INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP
+            );
+            """,
+            # Columns of ingestion_jobs used to queue the jobs run by worker processes
+            """
+            ALTER TABLE ingestion_jobs
+                ADD COLUMN IF NOT EXISTS payload JSONB,
+                ADD COLUMN IF NOT EXISTS worker_id TEXT,
+                ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP,
+                ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0,
+                ADD COLUMN IF NOT EXISTS cancel_requested BOOLEAN NOT NULL DEFAULT FALSE;
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ingestion_jobs_queued_idx
+            ON ingestion_jobs (created_at)
+            WHERE status = 'queued' AND payload IS NOT NULL;
+            """,
+            # Number of near-duplicate chunks skipped by each ingestion job
+            "ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS duplicates INTEGER NOT NULL DEFAULT 0;",
+            # Create table: chunk_signatures
+            """
+            CREATE TABLE IF NOT EXISTS chunk_signatures (
+                collection_name TEXT NOT NULL,
+                point_id UUID NOT NULL,
+                signature BYTEA NOT NULL,
+                band_keys BIGINT[] NOT NULL,
+                PRIMARY KEY(collection_name, point_id)
+            );
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS chunk_signatures_band_keys_idx
+            ON chunk_signatures USING GIN (band_keys);
+            """,
+        ]
+    ),
+    Migration(
+        version=2,
+        description="Index the messages by chat and time, and the chats by creation time",
+        statements=[
+            # Reads the history of a chat in order without scanning the table, and deletes its messages
+            # without scanning the table when the chat is deleted
+            """
+            CREATE INDEX IF NOT EXISTS messages_chat_id_timestamp_idx
+            ON messages (chat_id, timestamp);
+            """,
+            # Lists the chats by creation time without sorting the table
+            """
+            CREATE INDEX IF NOT EXISTS chat_created_at_idx
+            ON chat (created_at);
+            """,
+        ]
+    ),
+    Migration(
+        version=3,
+        description="Store the fingerprints of the blocks of the crawled pages",
+        statements=[
+            # The blocks of the pages not changed since the last crawl are counted to detect the boilerplate,
+            # without fetching the pages again
+            "ALTER TABLE crawl_state ADD COLUMN IF NOT EXISTS block_fingerprints BYTEA;",
+        ]
+    ),
+    Migration(
+        version=4,
+        description="Store the documents extracted from the uploaded files",
+        statements=[
+            # The uploaded files are not kept: a rebuild parses again their documents, in order of position
+            """
+            CREATE TABLE IF NOT EXISTS file_documents (
+                collection_name TEXT NOT NULL,
+                source TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                file_name TEXT,
+                page INTEGER,
+                markdown BOOLEAN NOT NULL DEFAULT FALSE,
+                PRIMARY KEY(collection_name, source, position)
+            );
+            """,
+        ]
+    ),
+]
+
+
+def apply_migrations(conn: psycopg.Connection, logger: Logger, migrations: List[Migration] = MIGRATIONS) -> List[int]:
+    """
+    Apply the migrations not applied yet to the database, in order of version, each one in its own transaction.
+    The applied versions are recorded in the `schema_migrations` table.
+
+    Args:
+        conn (psycopg.Connection): A connection to the database, in autocommit mode.
+        logger (Logger): The logger.
+        migrations (List[Migration]): The migrations of the schema. Defaults to MIGRATIONS.
+
+    Returns:
+        List[int]: The versions applied.
+    """
+    applied = []
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s);", (MIGRATIONS_LOCK_KEY,))
+        try:
+            # Create table: schema_migrations
+            cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            """)
+            cur.execute("SELECT version FROM schema_migrations;")
+            applied_versions = {row[0] for row in cur.fetchall()}
+            for migration in sorted(migrations, key=lambda migration: migration.version):
+                if migration.version in applied_versions:
+                    continue
+                logger.info(f"Applying migration {migration.version} of the schema: {migration.description}.")
+                with conn.transaction():
+                    for statement in migration.statements:
+                        cur.execute(statement)
+                    cur.execute(
+                        "INSERT INTO schema_migrations (version, description) VALUES (%s, %s);",
+                        (migration.version, migration.description)
+                    )
+                applied.append(migration.version)
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s);", (MIGRATIONS_LOCK_KEY,))
+    return applied
@@ -1,7 +1,13 @@
-from typing import Optional
+from contextlib import ExitStack, contextmanager
+from typing import ContextManager, Iterator, Optional
 
 import psycopg
+from psycopg.types.json import Jsonb
 from context import AppContext
+from helpers.sql_migrations import apply_migrations
+
+# Errors of the database itself, rather than of a query (e.g. a violated constraint), counted by its circuit breaker
+DATABASE_UNAVAILABLE_ERRORS = (psycopg.OperationalError, psycopg.InterfaceError)
 
 
 class SqlStorage:
@@ -15,44 +21,45 @@ class SqlStorage:
         self.logger = app_context.logger
         self.conninfo = self.app_context.env_vars.DB_URI
 
-    def get_connection(self) -> psycopg.Connection:
+    def _connect(self) -> ContextManager[psycopg.Connection]:
+        connection_pool_manager = self.app_context.connection_pool_manager
+        if connection_pool_manager is not None:
+            return connection_pool_manager.connection()
+        return psycopg.connect(self.conninfo, autocommit=True)
+
+    @contextmanager
+    def get_connection(self) -> Iterator[psycopg.Connection]:
         """
-        Returns a new psycopg connection (autocommit = True).
+        Yields a psycopg connection (autocommit = True) for the duration of the block: a connection borrowed
+        from the pool of the application and given back afterwards, or a new one closed afterwards if there is no pool.
+        The connection is obtained through the circuit breaker of the database, if any, and the database errors
+        raised by the block (e.g. a lost connection or a statement timeout) are recorded as failures of the breaker.
         """
-        conn = psycopg.connect(self.conninfo)
-        conn.autocommit = True
-        return conn
+        with ExitStack() as stack:
+            circuit_breaker_manager = self.app_context.circuit_breaker_manager
+            if circuit_breaker_manager is None:
+                yield stack.enter_context(self._connect())
+                return
+
+            conn = circuit_breaker_manager.postgres.call(lambda: stack.enter_context(self._connect()))
+            try:
+                yield conn
+            except DATABASE_UNAVAILABLE_ERRORS:
+                circuit_breaker_manager.postgres.record_failure()
+                raise
 
     def create_tables(self):
         """
-        Creates the necessary tables in Postgres with UUID primary keys,
-        and ensures that 'uuid-ossp' extension is created if needed.
+        Creates or updates the tables in Postgres with UUID primary keys, applying the versioned migrations
+        of the schema (see `helpers.sql_migrations`) not applied yet.
         """
         with self.get_connection() as conn:
-            with conn.cursor() as cur:
-                # Create table: chat
-                cur.execute("""
-                CREATE TABLE IF NOT EXISTS chat (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    title TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-                """)
-
-                # Create table: messages
-                cur.execute("""
-                CREATE TABLE IF NOT EXISTS messages (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    chat_id UUID NOT NULL,
-                    sender TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY(chat_id) REFERENCES chat(id) ON DELETE CASCADE
-                );
-                """)
+            applied = apply_migrations(conn, self.logger)
 
-        self.logger.info("Tables have been created or already exist.")
+        if applied:
+            self.logger.info(f"Schema migrations applied: {', '.join(str(version) for version in applied)}.")
+        else:
+            self.logger.info("Schema is up to date.")
 
     # -------------- Chat CRUD ---------------
     def create_chat(self, title: Optional[str] = None) -> str:
@@ -149,3 +156,495 @@ class SqlStorage:
             with conn.cursor() as cur:
                 sql = "DELETE FROM messages WHERE chat_id = %s;"
                 cur.execute(sql, (chat_id,))
+
+    # -------------- Crawl state CRUD ---------------
+    def read_crawl_state(self, collection_name: str, url: str):
+        """
+        Reads the state of the last crawl of a URL for the given collection, or returns None if never crawled.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                SELECT etag, last_modified, content_sha, last_fetched_at, point_ids, hyperlinks, block_fingerprints
+                FROM crawl_state
+                WHERE collection_name = %s AND url = %s;
+                """
+                cur.execute(sql, (collection_name, url))
+                row = cur.fetchone()
+                return row  # (etag, last_modified, content_sha, last_fetched_at, point_ids, hyperlinks, block_fingerprints) or None
+
+    def save_crawl_state(
+        self,
+        collection_name: str,
+        url: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        content_sha: Optional[str],
+        point_ids: list[str],
+        hyperlinks: list[str],
+        block_fingerprints: Optional[bytes] = None
+    ):
+        """
+        Inserts or replaces the crawl state of a URL for the given collection, setting the fetch time to now.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                INSERT INTO crawl_state (
+                    collection_name, url, etag, last_modified, content_sha, point_ids, hyperlinks, block_fingerprints
+                )
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (collection_name, url) DO UPDATE SET
+                    etag = EXCLUDED.etag,
+                    last_modified = EXCLUDED.last_modified,
+                    content_sha = EXCLUDED.content_sha,
+                    point_ids = EXCLUDED.point_ids,
+                    hyperlinks = EXCLUDED.hyperlinks,
+                    block_fingerprints = EXCLUDED.block_fingerprints,
+                    last_fetched_at = CURRENT_TIMESTAMP;
+                """
+                cur.execute(
+                    sql,
+                    (collection_name, url, etag, last_modified, content_sha, point_ids, hyperlinks, block_fingerprints)
+                )
+
+    def touch_crawl_state(self, collection_name: str, url: str):
+        """
+        Updates the fetch time of a URL that has not changed since its last crawl.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = "UPDATE crawl_state SET last_fetched_at = CURRENT_TIMESTAMP WHERE collection_name = %s AND url = %s;"
+                cur.execute(sql, (collection_name, url))
+
+    @staticmethod
+    def _escape_like(value: str) -> str:
+        return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+    def delete_crawl_states(self, collection_name: str, urls: list[str]) -> list[str]:
+        """
+        Deletes the crawl state of the given URLs for the given collection, returning the point IDs they referenced.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = "DELETE FROM crawl_state WHERE collection_name = %s AND url = ANY(%s) RETURNING point_ids;"
+                cur.execute(sql, (collection_name, urls))
+                rows = cur.fetchall()
+                return [point_id for row in rows for point_id in row[0]]  # row -> (point_ids,)
+
+    def delete_crawl_states_by_prefix(self, collection_name: str, prefix: str) -> list[str]:
+        """
+        Deletes the crawl state of the URLs equal to the prefix or starting with the prefix followed by "/",
+        returning the point IDs they referenced.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                DELETE FROM crawl_state
+                WHERE collection_name = %s AND (url = %s OR url LIKE %s)
+                RETURNING point_ids;
+                """
+                cur.execute(sql, (collection_name, prefix, f"{self._escape_like(prefix)}/%"))
+                rows = cur.fetchall()
+                return [point_id for row in rows for point_id in row[0]]  # row -> (point_ids,)
+
+    def list_crawl_state_urls(self, collection_name: str, prefix: str) -> list[str]:
+        """
+        Returns the URLs with a crawl state for the given collection, equal to the prefix or starting with the prefix
+        followed by "/".
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = "SELECT url FROM crawl_state WHERE collection_name = %s AND (url = %s OR url LIKE %s);"
+                cur.execute(sql, (collection_name, prefix, f"{self._escape_like(prefix)}/%"))
+                rows = cur.fetchall()
+                return [row[0] for row in rows]  # row -> (url,)
+
+    # -------------- Crawl checkpoints CRUD ---------------
+    def read_crawl_checkpoint(self, collection_name: str, url: str, filter_path: str):
+        """
+        Reads the last checkpoint of an interrupted crawl, or returns None if there is none.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                SELECT frontier, processed, updated_at
+                FROM crawl_checkpoints
+                WHERE collection_name = %s AND url = %s AND filter_path = %s;
+                """
+                cur.execute(sql, (collection_name, url, filter_path))
+                row = cur.fetchone()
+                return row  # (frontier, processed, updated_at) or None
+
+    def save_crawl_checkpoint(
+        self,
+        collection_name: str,
+        url: str,
+        filter_path: str,
+        frontier: list[str],
+        processed: list[str]
+    ):
+        """
+        Inserts or replaces the checkpoint of a running crawl, setting its update time to now.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                INSERT INTO crawl_checkpoints (collection_name, url, filter_path, frontier, processed)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (collection_name, url, filter_path) DO UPDATE SET
+                    frontier = EXCLUDED.frontier,
+                    processed = EXCLUDED.processed,
+                    updated_at = CURRENT_TIMESTAMP;
+                """
+                cur.execute(sql, (collection_name, url, filter_path, frontier, processed))
+
+    def delete_crawl_checkpoint(self, collection_name: str, url: str, filter_path: str):
+        """
+        Deletes the checkpoint of a crawl, once completed.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = "DELETE FROM crawl_checkpoints WHERE collection_name = %s AND url = %s AND filter_path = %s;"
+                cur.execute(sql, (collection_name, url, filter_path))
+
+    # -------------- Chunk signatures CRUD ---------------
+    def find_chunk_signatures(self, collection_name: str, band_keys: list[int]):
+        """
+        Returns the signatures of the chunks of the given collection sharing at least one of the band keys.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                SELECT point_id, signature, band_keys
+                FROM chunk_signatures
+                WHERE collection_name = %s AND band_keys && %s::bigint[];
+                """
+                cur.execute(sql, (collection_name, band_keys))
+                rows = cur.fetchall()
+                return rows  # list of tuples (point_id, signature, band_keys)
+
+    def save_chunk_signatures(self, collection_name: str, signatures: list[tuple[str, bytes, list[int]]]):
+        """
+        Inserts or replaces the signatures, as tuples (point_id, signature, band_keys), of chunks of the given collection.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                INSERT INTO chunk_signatures (collection_name, point_id, signature, band_keys)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (collection_name, point_id) DO UPDATE SET
+                    signature = EXCLUDED.signature,
+                    band_keys = EXCLUDED.band_keys;
+                """
+                cur.executemany(
+                    sql,
+                    [(collection_name, point_id, signature, band_keys) for point_id, signature, band_keys in signatures]
+                )
+
+    def delete_chunk_signatures(self, collection_name: str, point_ids: list[str]):
+        """
+        Deletes the signatures of the given chunks of a collection.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = "DELETE FROM chunk_signatures WHERE collection_name = %s AND point_id = ANY(%s::uuid[]);"
+                cur.execute(sql, (collection_name, point_ids))
+
+    # -------------- File documents CRUD ---------------
+    def save_file_document(
+        self,
+        collection_name: str,
+        source: str,
+        position: int,
+        text: str,
+        file_name: Optional[str],
+        page: Optional[int],
+        markdown: bool
+    ):
+        """
+        Inserts or updates a document extracted from an uploaded file, at the given position among the documents
+        of the file.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                INSERT INTO file_documents (collection_name, source, position, text, file_name, page, markdown)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (collection_name, source, position) DO UPDATE
+                SET text = EXCLUDED.text,
+                    file_name = EXCLUDED.file_name,
+                    page = EXCLUDED.page,
+                    markdown = EXCLUDED.markdown;
+                """
+                cur.execute(sql, (collection_name, source, position, text, file_name, page, markdown))
+
+    def read_file_documents(self, collection_name: str, source: str, after_position: int, limit: int) -> list[tuple]:
+        """
+        Returns up to `limit` documents of an uploaded file following the given position, in order of position,
+        as tuples (position, text, file_name, page, markdown).
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                SELECT position, text, file_name, page, markdown
+                FROM file_documents
+                WHERE collection_name = %s AND source = %s AND position > %s
+                ORDER BY position
+                LIMIT %s;
+                """
+                cur.execute(sql, (collection_name, source, after_position, limit))
+                return cur.fetchall()
+
+    def list_file_document_sources(self, collection_name: str) -> list[str]:
+        """
+        Returns the sources of the uploaded files with stored documents for the given collection.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT DISTINCT source FROM file_documents WHERE collection_name = %s;", (collection_name,))
+                rows = cur.fetchall()
+                return [row[0] for row in rows]  # row -> (source,)
+
+    def delete_file_documents(self, collection_name: str, sources: list[str]):
+        """
+        Deletes the stored documents of the given uploaded files of a collection.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = "DELETE FROM file_documents WHERE collection_name = %s AND source = ANY(%s);"
+                cur.execute(sql, (collection_name, sources))
+
+    # -------------- Collection state ---------------
+    # Tables whose rows are scoped by the collection the chunks are stored in
+    COLLECTION_STATE_TABLES = ("crawl_state", "crawl_checkpoints", "chunk_signatures", "file_documents")
+
+    def move_collection_state(self, source_collection_name: str, target_collection_name: str):
+        """
+        Moves, in a single transaction, the crawl state, the crawl checkpoints, the chunk signatures and the documents
+        of the uploaded files of a collection to another collection name, replacing the ones of the target (e.g. when
+        a rebuilt collection takes the alias of the live one).
+        """
+        with self.get_connection() as conn:
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    for table in self.COLLECTION_STATE_TABLES:
+                        cur.execute(f"DELETE FROM {table} WHERE collection_name = %s;", (target_collection_name,))
+                        cur.execute(
+                            f"UPDATE {table} SET collection_name = %s WHERE collection_name = %s;",
+                            (target_collection_name, source_collection_name)
+                        )
+
+    def delete_collection_state(self, collection_name: str):
+        """
+        Deletes the crawl state, the crawl checkpoints, the chunk signatures and the documents of the uploaded files
+        of a collection.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                for table in self.COLLECTION_STATE_TABLES:
+                    cur.execute(f"DELETE FROM {table} WHERE collection_name = %s;", (collection_name,))
+
+    # -------------- Ingestion jobs CRUD ---------------
+    def create_ingestion_job(self, job_id: str, job_type: str, source: str, status: str, worker_id: Optional[str] = None):
+        """
+        Inserts a new ingestion job, with no progress, assigned to the process running it and with its first heartbeat.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                INSERT INTO ingestion_jobs (id, job_type, source, status, worker_id, heartbeat_at)
+                VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP);
+                """
+                cur.execute(sql, (job_id, job_type, source, status, worker_id))
+
+    def update_ingestion_job(
+        self,
+        job_id: str,
+        status: str,
+        pages: int,
+        chunks: int,
+        tokens: int,
+        errors: int,
+        error: Optional[str] = None,
+        finished: bool = False,
+        worker_id: Optional[str] = None,
+        duplicates: int = 0
+    ):
+        """
+        Updates the status and the progress of an ingestion job. The start time is set on the first update
+        to a status other than 'queued', the finish time when `finished` is True.
+        If `worker_id` is provided, the job is updated only if still assigned to that worker.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                UPDATE ingestion_jobs
+                SET status = %s, pages = %s, chunks = %s, tokens = %s, errors = %s, error = %s, duplicates = %s,
+                    started_at = COALESCE(started_at, CASE WHEN %s <> 'queued' THEN CURRENT_TIMESTAMP END),
+                    finished_at = CASE WHEN %s THEN CURRENT_TIMESTAMP ELSE finished_at END
+                WHERE id = %s AND (%s::text IS NULL OR worker_id = %s);
+                """
+                cur.execute(
+                    sql,
+                    (status, pages, chunks, tokens, errors, error, duplicates, status, finished, job_id, worker_id, worker_id)
+                )
+
+    def read_ingestion_job(self, job_id: str):
+        """
+        Reads a single ingestion job by UUID, or returns None if not found.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                SELECT id, job_type, source, status, pages, chunks, tokens, errors, error, created_at, started_at, finished_at,
+                    duplicates
+                FROM ingestion_jobs
+                WHERE id = %s;
+                """
+                cur.execute(sql, (job_id,))
+                row = cur.fetchone()
+                return row  # (id, job_type, source, status, pages, chunks, tokens, errors, error, created_at, started_at, finished_at, duplicates) or None
+
+    def list_ingestion_jobs(self, limit: int = 50):
+        """
+        Returns the most recent ingestion jobs, ordered by creation time descending.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                SELECT id, job_type, source, status, pages, chunks, tokens, errors, error, created_at, started_at, finished_at,
+                    duplicates
+                FROM ingestion_jobs
+                ORDER BY created_at DESC
+                LIMIT %s;
+                """
+                cur.execute(sql, (limit,))
+                rows = cur.fetchall()
+                return rows
+
+    def list_active_ingestion_job_ids(self, job_type: str) -> list[str]:
+        """
+        Returns the IDs of the queued and running ingestion jobs of the given type.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = "SELECT id FROM ingestion_jobs WHERE job_type = %s AND status IN ('queued', 'running');"
+                cur.execute(sql, (job_type,))
+                rows = cur.fetchall()
+                return [str(row[0]) for row in rows]  # row -> (id,)
+
+    def enqueue_ingestion_job(self, job_id: str, job_type: str, source: str, payload: dict):
+        """
+        Inserts a new ingestion job in the queue of the worker processes, with the parameters needed to run it.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                INSERT INTO ingestion_jobs (id, job_type, source, status, payload)
+                VALUES (%s, %s, %s, 'queued', %s);
+                """
+                cur.execute(sql, (job_id, job_type, source, Jsonb(payload)))
+
+    def claim_ingestion_job(self, worker_id: str):
+        """
+        Claims the oldest queued ingestion job for a worker, marking it as running. Jobs locked by other workers
+        are skipped, so that concurrent workers never claim the same job. Returns None if no job is queued.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                UPDATE ingestion_jobs
+                SET status = 'running', worker_id = %s, heartbeat_at = CURRENT_TIMESTAMP, attempts = attempts + 1,
+                    started_at = COALESCE(started_at, CURRENT_TIMESTAMP)
+                WHERE id = (
+                    SELECT id FROM ingestion_jobs
+                    WHERE status = 'queued' AND payload IS NOT NULL
+                    ORDER BY created_at
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT 1
+                )
+                RETURNING id, job_type, source, payload;
+                """
+                cur.execute(sql, (worker_id,))
+                row = cur.fetchone()
+                return row  # (id, job_type, source, payload) or None
+
+    def heartbeat_ingestion_jobs(self, worker_id: str, job_ids: list[str]):
+        """
+        Updates the heartbeat of the jobs run by a worker, or by the process that created them. Returns the jobs
+        still assigned to the worker or the process, with the flag telling whether their cancellation has been requested.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                UPDATE ingestion_jobs
+                SET heartbeat_at = CURRENT_TIMESTAMP
+                WHERE worker_id = %s AND status IN ('queued', 'running') AND id = ANY(%s::uuid[])
+                RETURNING id, cancel_requested;
+                """
+                cur.execute(sql, (worker_id, job_ids))
+                rows = cur.fetchall()
+                return rows  # list of tuples (id, cancel_requested)
+
+    def requeue_abandoned_ingestion_jobs(self, heartbeat_timeout: float, max_attempts: int):
+        """
+        Puts back in the queue the running jobs of the worker processes whose heartbeat is older than the timeout,
+        or marks them as failed if they have already been attempted `max_attempts` times.
+        Returns the affected jobs as tuples (id, status).
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                UPDATE ingestion_jobs
+                SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'queued' END,
+                    error = CASE WHEN attempts >= %s THEN 'The worker running the job stopped responding.' ELSE error END,
+                    finished_at = CASE WHEN attempts >= %s THEN CURRENT_TIMESTAMP ELSE finished_at END,
+                    worker_id = NULL
+                WHERE status = 'running' AND payload IS NOT NULL
+                    AND heartbeat_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+                RETURNING id, status;
+                """
+                cur.execute(sql, (max_attempts, max_attempts, max_attempts, heartbeat_timeout))
+                rows = cur.fetchall()
+                return rows
+
+    def fail_abandoned_ingestion_jobs(self, heartbeat_timeout: float):
+        """
+        Marks as failed the queued and running jobs run by the process that created them (not queued for the worker
+        processes) whose heartbeat is older than the timeout, e.g. because the process was restarted.
+        Returns the IDs of the affected jobs.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                UPDATE ingestion_jobs
+                SET status = 'failed', error = 'The process running the job stopped responding.',
+                    finished_at = CURRENT_TIMESTAMP
+                WHERE status IN ('queued', 'running') AND payload IS NULL
+                    AND (heartbeat_at IS NULL OR heartbeat_at < CURRENT_TIMESTAMP - make_interval(secs => %s))
+                RETURNING id;
+                """
+                cur.execute(sql, (heartbeat_timeout,))
+                rows = cur.fetchall()
+                return [str(row[0]) for row in rows]  # row -> (id,)
+
+    def request_ingestion_job_cancellation(self, job_id: str):
+        """
+        Requests the cancellation of a queued or running ingestion job: a queued job is cancelled right away,
+        a running one is stopped by its worker or by the process running it. Returns the resulting status and the payload of the job,
+        or None if the job has already finished or does not exist.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                sql = """
+                UPDATE ingestion_jobs
+                SET cancel_requested = TRUE,
+                    finished_at = CASE WHEN status = 'queued' THEN CURRENT_TIMESTAMP ELSE finished_at END,
+                    status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END
+                WHERE id = %s AND status IN ('queued', 'running')
+                RETURNING status, payload;
+                """
+                cur.execute(sql, (job_id,))
+                row = cur.fetchone()
+                return row  # (status, payload) or None
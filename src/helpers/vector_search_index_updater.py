@@ -1,11 +1,30 @@
 from logging import Logger
 
 from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, SparseVectorParams
+from qdrant_client.models import (
+    CreateAlias,
+    CreateAliasOperation,
+    Distance,
+    Filter,
+    PayloadSchemaType,
+    PointStruct,
+    SparseVectorParams,
+    VectorParams,
+)
 
-from constants import DEFAULT_NUM_DIMENSIONS_VALUE, DIMENSIONS_DICT
+from constants import DEFAULT_NUM_DIMENSIONS_VALUE, DIMENSIONS_DICT, SOURCE_PAYLOAD_KEY, SOURCE_PREFIXES_PAYLOAD_KEY
 from context import AppContext
 
+# Version of the collection created behind the alias of a new deployment
+INITIAL_COLLECTION_VERSION = "0"
+# Number of points read and written by each request copying the points of a collection
+COPY_BATCH_SIZE = 256
+
+
+def get_collection_version_name(alias_name: str, version: str) -> str:
+    """Get the name of a version of the collection served through the given alias."""
+    return f"{alias_name}_v{version}"
+
 
 class VectorStoreInitializer:
     def __init__(self, app_context: AppContext):
@@ -13,26 +32,136 @@ class VectorStoreInitializer:
         self.logger: Logger = app_context.logger
         self.embedding_key = app_context.configurations.vectorStore.embeddingKey
         self.index_name = app_context.configurations.vectorStore.indexName
+        self.client = QdrantClient(url=self.app_context.env_vars.VECTOR_DB_CLUSTER_URI,
+                                   api_key=self.app_context.env_vars.VECTOR_DB_API_KEY)
 
-    def init_collection(self) -> None:
-        collection_name = self.app_context.configurations.vectorStore.collectionName
-        client = QdrantClient(url=self.app_context.env_vars.VECTOR_DB_CLUSTER_URI,
-                              api_key=self.app_context.env_vars.VECTOR_DB_API_KEY)
+    def get_alias_target(self, alias_name: str) -> str | None:
+        """Get the name of the collection the alias points to, or None if the alias does not exist."""
+        for alias in self.client.get_aliases().aliases:
+            if alias.alias_name == alias_name:
+                return alias.collection_name
+        return None
 
+    def create_collection(self, collection_name: str) -> None:
+        """Create a collection with the configured vectors, and the payload indexes used to select the chunks of a source."""
         configured_similarity_fn = self.app_context.configurations.vectorStore.relevanceScoreFn or Distance.COSINE
         num_dimensions = DIMENSIONS_DICT.get(self.app_context.configurations.embeddings.name,
                                              DEFAULT_NUM_DIMENSIONS_VALUE)
         embeddings_key = self.app_context.configurations.vectorStore.embeddingKey
         sparse_key = self.app_context.configurations.vectorStore.textKey
 
-        # Create the collection if it does not exist
-        if not client.collection_exists(collection_name):
-            self.logger.info(f'Collection "{collection_name}" missing, it will be created now')
-            client.create_collection(
+        self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config={embeddings_key: VectorParams(size=num_dimensions,
+                                                         distance=configured_similarity_fn)},
+            sparse_vectors_config={sparse_key: SparseVectorParams()},
+        )
+        self.create_payload_indexes(collection_name)
+
+    def create_payload_indexes(self, collection_name: str) -> None:
+        """Index the payload fields used to delete or replace the chunks of a source (no-op if already indexed)."""
+        for field_name in (SOURCE_PAYLOAD_KEY, SOURCE_PREFIXES_PAYLOAD_KEY):
+            self.client.create_payload_index(
                 collection_name=collection_name,
-                vectors_config={embeddings_key: VectorParams(size=num_dimensions,
-                                                             distance=configured_similarity_fn)},
-                sparse_vectors_config={sparse_key: SparseVectorParams()},
+                field_name=field_name,
+                field_schema=PayloadSchemaType.KEYWORD
             )
-        else:
+
+    def copy_points(self, source_collection_name: str, target_collection_name: str,
+                    points_filter: Filter | None = None) -> int:
+        """
+        Copy the points of a collection, with their vectors and payload, to another collection with the same vectors.
+
+        Args:
+            source_collection_name (str): The collection to read the points from.
+            target_collection_name (str): The collection to write the points to.
+            points_filter (Filter | None): The filter selecting the points to copy. Defaults to all the points.
+
+        Returns:
+            int: The number of points copied.
+        """
+        copied = 0
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=source_collection_name,
+                scroll_filter=points_filter,
+                limit=COPY_BATCH_SIZE,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            if points:
+                self.client.upsert(
+                    collection_name=target_collection_name,
+                    points=[PointStruct(id=point.id, vector=point.vector, payload=point.payload) for point in points],
+                    wait=True
+                )
+                copied += len(points)
+            if offset is None:
+                return copied
+
+    def migrate_legacy_collection(self, collection_name: str) -> str:
+        """
+        Move a collection created before the aliases, which has the configured name, to the first version behind
+        an alias with that name, so that it can be rebuilt and swapped like the versions.
+
+        The points are copied first, with the vectors of the legacy collection; the legacy collection is deleted only
+        once the copy is complete, right before creating the alias. Should creating the alias fail, the points are
+        in the first version, served through the alias created at the next startup.
+
+        Args:
+            collection_name (str): The configured collection name.
+
+        Returns:
+            str: The name of the first version.
+        """
+        version_name = get_collection_version_name(collection_name, INITIAL_COLLECTION_VERSION)
+        if self.client.collection_exists(version_name):
+            # The copy of a previous migration was interrupted before the legacy collection was deleted
+            self.client.delete_collection(version_name)
+
+        legacy_params = self.client.get_collection(collection_name).config.params
+        self.client.create_collection(
+            collection_name=version_name,
+            vectors_config=legacy_params.vectors,
+            sparse_vectors_config=legacy_params.sparse_vectors,
+        )
+        self.create_payload_indexes(version_name)
+        copied = self.copy_points(collection_name, version_name)
+        legacy_points = self.client.count(collection_name=collection_name, exact=True).count
+        if copied != legacy_points:
+            raise RuntimeError(
+                f'Collection "{collection_name}" changed while migrating it: {copied} of {legacy_points} points copied'
+            )
+
+        self.logger.warning(f'Replacing collection "{collection_name}" with an alias of "{version_name}" ({copied} points)')
+        self.client.delete_collection(collection_name)
+        self.client.update_collection_aliases(change_aliases_operations=[
+            CreateAliasOperation(create_alias=CreateAlias(collection_name=version_name, alias_name=collection_name))
+        ])
+        return version_name
+
+    def init_collection(self) -> None:
+        """
+        Ensure the configured collection exists. A new collection is created as the first version behind an alias
+        with the configured name, so that it can be rebuilt and swapped without downtime; an existing collection
+        with the configured name is used as it is.
+        """
+        collection_name = self.app_context.configurations.vectorStore.collectionName
+
+        alias_target = self.get_alias_target(collection_name)
+        if alias_target is not None:
+            self.logger.info(f'Using collection "{alias_target}" through alias "{collection_name}"')
+            self.create_payload_indexes(alias_target)
+        elif self.client.collection_exists(collection_name):
             self.logger.info(f'Using existing collection "{collection_name}"')
+            self.create_payload_indexes(collection_name)
+        else:
+            version_name = get_collection_version_name(collection_name, INITIAL_COLLECTION_VERSION)
+            self.logger.info(f'Collection "{collection_name}" missing, it will be created now as "{version_name}"')
+            if not self.client.collection_exists(version_name):
+                self.create_collection(version_name)
+            self.client.update_collection_aliases(change_aliases_operations=[
+                CreateAliasOperation(create_alias=CreateAlias(collection_name=version_name, alias_name=collection_name))
+            ])
@@ -0,0 +1,213 @@
+"""
+Module providing the CircuitBreaker class, which fails fast the calls to a dependency that keeps failing,
+and the CircuitBreakerManager class, which holds the circuit breakers of the dependencies of the service.
+"""
+
+import threading
+import time
+from logging import Logger
+from typing import Awaitable, Callable, Dict, TypeVar
+
+from context import AppContext
+from infrastracture.circuit_breaker.errors import CircuitOpenError
+from infrastracture.metrics.manager import MetricsManager
+
+CLOSED_STATE = "closed"
+HALF_OPEN_STATE = "half_open"
+OPEN_STATE = "open"
+
+# The value of each state in the `circuit_breaker_state` metric
+STATE_METRIC_VALUES = {CLOSED_STATE: 0, HALF_OPEN_STATE: 1, OPEN_STATE: 2}
+
+QDRANT_DEPENDENCY = "qdrant"
+POSTGRES_DEPENDENCY = "postgres"
+LLM_DEPENDENCY = "llm"
+
+T = TypeVar("T")
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcome of the calls to a dependency. After `failure_threshold` consecutive failures the circuit
+    opens, and the calls are rejected immediately with a `CircuitOpenError`, instead of waiting for the timeout
+    of a dependency that is down. Once `recovery_timeout` seconds have passed, the circuit is half-open: up to
+    `half_open_max_calls` calls are let through as probes, the first successful one closing the circuit, and the
+    first failed one opening it again.
+
+    The state of the circuit is exported as the `circuit_breaker_state` metric, and the rejected calls as the
+    `circuit_breaker_rejected_calls` metric.
+
+    Args:
+        dependency (str): The name of the dependency, used in the errors, the logs and the metrics.
+        logger (Logger): The logger.
+        metrics_manager (MetricsManager): The manager of the metrics.
+        failure_threshold (int): The number of consecutive failures opening the circuit.
+        recovery_timeout (float): The seconds the circuit stays open before letting probes through.
+        half_open_max_calls (int): The maximum number of probes running at the same time while half-open.
+        enabled (bool): Whether the circuit can open; a disabled breaker lets all the calls through. Defaults to True.
+    """
+
+    def __init__(
+        self,
+        dependency: str,
+        logger: Logger,
+        metrics_manager: MetricsManager,
+        failure_threshold: int,
+        recovery_timeout: float,
+        half_open_max_calls: int,
+        enabled: bool = True
+    ):
+        self.dependency = dependency
+        self.logger = logger
+        self._metrics_manager = metrics_manager
+        self._failure_threshold = max(failure_threshold, 1)
+        self._recovery_timeout = recovery_timeout
+        self._half_open_max_calls = max(half_open_max_calls, 1)
+        self._enabled = enabled
+        self._lock = threading.Lock()
+        self._state = CLOSED_STATE
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._metrics_manager.circuit_breaker_state.labels(dependency=dependency).set(STATE_METRIC_VALUES[CLOSED_STATE])
+
+    def _set_state(self, state: str):
+        if state == self._state:
+            return
+        self.logger.warning(f"Circuit breaker of {self.dependency}: {self._state} -> {state}.")
+        self._state = state
+        self._probes = 0
+        if state == OPEN_STATE:
+            self._opened_at = time.monotonic()
+        self._metrics_manager.circuit_breaker_state.labels(dependency=self.dependency).set(STATE_METRIC_VALUES[state])
+
+    def _get_retry_after(self) -> float:
+        return max(self._opened_at + self._recovery_timeout - time.monotonic(), 0.0)
+
+    @property
+    def state(self) -> str:
+        """The state of the circuit: closed, half_open or open."""
+        with self._lock:
+            if self._state == OPEN_STATE and self._get_retry_after() == 0:
+                self._set_state(HALF_OPEN_STATE)
+            return self._state
+
+    def before_call(self):
+        """
+        Check whether a call to the dependency can be made. A call allowed must then be followed
+        by `record_success` or `record_failure`.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with all the probes already running.
+        """
+        if not self._enabled:
+            return
+        with self._lock:
+            if self._state == OPEN_STATE and self._get_retry_after() == 0:
+                self._set_state(HALF_OPEN_STATE)
+            if self._state == CLOSED_STATE:
+                return
+            if self._state == HALF_OPEN_STATE and self._probes < self._half_open_max_calls:
+                self._probes += 1
+                return
+            retry_after = self._get_retry_after() if self._state == OPEN_STATE else self._recovery_timeout
+        self._metrics_manager.circuit_breaker_rejected_calls.labels(dependency=self.dependency).inc()
+        raise CircuitOpenError(self.dependency, retry_after)
+
+    def record_success(self):
+        """Record a successful call: it closes a half-open circuit."""
+        with self._lock:
+            self._failures = 0
+            if self._state == HALF_OPEN_STATE:
+                self._set_state(CLOSED_STATE)
+
+    def record_failure(self):
+        """Record a failed call: it opens a half-open circuit, or a closed one once the threshold is reached."""
+        with self._lock:
+            self._failures += 1
+            if not self._enabled:
+                return
+            if self._state == HALF_OPEN_STATE or (
+                self._state == CLOSED_STATE and self._failures >= self._failure_threshold
+            ):
+                self._set_state(OPEN_STATE)
+
+    def call(self, function: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Call the function through the circuit breaker, recording its outcome.
+
+        Raises:
+            CircuitOpenError: If the call is rejected.
+            Exception: The error of the function, recorded as a failure.
+        """
+        self.before_call()
+        try:
+            result = function(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    async def call_async(self, function: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        """
+        Await the coroutine function through the circuit breaker, recording its outcome.
+
+        Raises:
+            CircuitOpenError: If the call is rejected.
+            Exception: The error of the function, recorded as a failure.
+        """
+        self.before_call()
+        try:
+            result = await function(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+class CircuitBreakerManager:
+    """
+    Holds the circuit breakers of the dependencies of the service, shared by all the requests: the vector store
+    (Qdrant searches), the database (Postgres connections) and the LLM (completions), configured by the
+    `circuitBreakers` section of the configuration.
+
+    Args:
+        app_context (AppContext): The application context.
+    """
+
+    def __init__(self, app_context: AppContext):
+        configuration = app_context.configurations.circuitBreakers
+        self.degraded_mode = configuration.degradedMode
+        self._circuit_breakers: Dict[str, CircuitBreaker] = {
+            dependency: CircuitBreaker(
+                dependency=dependency,
+                logger=app_context.logger,
+                metrics_manager=app_context.metrics_manager,
+                failure_threshold=configuration.failureThreshold,
+                recovery_timeout=configuration.recoveryTimeout,
+                half_open_max_calls=configuration.halfOpenMaxCalls,
+                enabled=configuration.enabled
+            )
+            for dependency in (QDRANT_DEPENDENCY, POSTGRES_DEPENDENCY, LLM_DEPENDENCY)
+        }
+
+    @property
+    def qdrant(self) -> CircuitBreaker:
+        """The circuit breaker of the searches in the vector store."""
+        return self._circuit_breakers[QDRANT_DEPENDENCY]
+
+    @property
+    def postgres(self) -> CircuitBreaker:
+        """The circuit breaker of the connections to the database."""
+        return self._circuit_breakers[POSTGRES_DEPENDENCY]
+
+    @property
+    def llm(self) -> CircuitBreaker:
+        """The circuit breaker of the calls to the LLM."""
+        return self._circuit_breakers[LLM_DEPENDENCY]
+
+    def get_states(self) -> Dict[str, str]:
+        """The state of the circuit breaker of each dependency."""
+        return {dependency: circuit_breaker.state for dependency, circuit_breaker in self._circuit_breakers.items()}
@@ -0,0 +1,37 @@
+"""
+Module providing the CircuitBreakerCallbackHandler class, which puts the calls of a LangChain model behind a circuit breaker.
+"""
+
+from typing import Any
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from infrastracture.circuit_breaker.circuit_breaker import CircuitBreaker
+
+
+class CircuitBreakerCallbackHandler(BaseCallbackHandler):
+    """
+    Callback handler of a model checking its circuit breaker at the start of each call, and recording the outcome
+    of the call. As errors are raised by the handler, a call rejected by an open circuit fails with a
+    `CircuitOpenError` before any request is sent to the provider.
+
+    Args:
+        circuit_breaker (CircuitBreaker): The circuit breaker of the model.
+    """
+
+    raise_error: bool = True
+
+    def __init__(self, circuit_breaker: CircuitBreaker):
+        self.circuit_breaker = circuit_breaker
+
+    def on_llm_start(self, *args: Any, **kwargs: Any) -> None:
+        self.circuit_breaker.before_call()
+
+    def on_chat_model_start(self, *args: Any, **kwargs: Any) -> None:
+        self.circuit_breaker.before_call()
+
+    def on_llm_end(self, *args: Any, **kwargs: Any) -> None:
+        self.circuit_breaker.record_success()
+
+    def on_llm_error(self, *args: Any, **kwargs: Any) -> None:
+        self.circuit_breaker.record_failure()
@@ -0,0 +1,7 @@
+class CircuitOpenError(Exception):
+    """Exception raised when a call to a dependency is rejected because its circuit breaker is open."""
+
+    def __init__(self, dependency: str, retry_after: float):
+        super().__init__(f"The dependency {dependency} is unavailable, retry in {retry_after:.0f} seconds.")
+        self.dependency = dependency
+        self.retry_after = retry_after
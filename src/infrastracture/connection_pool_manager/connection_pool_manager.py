@@ -0,0 +1,116 @@
+"""
+Module providing the ConnectionPoolManager class, which holds the pools of connections to the database shared by the application.
+"""
+
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+
+import psycopg
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
+
+from context import AppContext
+
+SYNC_POOL = "sync"
+ASYNC_POOL = "async"
+
+
+class ConnectionPoolManager:
+    """
+    Holds the pools of connections to Postgres shared by all the requests, so that the storage borrows an open
+    connection instead of opening a new one (a TCP and authentication handshake) for each query: a pool of blocking
+    connections, used by `SqlStorage`, and a pool of asynchronous connections, used by `AsyncSqlStorage` in the
+    asynchronous handlers, opened only by the API once its event loop is running.
+
+    Each pool keeps between `connectionPool.minSize` and `connectionPool.maxSize` connections, all in autocommit mode.
+    A connection is checked before being lent, and replaced if broken, and it is closed once idle for
+    `connectionPool.maxIdle` seconds or open for `connectionPool.maxLifetime` seconds. A request waiting more than
+    `connectionPool.timeout` seconds for a connection fails with a `PoolTimeout`.
+
+    The time waited for a connection is exported as the `db_pool_wait_seconds` metric, and the state of the pools
+    as the `db_pool_size`, `db_pool_available_connections` and `db_pool_waiting_requests` metrics, labelled by pool.
+
+    Args:
+        app_context (AppContext): The application context.
+    """
+
+    def __init__(self, app_context: AppContext):
+        self.logger = app_context.logger
+        self._metrics_manager = app_context.metrics_manager
+        self._configuration = app_context.configurations.connectionPool
+        pool_parameters = dict(
+            conninfo=app_context.env_vars.DB_URI,
+            min_size=self._configuration.minSize,
+            max_size=max(self._configuration.maxSize, self._configuration.minSize),
+            timeout=self._configuration.timeout,
+            max_idle=self._configuration.maxIdle,
+            max_lifetime=self._configuration.maxLifetime,
+            kwargs={"autocommit": True},
+            open=False
+        )
+        self._pool = ConnectionPool(
+            check=ConnectionPool.check_connection if self._configuration.checkConnections else None,
+            name="sql-storage",
+            **pool_parameters
+        )
+        self._async_pool = AsyncConnectionPool(
+            check=AsyncConnectionPool.check_connection if self._configuration.checkConnections else None,
+            name="async-sql-storage",
+            **pool_parameters
+        )
+
+    def open(self):
+        """Open the pool of blocking connections: the minimum number of connections is created in background."""
+        self._pool.open(wait=False)
+        self.logger.info(
+            f"Connection pool opened ({self._configuration.minSize}-{self._configuration.maxSize} connections)."
+        )
+
+    def close(self):
+        """Close the pool of blocking connections and all its connections."""
+        self._pool.close()
+
+    async def open_async(self):
+        """Open the pool of asynchronous connections, in the running event loop."""
+        await self._async_pool.open(wait=False)
+        self.logger.info(
+            f"Async connection pool opened ({self._configuration.minSize}-{self._configuration.maxSize} connections)."
+        )
+
+    async def close_async(self):
+        """Close the pool of asynchronous connections and all its connections."""
+        await self._async_pool.close()
+
+    def _export_stats(self, pool_name: str, pool: ConnectionPool | AsyncConnectionPool):
+        stats = pool.get_stats()
+        self._metrics_manager.db_pool_size.labels(pool=pool_name).set(stats.get("pool_size", 0))
+        self._metrics_manager.db_pool_available_connections.labels(pool=pool_name).set(stats.get("pool_available", 0))
+        self._metrics_manager.db_pool_waiting_requests.labels(pool=pool_name).set(stats.get("requests_waiting", 0))
+
+    @contextmanager
+    def connection(self) -> Iterator[psycopg.Connection]:
+        """
+        Borrow a connection from the pool, given back once the block is exited.
+
+        Raises:
+            PoolTimeout: If no connection is available within `connectionPool.timeout` seconds.
+        """
+        started_at = time.perf_counter()
+        with self._pool.connection() as conn:
+            self._metrics_manager.db_pool_wait.labels(pool=SYNC_POOL).observe(time.perf_counter() - started_at)
+            self._export_stats(SYNC_POOL, self._pool)
+            yield conn
+
+    @asynccontextmanager
+    async def async_connection(self) -> AsyncIterator[psycopg.AsyncConnection]:
+        """
+        Borrow an asynchronous connection from the pool, given back once the block is exited.
+
+        Raises:
+            PoolTimeout: If no connection is available within `connectionPool.timeout` seconds.
+        """
+        started_at = time.perf_counter()
+        async with self._async_pool.connection() as conn:
+            self._metrics_manager.db_pool_wait.labels(pool=ASYNC_POOL).observe(time.perf_counter() - started_at)
+            self._export_stats(ASYNC_POOL, self._async_pool)
+            yield conn
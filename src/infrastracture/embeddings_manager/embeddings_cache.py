@@ -0,0 +1,210 @@
+"""
+Module providing the CachedEmbeddings class, a persistent cache of the embeddings of the documents.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from logging import Logger
+from typing import Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+from infrastracture.metrics.manager import MetricsManager
+
+# The number of hashes looked up with a single query, below the SQLite limit of bound parameters
+SQLITE_MAX_PARAMETERS = 500
+
+# The fraction of `max_entries` kept when evicting, so that the entries are counted and evicted once every
+# `max_entries * (1 - EVICTION_LOW_WATERMARK)` new entries, instead of at each write once the cache is full
+EVICTION_LOW_WATERMARK = 0.9
+
+
+@dataclass
+class _CacheFile:
+    """
+    The connection to a cache file, with the lock serializing its use and the approximate number of its entries:
+    the entries added by the other processes sharing the file are counted only when evicting.
+    """
+    connection: sqlite3.Connection
+    lock: threading.Lock
+    entries: int
+
+
+# The cache files opened, shared by all the instances of the process
+_cache_files: Dict[str, _CacheFile] = {}
+_cache_files_lock = threading.Lock()
+
+
+def _get_cache_file(path: str) -> _CacheFile:
+    """
+    Get the cache file at the given path, opening it and creating the table on first use.
+    The connection is shared by all the instances of the process, and kept open for its lifetime.
+    """
+    with _cache_files_lock:
+        key = os.path.abspath(path)
+        if key in _cache_files:
+            return _cache_files[key]
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings_cache (
+                    model TEXT NOT NULL,
+                    dimensions INTEGER NOT NULL,
+                    text_sha TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    PRIMARY KEY (model, dimensions, text_sha)
+                )
+                """
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_cache_last_used_at ON embeddings_cache (last_used_at)"
+            )
+            entries = connection.execute("SELECT COUNT(*) FROM embeddings_cache").fetchone()[0]
+        _cache_files[key] = _CacheFile(connection=connection, lock=threading.Lock(), entries=entries)
+        return _cache_files[key]
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapping another Embeddings instance, storing the embeddings of the documents in a local SQLite database.
+
+    Embeddings are keyed by (model name, dimensions, SHA-256 of the text), so that the same text embedded by the
+    same model is never sent to the provider twice, even across restarts. When the cache holds more than
+    `max_entries` embeddings, the least recently used ones are evicted, down to `EVICTION_LOW_WATERMARK` of
+    `max_entries`. The instances of a process using the same file share a single connection to it.
+
+    Queries are not cached and are delegated to the wrapped instance.
+    """
+
+    def __init__(
+        self,
+        logger: Logger,
+        metrics_manager: MetricsManager,
+        embeddings: Embeddings,
+        model_name: str,
+        path: str,
+        max_entries: int
+    ):
+        self.logger = logger
+        self._metrics_manager = metrics_manager
+        self._embeddings = embeddings
+        self._model_name = model_name
+        self._dimensions = getattr(embeddings, 'dimensions', None) or 0
+        self._max_entries = max_entries
+
+        self._cache_file = _get_cache_file(path)
+        self._connection, self._lock = self._cache_file.connection, self._cache_file.lock
+
+    @staticmethod
+    def _get_text_sha(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _read(self, text_shas: List[str]) -> Dict[str, List[float]]:
+        """
+        Read the cached embeddings of the given texts, updating the time they were last used.
+        """
+        cached = {}
+        with self._lock, self._connection:
+            for start in range(0, len(text_shas), SQLITE_MAX_PARAMETERS):
+                group = text_shas[start:start + SQLITE_MAX_PARAMETERS]
+                placeholders = ','.join('?' * len(group))
+                rows = self._connection.execute(
+                    f"""
+                    SELECT text_sha, vector FROM embeddings_cache
+                    WHERE model = ? AND dimensions = ? AND text_sha IN ({placeholders})
+                    """,
+                    (self._model_name, self._dimensions, *group)
+                ).fetchall()
+                if rows:
+                    self._connection.execute(
+                        f"""
+                        UPDATE embeddings_cache SET last_used_at = ?
+                        WHERE model = ? AND dimensions = ? AND text_sha IN ({placeholders})
+                        """,
+                        (time.time(), self._model_name, self._dimensions, *group)
+                    )
+                cached.update({text_sha: array('f', vector).tolist() for text_sha, vector in rows})
+        return cached
+
+    def _write(self, embeddings: Dict[str, List[float]]):
+        """
+        Store the given embeddings, evicting the least recently used ones above the maximum number of entries.
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            cursor = self._connection.executemany(
+                """
+                INSERT OR IGNORE INTO embeddings_cache (model, dimensions, text_sha, vector, last_used_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [
+                    (self._model_name, self._dimensions, text_sha, array('f', vector).tobytes(), now)
+                    for text_sha, vector in embeddings.items()
+                ]
+            )
+            # The embeddings already stored by another process are ignored, and not counted as new entries
+            self._cache_file.entries += max(cursor.rowcount, 0)
+            if self._cache_file.entries <= self._max_entries:
+                return
+
+            # The entries added by the other processes sharing the file are counted before evicting
+            entries = self._connection.execute("SELECT COUNT(*) FROM embeddings_cache").fetchone()[0]
+            kept_entries = int(self._max_entries * EVICTION_LOW_WATERMARK)
+            if entries > self._max_entries:
+                self._connection.execute(
+                    """
+                    DELETE FROM embeddings_cache WHERE rowid IN (
+                        SELECT rowid FROM embeddings_cache ORDER BY last_used_at ASC LIMIT ?
+                    )
+                    """,
+                    (entries - kept_entries,)
+                )
+                entries = kept_entries
+            self._cache_file.entries = entries
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed the documents, sending to the wrapped instance only the texts not found in the cache.
+        """
+        if not texts:
+            return []
+
+        text_shas = [self._get_text_sha(text) for text in texts]
+        try:
+            cached = self._read(list(set(text_shas)))
+        except sqlite3.Error as ex:
+            self.logger.warning(f"Error reading the embeddings cache: {str(ex)}")
+            cached = {}
+
+        missing = {text_sha: text for text_sha, text in zip(text_shas, texts) if text_sha not in cached}
+        hits = sum(1 for text_sha in text_shas if text_sha in cached)
+        self._metrics_manager.embeddings_cache_hits.inc(hits)
+        self._metrics_manager.embeddings_cache_misses.inc(len(texts) - hits)
+
+        if missing:
+            generated = dict(zip(missing.keys(), self._embeddings.embed_documents(list(missing.values()))))
+            try:
+                self._write(generated)
+            except sqlite3.Error as ex:
+                self.logger.warning(f"Error writing the embeddings cache: {str(ex)}")
+            cached.update(generated)
+
+        return [cached[text_sha] for text_sha in text_shas]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self._embeddings.aembed_query(text)
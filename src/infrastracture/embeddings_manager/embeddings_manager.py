@@ -1,5 +1,6 @@
 from langchain_openai import AzureOpenAIEmbeddings, OpenAIEmbeddings
 from langchain_core.embeddings import Embeddings
+from infrastracture.embeddings_manager.embeddings_cache import CachedEmbeddings
 from infrastracture.embeddings_manager.errors import UnsupportedEmbeddingsProviderError
 from context import AppContext
 
@@ -9,6 +10,22 @@ class EmbeddingsManager:
         self.app_context = app_context
 
     def get_embeddings_instance(self) -> Embeddings:
+        embeddings = self._get_provider_embeddings_instance()
+
+        cache_configuration = self.app_context.configurations.ingestion.embeddingsCache
+        if not cache_configuration.enabled:
+            return embeddings
+
+        return CachedEmbeddings(
+            logger=self.app_context.logger,
+            metrics_manager=self.app_context.metrics_manager,
+            embeddings=embeddings,
+            model_name=self.app_context.configurations.embeddings.name,
+            path=cache_configuration.path,
+            max_entries=cache_configuration.maxEntries
+        )
+
+    def _get_provider_embeddings_instance(self) -> Embeddings:
         embeddings_api_key = self.app_context.env_vars.EMBEDDINGS_API_KEY
         embeddings_configuration = self.app_context.configurations.embeddings
 
@@ -0,0 +1,113 @@
+"""
+Module providing the HealthManager class, which periodically checks the health of the dependencies of the service.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict
+
+import psycopg
+from qdrant_client import QdrantClient
+
+from context import AppContext
+
+QDRANT_DEPENDENCY = "qdrant"
+POSTGRES_DEPENDENCY = "postgres"
+
+
+@dataclass
+class DependencyHealth:
+    """
+    The result of the last health check of a dependency.
+    """
+    healthy: bool
+    latency_ms: float | None = None
+    checked_at: datetime | None = None
+    error: str | None = None
+
+
+class HealthManager:
+    """
+    Checks the health of Qdrant and Postgres in background, every `healthCheck.interval` seconds, and caches the
+    results, so that the check-up endpoint answers immediately and does not load the dependencies. A dependency whose
+    last check is older than three intervals (e.g. because the check hangs) is reported as unhealthy.
+
+    The health of each dependency is also exported as the `dependency_up` metric.
+
+    Args:
+        app_context (AppContext): The application context.
+    """
+
+    def __init__(self, app_context: AppContext):
+        self.app_context = app_context
+        self.logger = app_context.logger
+        self._metrics_manager = app_context.metrics_manager
+        self._configuration = app_context.configurations.healthCheck
+        self._qdrant_client = QdrantClient(
+            url=app_context.env_vars.VECTOR_DB_CLUSTER_URI,
+            api_key=app_context.env_vars.VECTOR_DB_API_KEY,
+            timeout=int(self._configuration.timeout)
+        )
+        self._checks: Dict[str, Callable[[], None]] = {
+            QDRANT_DEPENDENCY: self._check_qdrant,
+            POSTGRES_DEPENDENCY: self._check_postgres,
+        }
+        self._lock = threading.Lock()
+        self._health: Dict[str, DependencyHealth] = {
+            name: DependencyHealth(healthy=False, error="Not checked yet.") for name in self._checks
+        }
+
+    def _check_qdrant(self):
+        self._qdrant_client.get_collections()
+
+    def _check_postgres(self):
+        with psycopg.connect(self.app_context.env_vars.DB_URI, connect_timeout=int(self._configuration.timeout)) as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+
+    def check(self):
+        """Check all the dependencies, updating the cached results."""
+        for name, check in self._checks.items():
+            started_at = time.perf_counter()
+            try:
+                check()
+                health = DependencyHealth(
+                    healthy=True,
+                    latency_ms=(time.perf_counter() - started_at) * 1000,
+                    checked_at=datetime.now()
+                )
+            except Exception as ex:
+                health = DependencyHealth(healthy=False, checked_at=datetime.now(), error=str(ex))
+                self.logger.warning(f"Health check of {name} failed: {str(ex)}")
+            with self._lock:
+                self._health[name] = health
+            self._metrics_manager.dependency_up.labels(dependency=name).set(1 if health.healthy else 0)
+
+    def get_health(self) -> Dict[str, DependencyHealth]:
+        """The cached health of each dependency."""
+        now = datetime.now()
+        with self._lock:
+            health = dict(self._health)
+        for name, dependency_health in health.items():
+            if (
+                dependency_health.checked_at is not None
+                and (now - dependency_health.checked_at).total_seconds() > 3 * self._configuration.interval
+            ):
+                health[name] = DependencyHealth(
+                    healthy=False,
+                    latency_ms=dependency_health.latency_ms,
+                    checked_at=dependency_health.checked_at,
+                    error="The last health check is too old."
+                )
+        return health
+
+    def _run(self):
+        while True:
+            self.check()
+            time.sleep(self._configuration.interval)
+
+    def start(self):
+        """Start checking the dependencies in background."""
+        threading.Thread(target=self._run, name="health-check", daemon=True).start()
@@ -1,4 +1,4 @@
-from prometheus_client import Counter, generate_latest
+from prometheus_client import Counter, Gauge, Histogram, generate_latest
 from fastapi import Response
 
 
@@ -24,6 +24,118 @@ class MetricsManager:
             'Number of ingestion tokens consumed',
             namespace='console' # TODO: add to configurations
         )
+        self._ingestion_chunks_deduplicated = Counter(
+            'ingestion_chunks_deduplicated',
+            'Number of chunks skipped during ingestion because already stored',
+            namespace='console' # TODO: add to configurations
+        )
+        self._ingestion_chunks_near_duplicates = Counter(
+            'ingestion_chunks_near_duplicates',
+            'Number of chunks skipped during ingestion because nearly identical to chunks already stored',
+            namespace='console' # TODO: add to configurations
+        )
+        self._ingestion_boilerplate_tokens_saved = Counter(
+            'ingestion_boilerplate_tokens_saved',
+            'Number of tokens not embedded because part of blocks repeated across the pages of a crawled website',
+            namespace='console' # TODO: add to configurations
+        )
+        self._embeddings_cache_hits = Counter(
+            'embeddings_cache_hits',
+            'Number of embeddings read from the embeddings cache',
+            namespace='console' # TODO: add to configurations
+        )
+        self._embeddings_cache_misses = Counter(
+            'embeddings_cache_misses',
+            'Number of embeddings not found in the embeddings cache and requested to the provider',
+            namespace='console' # TODO: add to configurations
+        )
+        self._ingestion_pipeline_items_processed = Counter(
+            'ingestion_pipeline_items_processed',
+            'Number of items processed by each stage of the ingestion pipeline',
+            ['stage'],
+            namespace='console' # TODO: add to configurations
+        )
+        self._ingestion_pipeline_errors = Counter(
+            'ingestion_pipeline_errors',
+            'Number of items failed in each stage of the ingestion pipeline',
+            ['stage'],
+            namespace='console' # TODO: add to configurations
+        )
+        self._ingestion_pipeline_queue_depth = Gauge(
+            'ingestion_pipeline_queue_depth',
+            'Number of items waiting to be processed by each stage of the ingestion pipeline',
+            ['stage'],
+            namespace='console' # TODO: add to configurations
+        )
+        self._dependency_up = Gauge(
+            'dependency_up',
+            'Whether the last health check of each dependency of the service succeeded (1) or failed (0)',
+            ['dependency'],
+            namespace='console' # TODO: add to configurations
+        )
+        self._ingestion_points_upserted = Counter(
+            'ingestion_points_upserted',
+            'Number of points written to the vector store by the ingestion',
+            namespace='console' # TODO: add to configurations
+        )
+        self._ingestion_upsert_throughput = Gauge(
+            'ingestion_upsert_throughput',
+            'Number of points written to the vector store per second by the last ingestion, until its writes were applied',
+            namespace='console' # TODO: add to configurations
+        )
+        self._startup_phase_duration = Gauge(
+            'startup_phase_duration_seconds',
+            'Seconds taken by each phase of the startup of the service',
+            ['phase'],
+            namespace='console' # TODO: add to configurations
+        )
+        self._time_to_first_request = Gauge(
+            'time_to_first_request_seconds',
+            'Seconds from the start of the service to its first request',
+            namespace='console' # TODO: add to configurations
+        )
+        self._circuit_breaker_state = Gauge(
+            'circuit_breaker_state',
+            'State of the circuit breaker of each dependency: 0 closed, 1 half-open, 2 open',
+            ['dependency'],
+            namespace='console' # TODO: add to configurations
+        )
+        self._circuit_breaker_rejected_calls = Counter(
+            'circuit_breaker_rejected_calls',
+            'Number of calls to each dependency rejected because its circuit breaker is open',
+            ['dependency'],
+            namespace='console' # TODO: add to configurations
+        )
+        self._degraded_responses = Counter(
+            'degraded_responses',
+            'Number of chat completions answered without retrieval context because the vector store is unavailable',
+            namespace='console' # TODO: add to configurations
+        )
+        self._db_pool_wait = Histogram(
+            'db_pool_wait_seconds',
+            'Seconds waited to borrow a connection from each database connection pool',
+            ['pool'],
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+            namespace='console' # TODO: add to configurations
+        )
+        self._db_pool_size = Gauge(
+            'db_pool_size',
+            'Number of connections of each database connection pool, lent or available',
+            ['pool'],
+            namespace='console' # TODO: add to configurations
+        )
+        self._db_pool_available_connections = Gauge(
+            'db_pool_available_connections',
+            'Number of idle connections of each database connection pool',
+            ['pool'],
+            namespace='console' # TODO: add to configurations
+        )
+        self._db_pool_waiting_requests = Gauge(
+            'db_pool_waiting_requests',
+            'Number of requests waiting for a connection of each database connection pool',
+            ['pool'],
+            namespace='console' # TODO: add to configurations
+        )
 
     @property
     def embeddings_tokens_consumed(self) -> Counter:
@@ -45,6 +157,106 @@ class MetricsManager:
         """Counter representing the total number of tokens consumed during the data ingestion process."""
         return self._ingestion_tokens_consumed
 
+    @property
+    def ingestion_chunks_deduplicated(self) -> Counter:
+        """Counter representing the total number of chunks not embedded again because already stored in the vector store."""
+        return self._ingestion_chunks_deduplicated
+
+    @property
+    def ingestion_chunks_near_duplicates(self) -> Counter:
+        """Counter representing the total number of chunks not embedded because near-duplicates of chunks already stored."""
+        return self._ingestion_chunks_near_duplicates
+
+    @property
+    def ingestion_boilerplate_tokens_saved(self) -> Counter:
+        """Counter representing the total number of tokens not embedded because part of the boilerplate of a crawled website."""
+        return self._ingestion_boilerplate_tokens_saved
+
+    @property
+    def embeddings_cache_hits(self) -> Counter:
+        """Counter representing the total number of embeddings read from the embeddings cache."""
+        return self._embeddings_cache_hits
+
+    @property
+    def embeddings_cache_misses(self) -> Counter:
+        """Counter representing the total number of embeddings not found in the embeddings cache."""
+        return self._embeddings_cache_misses
+
+    @property
+    def ingestion_pipeline_items_processed(self) -> Counter:
+        """Counter, labelled by stage, representing the total number of items processed by the ingestion pipeline."""
+        return self._ingestion_pipeline_items_processed
+
+    @property
+    def ingestion_pipeline_errors(self) -> Counter:
+        """Counter, labelled by stage, representing the total number of items failed in the ingestion pipeline."""
+        return self._ingestion_pipeline_errors
+
+    @property
+    def ingestion_pipeline_queue_depth(self) -> Gauge:
+        """Gauge, labelled by stage, representing the number of items waiting in the queues of the ingestion pipeline."""
+        return self._ingestion_pipeline_queue_depth
+
+    @property
+    def dependency_up(self) -> Gauge:
+        """Gauge, labelled by dependency, representing the result of the last health check of the dependency."""
+        return self._dependency_up
+
+    @property
+    def ingestion_points_upserted(self) -> Counter:
+        """Counter representing the total number of points written to the vector store by the ingestion."""
+        return self._ingestion_points_upserted
+
+    @property
+    def ingestion_upsert_throughput(self) -> Gauge:
+        """Gauge representing the points written per second by the last ingestion."""
+        return self._ingestion_upsert_throughput
+
+    @property
+    def startup_phase_duration(self) -> Gauge:
+        """Gauge, labelled by phase, representing the seconds taken by the phase of the startup."""
+        return self._startup_phase_duration
+
+    @property
+    def time_to_first_request(self) -> Gauge:
+        """Gauge representing the seconds from the start of the service to its first request."""
+        return self._time_to_first_request
+
+    @property
+    def circuit_breaker_state(self) -> Gauge:
+        """Gauge, labelled by dependency, representing the state of the circuit breaker of the dependency."""
+        return self._circuit_breaker_state
+
+    @property
+    def circuit_breaker_rejected_calls(self) -> Counter:
+        """Counter, labelled by dependency, representing the total number of calls rejected by the circuit breaker."""
+        return self._circuit_breaker_rejected_calls
+
+    @property
+    def degraded_responses(self) -> Counter:
+        """Counter representing the total number of chat completions answered without retrieval context."""
+        return self._degraded_responses
+
+    @property
+    def db_pool_wait(self) -> Histogram:
+        """Histogram, labelled by pool, representing the seconds waited to borrow a connection from the database connection pool."""
+        return self._db_pool_wait
+
+    @property
+    def db_pool_size(self) -> Gauge:
+        """Gauge, labelled by pool, representing the number of connections of the database connection pool."""
+        return self._db_pool_size
+
+    @property
+    def db_pool_available_connections(self) -> Gauge:
+        """Gauge, labelled by pool, representing the number of idle connections of the database connection pool."""
+        return self._db_pool_available_connections
+
+    @property
+    def db_pool_waiting_requests(self) -> Gauge:
+        """Gauge, labelled by pool, representing the number of requests waiting for a connection of the database connection pool."""
+        return self._db_pool_waiting_requests
+
     def expose_metrics(self) -> Response:
         """Generate and return the metrics for Prometheus scraping."""
         metrics_data = generate_latest()
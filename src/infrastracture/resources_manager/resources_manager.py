@@ -0,0 +1,176 @@
+"""
+Module providing the ResourcesManager class, which holds the resources shared by the requests and warms them up.
+"""
+
+import threading
+import time
+from typing import Callable, List, Tuple
+
+import tiktoken
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_qdrant import FastEmbedSparse, QdrantVectorStore, RetrievalMode
+from qdrant_client import QdrantClient
+
+from context import AppContext
+from infrastracture.circuit_breaker.circuit_breaker_callback_handler import CircuitBreakerCallbackHandler
+from infrastracture.embeddings_manager.embeddings_manager import EmbeddingsManager
+from infrastracture.llm_manager.llm_manager import LlmManager
+
+# The sparse embeddings model used for the hybrid search
+SPARSE_MODEL_NAME = "Qdrant/bm25"
+# Encoding used to count the tokens of the chunks when the embeddings model is not known by tiktoken
+DEFAULT_EMBEDDINGS_TOKENIZER_ENCODING = "cl100k_base"
+
+
+class ResourcesManager:
+    """
+    Holds the resources that are expensive to create and can be shared by all the requests and ingestion jobs: the
+    sparse embeddings model, the tokenizers, the embeddings, LLM and Qdrant clients (with their pools of connections),
+    and the vector store, which reads the metadata of the collection when created.
+
+    Each resource is created once, on first use. `start_warmup` creates all of them in background at startup, and
+    runs a synthetic retrieval, so that the first requests do not pay for them: the service is ready once the warmup
+    is completed. A failed warmup is retried every `warmup.retryInterval` seconds.
+
+    Args:
+        app_context (AppContext): The application context.
+    """
+
+    def __init__(self, app_context: AppContext):
+        self.app_context = app_context
+        self.logger = app_context.logger
+        self._configuration = app_context.configurations.warmup
+        self._lock = threading.RLock()
+        self._resources = {}
+        self._ready = threading.Event()
+
+    def _get_resource(self, name: str, factory: Callable):
+        with self._lock:
+            if name not in self._resources:
+                self._resources[name] = factory()
+            return self._resources[name]
+
+    @property
+    def is_ready(self) -> bool:
+        """Whether the warmup is completed, or disabled."""
+        return self._ready.is_set()
+
+    @property
+    def sparse_embeddings(self) -> FastEmbedSparse:
+        """The sparse embeddings model, loaded from disk (and downloaded the first time)."""
+        return self._get_resource("sparse_embeddings", lambda: FastEmbedSparse(model_name=SPARSE_MODEL_NAME))
+
+    @property
+    def tokenizer(self) -> tiktoken.Encoding:
+        """The tokenizer of the configured model, used to count the tokens of the documents sent to the LLM."""
+        return self._get_resource(
+            "tokenizer", lambda: tiktoken.encoding_for_model(self.app_context.configurations.tokenizer.name)
+        )
+
+    @property
+    def embeddings_tokenizer(self) -> tiktoken.Encoding:
+        """The tokenizer of the embeddings model, used to count the tokens of the chunks."""
+        def create_embeddings_tokenizer() -> tiktoken.Encoding:
+            try:
+                return tiktoken.encoding_for_model(self.app_context.configurations.embeddings.name)
+            except KeyError:
+                return tiktoken.get_encoding(DEFAULT_EMBEDDINGS_TOKENIZER_ENCODING)
+
+        return self._get_resource("embeddings_tokenizer", create_embeddings_tokenizer)
+
+    @property
+    def qdrant_client(self) -> QdrantClient:
+        """The client of the vector store, used by the ingestion to write the points."""
+        return self._get_resource(
+            "qdrant_client",
+            lambda: QdrantClient(
+                url=self.app_context.env_vars.VECTOR_DB_CLUSTER_URI,
+                api_key=self.app_context.env_vars.VECTOR_DB_API_KEY
+            )
+        )
+
+    @property
+    def embeddings(self) -> Embeddings:
+        """The client of the embeddings model."""
+        return self._get_resource("embeddings", lambda: EmbeddingsManager(self.app_context).get_embeddings_instance())
+
+    @property
+    def llm(self) -> BaseChatModel:
+        """The client of the LLM, whose calls go through the circuit breaker of the LLM, if any."""
+        def create_llm() -> BaseChatModel:
+            llm = LlmManager(self.app_context).get_llm_instance()
+            if self.app_context.circuit_breaker_manager is not None:
+                llm.callbacks = [CircuitBreakerCallbackHandler(self.app_context.circuit_breaker_manager.llm)]
+            return llm
+
+        return self._get_resource("llm", create_llm)
+
+    @property
+    def vector_store(self) -> QdrantVectorStore:
+        """The hybrid vector store of the configured collection."""
+        def create_vector_store() -> QdrantVectorStore:
+            vector_store_configuration = self.app_context.configurations.vectorStore
+            return QdrantVectorStore.from_existing_collection(
+                url=self.app_context.env_vars.VECTOR_DB_CLUSTER_URI,
+                api_key=self.app_context.env_vars.VECTOR_DB_API_KEY,
+                collection_name=vector_store_configuration.collectionName,
+                embedding=self.embeddings,
+                sparse_embedding=self.sparse_embeddings,
+                vector_name=vector_store_configuration.embeddingKey,
+                sparse_vector_name=vector_store_configuration.textKey,
+                retrieval_mode=RetrievalMode.HYBRID
+            )
+
+        return self._get_resource("vector_store", create_vector_store)
+
+    def _get_warmup_steps(self) -> List[Tuple[str, Callable]]:
+        steps = [
+            ("sparse embeddings model", lambda: self.sparse_embeddings),
+            ("tokenizer", lambda: self.tokenizer),
+            ("embeddings tokenizer", lambda: self.embeddings_tokenizer),
+            ("embeddings client", lambda: self.embeddings),
+            ("LLM client", lambda: self.llm),
+            ("vector store", lambda: self.vector_store),
+        ]
+        if self._configuration.syntheticQuery:
+            steps.append(
+                ("synthetic retrieval", lambda: self.vector_store.similarity_search(self._configuration.syntheticQuery, k=1))
+            )
+        return steps
+
+    def warmup(self):
+        """
+        Create all the resources and run a synthetic retrieval, logging the time taken by each step.
+
+        Raises:
+            Exception: The error of the first failed step.
+        """
+        started_at = time.perf_counter()
+        for name, step in self._get_warmup_steps():
+            step_started_at = time.perf_counter()
+            step()
+            self.logger.info(f"Warmup: {name} ready in {time.perf_counter() - step_started_at:.2f}s.")
+        self.logger.info(f"Warmup completed in {time.perf_counter() - started_at:.2f}s.")
+
+    def _run_warmup(self):
+        while True:
+            try:
+                self.warmup()
+                self._ready.set()
+                return
+            except Exception as ex:
+                self.logger.warning(
+                    f"Warmup failed, retrying in {self._configuration.retryInterval}s: {str(ex)}"
+                )
+                time.sleep(self._configuration.retryInterval)
+
+    def start_warmup(self):
+        """
+        Start the warmup in background; the service is ready once it is completed. If the warmup is disabled,
+        the service is ready immediately and the resources are created by the first requests using them.
+        """
+        if not self._configuration.enabled:
+            self._ready.set()
+            return
+        threading.Thread(target=self._run_warmup, name="warmup", daemon=True).start()
@@ -0,0 +1,61 @@
+"""
+Module providing the StartupProfiler class, which measures the phases of the startup of the service.
+
+It only depends on the standard library, so that it can be imported before the modules whose import it measures.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from logging import Logger
+from typing import Dict
+
+# The reference of the startup times: the import of this module, the first one of the application
+STARTED_AT = time.perf_counter()
+
+
+class StartupProfiler:
+    """
+    Records the time taken by each phase of the startup (the import of each group of modules, the load of the
+    configuration, the initialization of the collection, ...) and the time until the first request, measured since
+    the start of the application. The phases are logged in a single report once the startup is completed, and
+    exported as the `startup_phase_duration_seconds` and `time_to_first_request_seconds` metrics.
+    """
+
+    def __init__(self):
+        self._phases: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._first_request_seconds: float | None = None
+
+    @contextmanager
+    def measure(self, phase: str):
+        """Measure the time taken by the enclosed block as the given phase."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases[phase] = time.perf_counter() - started_at
+
+    def report(self, logger: Logger, metrics_manager=None):
+        """
+        Log the time taken by each phase and the total time of the startup, exporting them as metrics
+        if the metrics manager is given.
+        """
+        total = time.perf_counter() - STARTED_AT
+        phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self._phases.items())
+        logger.info(f"Startup completed in {total:.2f}s: {phases}.")
+        if metrics_manager is not None:
+            for phase, seconds in self._phases.items():
+                metrics_manager.startup_phase_duration.labels(phase=phase).set(seconds)
+
+    def record_first_request(self, logger: Logger, metrics_manager=None):
+        """Record the arrival of a request: the first one sets the time to first request, the others are ignored."""
+        if self._first_request_seconds is not None:
+            return
+        with self._lock:
+            if self._first_request_seconds is not None:
+                return
+            self._first_request_seconds = time.perf_counter() - STARTED_AT
+        logger.info(f"First request received {self._first_request_seconds:.2f}s after the start.")
+        if metrics_manager is not None:
+            metrics_manager.time_to_first_request.set(self._first_request_seconds)
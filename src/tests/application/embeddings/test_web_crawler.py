@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from application.embeddings.errors import PageFetchError
+from application.embeddings.web_crawler import WebCrawler, WebCrawlerConfiguration
+
+logger = logging.getLogger(__name__)
+
+
+class FixtureServer:
+    """
+    Local HTTP server answering each request with the next response of a script, recording the requests.
+    Each response is a tuple (status code, headers); once the script is exhausted, it answers 200.
+    """
+
+    def __init__(self):
+        self.responses = []
+        self.response_delay = 0.0
+        self.requests_started_at = []
+        self.active_requests = 0
+        self.max_active_requests = 0
+        self._lock = threading.Lock()
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with fixture._lock:
+                    fixture.requests_started_at.append(time.monotonic())
+                    fixture.active_requests += 1
+                    fixture.max_active_requests = max(fixture.max_active_requests, fixture.active_requests)
+                    status_code, headers = fixture.responses.pop(0) if fixture.responses else (200, {})
+                try:
+                    time.sleep(fixture.response_delay)
+                    body = b"<html><body>page</body></html>"
+                    self.send_response(status_code)
+                    self.send_header("Content-Type", "text/html")
+                    self.send_header("Content-Length", str(len(body)))
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with fixture._lock:
+                        fixture.active_requests -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def server():
+    fixture_server = FixtureServer()
+    fixture_server.start()
+    yield fixture_server
+    fixture_server.stop()
+
+
+def fetch_all(configuration: WebCrawlerConfiguration, urls: list) -> list:
+    async def run():
+        async with WebCrawler(logger, configuration) as crawler:
+            return await asyncio.gather(*(crawler.fetch(url) for url in urls))
+
+    return asyncio.run(run())
+
+
+def test_fetch_returns_page(server):
+    page, = fetch_all(WebCrawlerConfiguration(), [f"{server.url}/page"])
+
+    assert page.status_code == 200
+    assert page.is_html
+    assert "page" in page.text
+
+
+@pytest.mark.parametrize("status_code", [429, 500, 502, 503, 504])
+def test_fetch_retries_temporary_errors(server, status_code):
+    server.responses = [(status_code, {}), (status_code, {})]
+
+    page, = fetch_all(WebCrawlerConfiguration(max_retries=3, retry_backoff=0.01), [f"{server.url}/page"])
+
+    assert page.status_code == 200
+    assert len(server.requests_started_at) == 3
+
+
+def test_fetch_does_not_retry_client_errors(server):
+    server.responses = [(404, {})]
+
+    page, = fetch_all(WebCrawlerConfiguration(max_retries=3, retry_backoff=0.01), [f"{server.url}/page"])
+
+    assert page.status_code == 404
+    assert len(server.requests_started_at) == 1
+
+
+def test_fetch_raises_after_max_retries(server):
+    server.responses = [(503, {})] * 3
+
+    with pytest.raises(PageFetchError):
+        fetch_all(WebCrawlerConfiguration(max_retries=2, retry_backoff=0.01), [f"{server.url}/page"])
+    assert len(server.requests_started_at) == 3
+
+
+def test_fetch_caps_retry_after(server):
+    server.responses = [(429, {"Retry-After": "86400"})]
+
+    started_at = time.monotonic()
+    page, = fetch_all(WebCrawlerConfiguration(max_retries=1, max_retry_delay=0.2), [f"{server.url}/page"])
+
+    assert page.status_code == 200
+    assert 0.2 <= time.monotonic() - started_at < 5
+
+
+def test_fetch_limits_concurrency_per_host(server):
+    server.response_delay = 0.1
+    urls = [f"{server.url}/page-{number}" for number in range(8)]
+
+    pages = fetch_all(WebCrawlerConfiguration(max_concurrency_per_host=2), urls)
+
+    assert all(page.status_code == 200 for page in pages)
+    assert server.max_active_requests == 2
+
+
+def test_fetch_waits_politeness_delay(server):
+    urls = [f"{server.url}/page-{number}" for number in range(4)]
+
+    fetch_all(WebCrawlerConfiguration(politeness_delay=0.1), urls)
+
+    intervals = [
+        later - earlier for earlier, later in zip(server.requests_started_at, server.requests_started_at[1:])
+    ]
+    assert len(intervals) == 3
+    assert all(interval >= 0.09 for interval in intervals)
+
+
+def test_retry_delay_is_capped():
+    crawler = WebCrawler(logger, WebCrawlerConfiguration(retry_backoff=1.0, max_retry_delay=5.0))
+
+    assert crawler._get_retry_delay(0) == 1.0
+    assert crawler._get_retry_delay(2) == 4.0
+    assert crawler._get_retry_delay(10) == 5.0
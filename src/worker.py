@@ -0,0 +1,52 @@
+import signal
+
+from application.embeddings.file_parser.pdf_process_pool import shutdown_pdf_process_pool, start_pdf_process_pool
+from application.embeddings.ingestion_jobs import IngestionJobManager
+from application.embeddings.ingestion_worker import IngestionWorker
+from configurations.configuration import get_configuration
+from configurations.variables import get_variables
+from context import AppContext, AppContextParams
+from helpers.sql_storage import SqlStorage
+from infrastracture.connection_pool_manager.connection_pool_manager import ConnectionPoolManager
+from infrastracture.logger import get_logger
+from infrastracture.metrics.manager import MetricsManager
+from infrastracture.resources_manager.resources_manager import ResourcesManager
+from helpers.vector_search_index_updater import VectorStoreInitializer
+
+# Entry point of the ingestion worker processes, which run the embeddings generation jobs queued by the API
+# when `ingestion.worker.enabled` is set. Any number of workers can run alongside the API, on any node.
+
+logger = get_logger()
+metrics_manager = MetricsManager()
+env_vars = get_variables(logger)
+configurations = get_configuration(env_vars.CONFIGURATION_PATH, logger)
+
+# The processes extracting the PDF files are forked before any thread is started
+start_pdf_process_pool(configurations.ingestion.fileParser.processes)
+
+app_context_params = AppContextParams(
+    logger=logger,
+    metrics_manager=metrics_manager,
+    env_vars=env_vars,
+    configurations=configurations
+)
+app_context_params.connection_pool_manager = ConnectionPoolManager(AppContext(params=app_context_params))
+app_context_params.ingestion_job_manager = IngestionJobManager(AppContext(params=app_context_params))
+# The models and clients used by the ingestion are created by the first job, and shared by the following ones
+app_context_params.resources_manager = ResourcesManager(AppContext(params=app_context_params))
+app_context = AppContext(params=app_context_params)
+
+vector_store_initializer = VectorStoreInitializer(app_context)
+vector_store_initializer.init_collection()
+
+# Ensure SQL tables exist:
+app_context.connection_pool_manager.open()
+sql_storage = SqlStorage(app_context)
+sql_storage.create_tables()
+
+worker = IngestionWorker(app_context)
+signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+signal.signal(signal.SIGINT, lambda signum, frame: worker.stop())
+worker.run()
+app_context.connection_pool_manager.close()
+shutdown_pdf_process_pool()